@@ -0,0 +1 @@
+"""Benchmarks y verificación diferencial del motor (python -m bench)."""
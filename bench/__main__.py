@@ -0,0 +1,110 @@
+"""python -m bench rendimiento [--guardar-base] | diferencial [--golden [archivo.npz]] | arranque"""
+import argparse
+import os
+import sys
+
+from bench import arranque, diferencial, rendimiento
+from bench.generadores import escenarios_aleatorios, lote_sintetico
+
+BASE_DEFECTO = os.path.join(os.path.dirname(__file__), "linea_base.json")
+
+
+def _rendimiento(args):
+    nombres = args.casos.split(",") if args.casos else None
+    desconocidos = [n for n in nombres or [] if n not in rendimiento.CASOS]
+    if desconocidos:
+        print(f"Casos desconocidos: {', '.join(desconocidos)}", file=sys.stderr)
+        return 2
+    base = rendimiento.leer_base(args.base)
+    resultados = {}
+    print(f"{'caso':28s}{'ms/op':>10s}{'escen/s':>12s}{'meses/s':>12s}{'pico MB':>9s}{'vs base':>9s}")
+    for nombre in nombres or rendimiento.CASOS:
+        r = resultados[nombre] = rendimiento.medir(nombre, args.tiempo)
+        relativo = f"{r['ms'] / base[nombre]['ms']:.2f}x" if nombre in base else "-"
+        print(f"{nombre:28s}{r['ms']:10.2f}{r['escenarios_s']:12,.0f}{r['meses_s']:12,.0f}{r['pico_mb']:9.1f}{relativo:>9s}")
+    if args.guardar_base:
+        rendimiento.guardar_base(args.base, {**base, **resultados})
+        print(f"Línea base guardada en {args.base}")
+        return 0
+    lentos = rendimiento.regresiones(resultados, base, args.tolerancia)
+    for nombre, (antes, ahora) in lentos.items():
+        print(f"REGRESIÓN {nombre}: {antes:.2f} ms -> {ahora:.2f} ms", file=sys.stderr)
+    return 1 if lentos else 0
+
+
+def _diferencial(args):
+    escenarios = escenarios_aleatorios(args.n, args.seed) + lote_sintetico(args.n // 10, args.seed, horizonte=240, kps=20,
+                                                                           relacionadas=5, filas_ventas=30)
+    # Muchos tramos: el residuo de los saldos pagados depende del orden de suma (ver motor.tramos.suma)
+    escenarios += lote_sintetico(max(1, args.n // 30), args.seed + 1, horizonte=120, kps=120, relacionadas=40)
+    motores = {m: diferencial.MOTORES[m] for m in args.motores.split(",")} if args.motores else None
+    informe = diferencial.verificar(escenarios, motores, rtol=args.rtol, atol=args.atol)
+    fallas = 0
+    for nombre, r in informe.items():
+        print(f"{nombre}: {r['escenarios_con_diferencias']}/{len(escenarios)} escenarios con diferencias")
+        for c, a in sorted(r["columnas"].items()):
+            print(f"    {c:24s} escenarios={a['escenarios']:<5d} meses={a['meses']:<6d} max_abs={a['max_abs']:.3g}")
+        fallas += r["escenarios_con_diferencias"]
+    if args.guardar_golden:
+        ruta = args.golden or diferencial.RUTA_GOLDEN
+        diferencial.guardar_golden(ruta, diferencial.escenarios_golden())
+        print(f"Salida dorada guardada en {ruta}")
+    elif args.golden:
+        if not os.path.exists(args.golden):
+            print(f"No existe la salida dorada {args.golden} (se crea sólo con --guardar-golden)", file=sys.stderr)
+            return 2
+        for nombre, motor in {"referencia": None, **(motores or diferencial.MOTORES)}.items():
+            diferencias = diferencial.comparar_golden(args.golden, motor, rtol=args.rtol, atol=args.atol)
+            print(f"{nombre} vs {args.golden}: {len({d[0] for d in diferencias})} escenarios con diferencias")
+            for i, c, meses, max_abs in diferencias[:50]:
+                print(f"    escenario {i:<5d} {c:24s} meses={meses:<6d} max_abs={max_abs:.3g}")
+            fallas += len(diferencias)
+    return 1 if fallas else 0
+
+
+def _arranque(args):
+    modulos = args.modulos.split(",") if args.modulos else None
+    informe = arranque.verificar(modulos, args.repeticiones, args.escala)
+    print(f"{'módulo':24s}{'ms':>9s}{'presupuesto':>13s}  prohibidos cargados")
+    for modulo, r in informe.items():
+        marca = "" if r["ok"] else "  EXCEDE"
+        print(f"{modulo:24s}{r['ms']:9.1f}{r['presupuesto_ms']:13.0f}  {', '.join(r['cargados']) or '-'}{marca}")
+    return 0 if all(r["ok"] for r in informe.values()) else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench", description="Benchmarks y verificación diferencial del motor.")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p = sub.add_parser("rendimiento", help="Mide los casos y los compara con la línea base")
+    p.add_argument("--casos", help=f"Lista separada por comas ({', '.join(rendimiento.CASOS)})")
+    p.add_argument("--base", default=BASE_DEFECTO, help="Archivo JSON de línea base (propio de cada máquina)")
+    p.add_argument("--guardar-base", action="store_true", help="Guarda los resultados como nueva línea base")
+    p.add_argument("--tolerancia", type=float, default=0.2, help="Fracción más lenta que cuenta como regresión")
+    p.add_argument("--tiempo", type=float, default=0.5, help="Segundos mínimos de medición por caso")
+    p.set_defaults(func=_rendimiento)
+
+    p = sub.add_parser("diferencial", help="Compara los motores alternativos con el de referencia")
+    p.add_argument("--n", type=int, default=300, help="Escenarios aleatorios (más n/10 largos con muchos tramos)")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--motores", help=f"Lista separada por comas ({', '.join(diferencial.MOTORES)})")
+    p.add_argument("--golden", nargs="?", const=diferencial.RUTA_GOLDEN,
+                   help="Compara cada motor con la salida dorada (por defecto bench/golden.npz)")
+    p.add_argument("--guardar-golden", action="store_true",
+                   help="Regenera la salida dorada con la referencia actual (sólo a propósito)")
+    p.add_argument("--rtol", type=float, default=1e-9)
+    p.add_argument("--atol", type=float, default=1e-6)
+    p.set_defaults(func=_diferencial)
+
+    p = sub.add_parser("arranque", help="Mide la importación del motor en procesos nuevos contra su presupuesto")
+    p.add_argument("--modulos", help=f"Lista separada por comas ({', '.join(arranque.PRESUPUESTO_MS)})")
+    p.add_argument("--repeticiones", type=int, default=5)
+    p.add_argument("--escala", type=float, default=1.0, help="Multiplica los presupuestos (máquinas más lentas)")
+    p.set_defaults(func=_arranque)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,46 @@
+"""Tiempo de importación en un intérprete nuevo: el presupuesto de arranque de workers y jobs de CLI."""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Módulo -> presupuesto en ms (sólo la importación, sin contar el arranque del intérprete)
+PRESUPUESTO_MS = {
+    "motor": 250,
+    "motor.lote": 250,
+    "motor.cli": 300,
+    "motor.sensibilidad": 300,
+    "motor.reanudable": 250,
+}
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Dependencias pesadas que el motor no debe cargar al importarse
+PROHIBIDOS = ("pandas", "plotly", "streamlit", "xlsxwriter")
+
+_SONDA = """
+import json, sys, time
+t = time.perf_counter()
+import {modulo}
+ms = (time.perf_counter() - t) * 1000
+print(json.dumps({{"ms": ms, "cargados": [m for m in {prohibidos!r} if m in sys.modules]}}))
+"""
+
+
+def medir_importacion(modulo, repeticiones=5):
+    """Mediana de ms de `import modulo` en procesos nuevos y dependencias prohibidas que arrastra."""
+    codigo = _SONDA.format(modulo=modulo, prohibidos=PROHIBIDOS)
+    muestras = []
+    for _ in range(repeticiones):
+        salida = subprocess.run([sys.executable, "-c", codigo], cwd=RAIZ, capture_output=True, text=True, check=True)
+        muestras.append(json.loads(salida.stdout))
+    return {"ms": statistics.median(m["ms"] for m in muestras), "cargados": muestras[-1]["cargados"]}
+
+
+def verificar(modulos=None, repeticiones=5, escala=1.0):
+    """{modulo: {"ms", "presupuesto_ms", "cargados", "ok"}}; `escala` ajusta el presupuesto a máquinas lentas."""
+    informe = {}
+    for modulo in modulos or PRESUPUESTO_MS:
+        r = medir_importacion(modulo, repeticiones)
+        presupuesto = PRESUPUESTO_MS.get(modulo, max(PRESUPUESTO_MS.values())) * escala
+        informe[modulo] = {**r, "presupuesto_ms": presupuesto, "ok": r["ms"] <= presupuesto and not r["cargados"]}
+    return informe
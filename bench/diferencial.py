@@ -0,0 +1,157 @@
+"""Comparación diferencial: cualquier motor alternativo contra el ciclo de referencia, columna por columna."""
+import copy
+import json
+import os
+
+import numpy as np
+
+from bench.generadores import escenarios_aleatorios, lote_sintetico
+from motor.flujo import calcular_flujo
+from motor.almacen import a_resultado
+from motor.lote import COLUMNAS, calcular_flujo_lote, resultado_escenario
+from motor.reanudable import SimulacionReanudable
+
+ESCALARES = ("utilidad", "roi", "costo_financiero_total", "peak_deuda", "break_even")
+
+
+def _lote(lista):
+    lote = calcular_flujo_lote(lista)
+    return [resultado_escenario(lote, i) for i in range(len(lista))]
+
+
+def _lote_resumen(lista):
+    lote = calcular_flujo_lote(lista, columnas=False)
+    return [{k: (None if k == "break_even" and lote[k][i] < 0 else lote[k][i]) for k in ESCALARES} for i in range(len(lista))]
+
+
+def _columnas(lista):
+    return [a_resultado(calcular_flujo(d, modo="columnas")) for d in lista]
+
+
+def _resumen(lista):
+    return [calcular_flujo(d, modo="resumen") for d in lista]
+
+
+def _reanudable(lista):
+    return [SimulacionReanudable(d).resultado for d in lista]
+
+
+def _reanudable_edicion(lista):
+    # Parte de una variante con la última venta desplazada y reanuda hacia el escenario real
+    salida = []
+    for d in lista:
+        variante = copy.deepcopy(d)
+        if variante["plan_ventas"]:
+            variante["plan_ventas"][-1]["mes"] = int(variante["plan_ventas"][-1]["mes"]) + 1
+        sim = SimulacionReanudable(variante)
+        salida.append(sim.actualizar(d))
+    return salida
+
+
+# Nombre -> función que recibe la lista de escenarios y devuelve resultados con la forma de calcular_flujo
+# (los motores de sólo resumen devuelven los escalares, sin "df", y se comparan sólo en ellos)
+MOTORES = {"lote": _lote, "lote_resumen": _lote_resumen, "columnas": _columnas, "resumen": _resumen,
+           "reanudable": _reanudable, "reanudable_edicion": _reanudable_edicion}
+
+
+def _vector(resultado, columna):
+    return resultado["df"][columna].to_numpy(dtype=float)
+
+
+def _escalar(resultado, clave):
+    v = resultado[clave]
+    return np.nan if v is None else float(v)
+
+
+def comparar(referencia, alternativo, rtol=1e-9, atol=1e-6):
+    """Diferencias de un escenario: {columna: (meses distintos, máx. diferencia absoluta)}."""
+    diferencias = {}
+    if "df" in alternativo:
+        if len(referencia["df"]) != len(alternativo["df"]):
+            return {"horizonte": (1, float(abs(len(referencia["df"]) - len(alternativo["df"]))))}
+        for c in COLUMNAS:
+            esperado, obtenido = _vector(referencia, c), _vector(alternativo, c)
+            malos = ~np.isclose(obtenido, esperado, rtol=rtol, atol=atol, equal_nan=True)
+            if malos.any():
+                diferencias[c] = (int(malos.sum()), float(np.nanmax(np.abs(obtenido - esperado))))
+    for k in ESCALARES:
+        esperado, obtenido = _escalar(referencia, k), _escalar(alternativo, k)
+        if not np.isclose(obtenido, esperado, rtol=rtol, atol=atol, equal_nan=True):
+            diferencias[k] = (1, float(abs(obtenido - esperado)) if np.isfinite(obtenido - esperado) else float("inf"))
+    return diferencias
+
+
+def verificar(escenarios, motores=None, referencia=calcular_flujo, rtol=1e-9, atol=1e-6):
+    """Corre cada motor sobre los escenarios y agrega las diferencias por columna.
+
+    Devuelve {motor: {"escenarios_con_diferencias": n, "columnas": {columna: {"escenarios", "meses", "max_abs"}}}}.
+    """
+    motores = motores or MOTORES
+    esperados = [referencia(d) for d in escenarios]
+    informe = {}
+    for nombre, motor in motores.items():
+        obtenidos = motor(escenarios)
+        columnas, con_diferencias = {}, 0
+        for ref, alt in zip(esperados, obtenidos):
+            diferencias = comparar(ref, alt, rtol, atol)
+            con_diferencias += bool(diferencias)
+            for c, (meses, max_abs) in diferencias.items():
+                agregado = columnas.setdefault(c, {"escenarios": 0, "meses": 0, "max_abs": 0.0})
+                agregado["escenarios"] += 1
+                agregado["meses"] += meses
+                agregado["max_abs"] = max(agregado["max_abs"], max_abs)
+        informe[nombre] = {"escenarios_con_diferencias": con_diferencias, "columnas": columnas}
+    return informe
+
+
+# --- Salida dorada: escenarios y resultados guardados para detectar cambios en los motores ---
+# bench/golden.npz se generó con el ciclo original, anterior a separar el motor de pryectos3.py
+# (un dict por tramo y sumas secuenciales); sólo se regenera a propósito (--guardar-golden)
+RUTA_GOLDEN = os.path.join(os.path.dirname(__file__), "golden.npz")
+
+
+def escenarios_golden(seed=0):
+    """Escenarios de la salida dorada: casos borde, y muchos tramos con horizontes largos."""
+    return (escenarios_aleatorios(40, seed)
+            + lote_sintetico(6, seed, horizonte=240, kps=120, relacionadas=40, filas_ventas=30)
+            + lote_sintetico(2, seed + 1, horizonte=480, kps=200, relacionadas=60, filas_ventas=60))
+
+
+def _referencia(lista):
+    return [calcular_flujo(d) for d in lista]
+
+
+def guardar_golden(ruta, escenarios, referencia=calcular_flujo):
+    arreglos = {}
+    for i, d in enumerate(escenarios):
+        r = referencia(copy.deepcopy(d))
+        arreglos[f"flujo_{i}"] = np.column_stack([_vector(r, c) for c in COLUMNAS])
+        arreglos[f"escalares_{i}"] = np.array([_escalar(r, k) for k in ESCALARES])
+    np.savez_compressed(ruta, n=np.array(len(escenarios)), columnas=np.array(COLUMNAS),
+                        escenarios=np.array(json.dumps(escenarios)), **arreglos)
+
+
+def leer_golden(ruta):
+    """(escenarios, resultados esperados con "df" y los escalares) de una salida dorada."""
+    import pandas as pd
+    with np.load(ruta) as guardado:
+        columnas = [str(c) for c in guardado["columnas"]]
+        escenarios = json.loads(str(guardado["escenarios"]))
+        esperados = []
+        for i in range(int(guardado["n"])):
+            esperado = {"df": pd.DataFrame(guardado[f"flujo_{i}"], columns=columnas)}
+            esperado.update(zip(ESCALARES, guardado[f"escalares_{i}"].tolist()))
+            esperados.append(esperado)
+    return escenarios, esperados
+
+
+def comparar_golden(ruta, motor=None, rtol=1e-9, atol=1e-6):
+    """Diferencias de un motor (ver MOTORES; por defecto la referencia) contra la salida dorada,
+    sobre los escenarios guardados en ella: [(escenario, columna, meses, máx. abs)]."""
+    escenarios, esperados = leer_golden(ruta)
+    obtenidos = (motor or _referencia)(escenarios)
+    diferencias = []
+    for i, (esperado, obtenido) in enumerate(zip(esperados, obtenidos)):
+        for c, (meses, max_abs) in comparar(esperado, obtenido, rtol, atol).items():
+            diferencias.append((i, c, meses, max_abs))
+    return diferencias
@@ -0,0 +1,78 @@
+"""Escenarios sintéticos reproducibles para benchmarks y comparación diferencial."""
+import random
+
+from motor.flujo import get_default_config
+
+FRECUENCIAS = ["Mensual", "Trimestral", "Al Final"]
+
+
+def _tramos(rng, n, prefijo, con_plazo, ultimo_inicio):
+    tramos = []
+    for i in range(n):
+        t = {"nombre": f"{prefijo} {i + 1}", "monto": rng.uniform(100, 20000), "tasa_anual": rng.uniform(0, 14),
+             "frecuencia_pago": rng.choice(FRECUENCIAS), "mes_inicio": rng.randint(0, max(0, ultimo_inicio))}
+        if con_plazo:
+            t["plazo"] = 24
+        tramos.append(t)
+    return tramos
+
+
+def escenario_sintetico(rng, horizonte=60, kps=3, relacionadas=2, filas_ventas=6):
+    """Escenario con horizonte ~`horizonte` meses y la cantidad de tramos y filas de venta pedida."""
+    horizonte = max(24, int(horizonte))
+    d = get_default_config("Real")
+    recepcion = horizonte - 12
+    duracion = max(1, min(recepcion, int(recepcion * rng.uniform(0.4, 0.8))))
+    d.update({
+        "valor_terreno": rng.uniform(5000, 40000), "pct_fin_terreno": rng.uniform(0, 80),
+        "valor_contrato": rng.uniform(20000, 120000), "pct_fin_construccion": rng.uniform(40, 90),
+        "duracion_obra": duracion, "mes_inicio_obra": rng.randint(0, 3), "pct_avance_inicial": rng.uniform(0, 20),
+        "mes_recepcion": recepcion, "saldo_inicial_uf": rng.choice([0.0, rng.uniform(0, 20000)]),
+        "aporte_socios": rng.choice([0.0, rng.uniform(0, 10000)]),
+        "total_otros_costos_inicial": rng.uniform(0, 5000), "otros_costos_mensuales": rng.uniform(0, 300),
+        "tasa_anual_uf": rng.uniform(2, 10), "pct_deuda_pesos": rng.uniform(0, 100),
+        "tasa_anual_clp": rng.uniform(5, 15), "inflacion_anual": rng.uniform(0, 8),
+        "pagar_intereses_construccion": rng.random() < 0.3,
+        "valor_venta_total": rng.uniform(80000, 250000),
+    })
+    d["lista_kps"] = _tramos(rng, kps, "KP", True, recepcion // 2)
+    d["lista_relacionadas"] = _tramos(rng, relacionadas, "Rel", False, recepcion // 2)
+    # Ventas repartidas hasta 6 meses antes del horizonte; suman 100%
+    pesos = [rng.random() for _ in range(filas_ventas)]
+    total = sum(pesos) or 1.0
+    d["plan_ventas"] = [{"mes": rng.randint(max(1, recepcion - 24), horizonte - 6), "pct": 100.0 * p / total} for p in pesos]
+    return d
+
+
+def lote_sintetico(n, seed=0, **parametros):
+    rng = random.Random(seed)
+    return [escenario_sintetico(rng, **parametros) for _ in range(n)]
+
+
+def escenario_aleatorio(rng):
+    """Escenario con casos borde (obra de 0-2 meses, ventas en 0%, tramos en el mes 0, etc.)."""
+    d = get_default_config(rng.choice(["Real", "Optimista", "Pesimista"]))
+    d.update({
+        "valor_terreno": rng.choice([0.0, rng.uniform(5000, 40000)]),
+        "pct_fin_terreno": rng.choice([0.0, 50.0, rng.uniform(0, 100)]),
+        "valor_contrato": rng.uniform(0, 90000), "pct_fin_construccion": rng.uniform(0, 100),
+        "duracion_obra": rng.choice([0, 1, 2, rng.randint(3, 30)]), "mes_inicio_obra": rng.randint(0, 6),
+        "pct_avance_inicial": rng.uniform(0, 30), "mes_recepcion": rng.randint(0, 40),
+        "saldo_inicial_uf": rng.choice([0.0, rng.uniform(0, 20000)]),
+        "aporte_socios": rng.choice([0.0, rng.uniform(0, 20000)]),
+        "total_otros_costos_inicial": rng.uniform(0, 5000), "otros_costos_mensuales": rng.uniform(0, 300),
+        "otros_costos_pagados_anteriores": rng.uniform(0, 1000),
+        "tasa_anual_uf": rng.uniform(0, 10), "pct_deuda_pesos": rng.choice([0.0, 100.0, rng.uniform(0, 100)]),
+        "tasa_anual_clp": rng.uniform(0, 15), "inflacion_anual": rng.uniform(0, 8),
+        "pagar_intereses_construccion": rng.random() < 0.4, "valor_venta_total": rng.uniform(0, 200000),
+    })
+    d["lista_relacionadas"] = _tramos(rng, rng.randint(0, 3), "Rel", False, 10)
+    d["lista_kps"] = _tramos(rng, rng.randint(0, 4), "KP", True, 10)
+    d["plan_ventas"] = [{"mes": rng.randint(1, 45), "pct": rng.choice([0.0, rng.uniform(0, 60)])}
+                        for _ in range(rng.randint(0, 5))]
+    return d
+
+
+def escenarios_aleatorios(n, seed=0):
+    rng = random.Random(seed)
+    return [escenario_aleatorio(rng) for _ in range(n)]
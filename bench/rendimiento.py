@@ -0,0 +1,104 @@
+"""Casos de rendimiento del motor: tiempo por operación, throughput y memoria pico, contra una línea base."""
+import copy
+import json
+import statistics
+import time
+import tracemalloc
+
+from bench.generadores import lote_sintetico
+from motor.flujo import calcular_flujo
+from motor.lote import calcular_flujo_lote
+from motor.reanudable import SimulacionReanudable
+from motor.sensibilidad import evaluar_cubo, pasos_variacion, valores_eje
+
+
+def _flujo(modo="df", paso="Mensual", **parametros):
+    d = dict(lote_sintetico(1, seed=1, **parametros)[0], paso_tiempo=paso)
+    return (lambda: calcular_flujo(d, modo)), 1, parametros["horizonte"]
+
+
+def _lote(n, columnas=True, **parametros):
+    lista = lote_sintetico(n, seed=2, **parametros)
+    return (lambda: calcular_flujo_lote(lista, columnas)), n, n * parametros["horizonte"]
+
+
+def _reanudable(**parametros):
+    d = lote_sintetico(1, seed=3, **parametros)[0]
+    sim = SimulacionReanudable(d)
+    editado = copy.deepcopy(d)
+    editado["plan_ventas"][-1]["pct"] += 1.0
+    alternar = [editado, d]
+
+    def correr():
+        # Alterna entre dos versiones que sólo difieren en la última venta
+        alternar.reverse()
+        sim.actualizar(alternar[0])
+    return correr, 1, parametros["horizonte"]
+
+
+def _cubo(lado, **parametros):
+    base = lote_sintetico(1, seed=4, **parametros)[0]
+    ejes = {c: valores_eje(base, c, pasos_variacion(20, lado)) for c in ("valor_venta_total", "valor_contrato")}
+    return (lambda: evaluar_cubo(base, ejes, "roi")), lado * lado, lado * lado * parametros["horizonte"]
+
+
+# Nombre -> (preparar, argumentos). preparar devuelve (operación, escenarios por operación, meses por operación)
+CASOS = {
+    "flujo_h60": (_flujo, dict(horizonte=60, kps=3, relacionadas=2, filas_ventas=6)),
+    "flujo_h240": (_flujo, dict(horizonte=240, kps=3, relacionadas=2, filas_ventas=6)),
+    "flujo_h600": (_flujo, dict(horizonte=600, kps=3, relacionadas=2, filas_ventas=6)),
+    "flujo_h60_resumen": (_flujo, dict(modo="resumen", horizonte=60, kps=3, relacionadas=2, filas_ventas=6)),
+    "flujo_h600_columnas": (_flujo, dict(modo="columnas", horizonte=600, kps=3, relacionadas=2, filas_ventas=6)),
+    "flujo_h120_semanal": (_flujo, dict(paso="Semanal", horizonte=120, kps=3, relacionadas=2, filas_ventas=6)),
+    "flujo_h120_diario": (_flujo, dict(paso="Diario", horizonte=120, kps=3, relacionadas=2, filas_ventas=6)),
+    "flujo_tramos200": (_flujo, dict(horizonte=120, kps=150, relacionadas=50, filas_ventas=6)),
+    "flujo_tramos1000": (_flujo, dict(horizonte=120, kps=800, relacionadas=200, filas_ventas=6)),
+    "flujo_ventas500": (_flujo, dict(horizonte=120, kps=3, relacionadas=2, filas_ventas=500)),
+    "lote_1000_h120": (_lote, dict(n=1000, horizonte=120, kps=3, relacionadas=2, filas_ventas=6)),
+    "lote_100_h600": (_lote, dict(n=100, horizonte=600, kps=3, relacionadas=2, filas_ventas=6)),
+    "lote_1000_h120_resumen": (_lote, dict(n=1000, columnas=False, horizonte=120, kps=3, relacionadas=2, filas_ventas=6)),
+    "reanudable_ultima_venta": (_reanudable, dict(horizonte=120, kps=3, relacionadas=2, filas_ventas=6)),
+    "cubo_5x5": (_cubo, dict(lado=5, horizonte=60, kps=3, relacionadas=2, filas_ventas=6)),
+    "cubo_40x40": (_cubo, dict(lado=40, horizonte=60, kps=3, relacionadas=2, filas_ventas=6)),
+}
+
+
+def medir(nombre, tiempo_min=0.5, repeticiones_min=3):
+    preparar, argumentos = CASOS[nombre]
+    operacion, escenarios, meses = preparar(**argumentos)
+    operacion()  # calentamiento (imports, pool de procesos, cachés de numpy)
+    tiempos, inicio = [], time.perf_counter()
+    while len(tiempos) < repeticiones_min or time.perf_counter() - inicio < tiempo_min:
+        t = time.perf_counter()
+        operacion()
+        tiempos.append(time.perf_counter() - t)
+    tracemalloc.start()
+    operacion()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    seg = statistics.median(tiempos)
+    return {"ms": seg * 1000, "escenarios_s": escenarios / seg, "meses_s": meses / seg,
+            "pico_mb": pico / 2**20, "repeticiones": len(tiempos)}
+
+
+def correr(nombres=None, tiempo_min=0.5):
+    return {n: medir(n, tiempo_min) for n in (nombres or CASOS)}
+
+
+def leer_base(ruta):
+    try:
+        with open(ruta, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def guardar_base(ruta, resultados):
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(resultados, f, indent=2, sort_keys=True)
+
+
+def regresiones(resultados, base, tolerancia=0.2):
+    """Casos más lentos que la línea base en más de `tolerancia` (fracción): {caso: (ms base, ms actual)}."""
+    return {n: (base[n]["ms"], r["ms"]) for n, r in resultados.items()
+            if n in base and r["ms"] > base[n]["ms"] * (1 + tolerancia)}
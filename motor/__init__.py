@@ -0,0 +1,3 @@
+"""Motor de cálculo de flujo de caja de proyectos inmobiliarios (importable sin Streamlit)."""
+from motor.flujo import calcular_flujo, get_default_config
+from motor.lote import calcular_flujo_lote, resultado_escenario, comparar_con_referencia
@@ -0,0 +1,5 @@
+import sys
+
+from motor.cli import main
+
+sys.exit(main())
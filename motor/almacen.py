@@ -0,0 +1,196 @@
+"""Almacén de resultados en disco (SQLite), compartido entre procesos y sesiones.
+
+La clave es el hash canónico del escenario más VERSION_MOTOR: un cambio del motor que altere
+resultados sube la versión y los registros anteriores dejan de usarse (y salen por desalojo).
+SQLite en modo WAL admite lectores concurrentes con un escritor; cada hilo y cada proceso
+abre su propia conexión. Al superar `max_mb` se desalojan los registros usados hace más tiempo.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from motor.flujo import VERSION_MOTOR, tabla_por_paso
+from motor.lote import COLUMNAS
+
+CLAVES_RESUMEN = ("utilidad", "costo_financiero_total", "roi", "peak_deuda", "min_flujo_acumulado", "break_even")
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS resultados (
+    clave TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    resumen TEXT NOT NULL,
+    flujo BLOB NOT NULL,
+    bytes INTEGER NOT NULL,
+    usado REAL NOT NULL,
+    PRIMARY KEY (clave, version)
+);
+CREATE INDEX IF NOT EXISTS resultados_usado ON resultados (usado);
+"""
+
+
+# Un registro es el resumen de calcular_flujo (sin "df") más "columnas": {columna: arreglo del mes 0 al horizonte};
+# con subperíodos, además "subperiodos" y "columnas_paso" (las de "df_paso", con el paso en "Mes")
+def registro_resultado(resultado):
+    """Registro de un resultado con la forma de calcular_flujo."""
+    be = resultado["break_even"]
+    df = resultado["df"]
+    registro = {**{k: float(resultado[k]) for k in CLAVES_RESUMEN if k != "break_even"},
+                "break_even": None if be is None else int(be),
+                "detalles_fin": {k: float(v) for k, v in resultado["detalles_fin"].items()},
+                "columnas": {c: df[c].to_numpy() for c in COLUMNAS}}
+    df_paso = resultado.get("df_paso")
+    if df_paso is not None:
+        registro["subperiodos"] = (len(df_paso) - 1) // (len(df) - 1)
+        registro["columnas_paso"] = {c: df_paso["Paso" if c == "Mes" else c].to_numpy(dtype=np.float64) for c in COLUMNAS}
+    return registro
+
+
+def registro_lote(lote, i):
+    """Registro del escenario i de un lote de calcular_flujo_lote (sin pasar por pandas)."""
+    h = int(lote["horizonte"][i])
+    be = int(lote["break_even"][i])
+    return {**{k: float(lote[k][i]) for k in CLAVES_RESUMEN if k != "break_even"},
+            "break_even": be if be >= 0 else None,
+            "detalles_fin": {k: float(v[i]) for k, v in lote["detalles_fin"].items()},
+            "columnas": {c: lote["columnas"][c][i, :h + 1] for c in COLUMNAS}}
+
+
+def _empaquetar(registro):
+    # Una matriz (COLUMNAS x meses), seguida de la de subperíodos si la hay
+    partes = [registro["columnas"]] + ([registro["columnas_paso"]] if "columnas_paso" in registro else [])
+    matriz = np.ascontiguousarray(np.hstack([np.vstack([np.asarray(p[c], dtype=np.float64) for c in COLUMNAS]) for p in partes]))
+    resumen = json.dumps({k: v for k, v in registro.items() if k not in ("columnas", "columnas_paso")})
+    return resumen, zlib.compress(matriz.tobytes(), 1)
+
+
+def _desempaquetar(resumen, flujo):
+    # bytearray: el arreglo queda escribible, como los que devuelve el motor
+    matriz = np.frombuffer(bytearray(zlib.decompress(flujo)), dtype=np.float64).reshape(len(COLUMNAS), -1)
+    registro = json.loads(resumen)
+    k = registro.get("subperiodos")
+    if k:
+        # h meses y h * k pasos, cada uno con su fila 0: 2 + h * (k + 1) columnas
+        meses = (matriz.shape[1] - 2) // (k + 1) + 1
+        registro["columnas_paso"] = dict(zip(COLUMNAS, matriz[:, meses:]))
+        matriz = matriz[:, :meses]
+    registro["columnas"] = dict(zip(COLUMNAS, matriz))
+    return registro
+
+
+def a_resultado(registro):
+    """Registro del almacén -> dict con la misma forma que devuelve calcular_flujo."""
+    import pandas as pd
+    df = pd.DataFrame(registro["columnas"])
+    df["Mes"] = df["Mes"].astype(int)
+    resultado = {"df": df, **{k: v for k, v in registro.items() if k not in ("columnas", "columnas_paso", "subperiodos")}}
+    if "columnas_paso" in registro:
+        resultado["df_paso"] = tabla_por_paso(registro["columnas_paso"], registro["subperiodos"])
+    return resultado
+
+
+class AlmacenResultados:
+    def __init__(self, ruta, max_mb=512, version=VERSION_MOTOR, timeout=10.0):
+        self.ruta = ruta
+        self.max_bytes = int(max_mb * 2**20)
+        self.version = version
+        self.timeout = timeout
+        self._local = threading.local()
+        directorio = os.path.dirname(os.path.abspath(ruta))
+        os.makedirs(directorio, exist_ok=True)
+        con = self._conexion()
+        with con:
+            con.executescript(_ESQUEMA)
+
+    def _conexion(self):
+        # Una conexión por hilo y por proceso (una conexión heredada por fork no es utilizable)
+        con = getattr(self._local, "con", None)
+        if con is None or self._local.pid != os.getpid():
+            con = sqlite3.connect(self.ruta, timeout=self.timeout, isolation_level=None)
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            self._local.con, self._local.pid = con, os.getpid()
+        return con
+
+    def __len__(self):
+        return self._conexion().execute("SELECT COUNT(*) FROM resultados WHERE version = ?", (self.version,)).fetchone()[0]
+
+    def tamano_bytes(self):
+        return self._conexion().execute("SELECT COALESCE(SUM(bytes), 0) FROM resultados").fetchone()[0]
+
+    # --- Lectura ---
+    def obtener_varios(self, claves):
+        """{clave: registro} de las claves presentes; registro = resumen + "columnas" {columna: arreglo}."""
+        claves = list(dict.fromkeys(claves))
+        if not claves:
+            return {}
+        con = self._conexion()
+        encontrados = {}
+        for i in range(0, len(claves), 500):  # límite de parámetros por consulta de SQLite
+            parte = claves[i:i + 500]
+            filas = con.execute(f"SELECT clave, resumen, flujo FROM resultados WHERE version = ? AND clave IN "
+                                f"({','.join('?' * len(parte))})", (self.version, *parte)).fetchall()
+            encontrados.update({c: _desempaquetar(r, f) for c, r, f in filas})
+        if encontrados:
+            try:
+                con.execute(f"UPDATE resultados SET usado = ? WHERE version = ? AND clave IN ({','.join('?' * len(encontrados))})",
+                            (time.time(), self.version, *encontrados))
+            except sqlite3.OperationalError:
+                pass  # la marca de uso es sólo una pista para el desalojo: no vale la pena esperar el lock
+        return encontrados
+
+    def obtener(self, clave):
+        """Resultado con la forma de calcular_flujo, o None."""
+        registro = self.obtener_varios([clave]).get(clave)
+        return None if registro is None else a_resultado(registro)
+
+    # --- Escritura ---
+    def guardar_registros(self, pares):
+        """Guarda [(clave, registro)] en una sola transacción y desaloja si hace falta."""
+        ahora = time.time()
+        filas = []
+        for clave, registro in pares:
+            resumen, flujo = _empaquetar(registro)
+            filas.append((clave, self.version, resumen, flujo, len(resumen) + len(flujo), ahora))
+        if not filas:
+            return
+        con = self._conexion()
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            con.executemany("INSERT OR REPLACE INTO resultados (clave, version, resumen, flujo, bytes, usado) "
+                            "VALUES (?, ?, ?, ?, ?, ?)", filas)
+            self._desalojar(con)
+            con.execute("COMMIT")
+        except BaseException:
+            con.execute("ROLLBACK")
+            raise
+
+    def guardar(self, clave, resultado):
+        self.guardar_registros([(clave, registro_resultado(resultado))])
+
+    def _desalojar(self, con):
+        total = con.execute("SELECT COALESCE(SUM(bytes), 0) FROM resultados").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Versiones anteriores del motor primero, luego los menos usados hasta quedar en 90% del máximo
+        con.execute("DELETE FROM resultados WHERE version != ?", (self.version,))
+        total = con.execute("SELECT COALESCE(SUM(bytes), 0) FROM resultados").fetchone()[0]
+        exceso = total - int(self.max_bytes * 0.9)
+        if exceso <= 0:
+            return
+        borrar, acumulado = [], 0
+        for clave, n in con.execute("SELECT clave, bytes FROM resultados ORDER BY usado"):
+            borrar.append((clave, self.version))
+            acumulado += n
+            if acumulado >= exceso:
+                break
+        con.executemany("DELETE FROM resultados WHERE clave = ? AND version = ?", borrar)
+
+    def limpiar(self):
+        con = self._conexion()
+        con.execute("DELETE FROM resultados")
+        con.execute("VACUUM")
@@ -0,0 +1,195 @@
+"""Caché de resultados por hash canónico del escenario (sólo recalcula lo que cambió)."""
+import threading
+from collections import OrderedDict
+
+from motor.almacen import a_resultado, registro_lote
+from motor.canonico import hash_canonico
+from motor.flujo import subperiodos
+from motor.lote import calcular_flujo_lote, resultado_escenario
+from motor.memoria import tamano
+from motor.perfil import contar, medir
+
+
+def _completo(resultado, data):
+    # El motor por lotes (resultados_lote, CLI) no guarda el detalle por subperíodo: ese resultado
+    # no sirve para la vista que lo pide y se recalcula (y reemplaza) con el motor de la caché
+    return "df_paso" in resultado or subperiodos(data) == 1
+
+
+class CacheCompartida:
+    """LRU en memoria del proceso, compartida entre sesiones y acotada en bytes (segura entre hilos).
+
+    Lo que entra se trata como de sólo lectura: varias sesiones con las mismas entradas reciben
+    el mismo objeto en vez de una copia cada una.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entradas = OrderedDict()
+        self._bytes = {}
+        self.bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def ids(self):
+        """ids de los objetos compartidos (para no contarlos como memoria de una sesión)."""
+        with self._lock:
+            return {id(v) for v in self._entradas.values()}
+
+    def obtener(self, clave):
+        with self._lock:
+            valor = self._entradas.get(clave)
+            if valor is not None:
+                self._entradas.move_to_end(clave)
+            return valor
+
+    def compartir(self, clave, valor):
+        """Guarda valor y devuelve el objeto compartido (el que ya estaba, si otra sesión llegó antes)."""
+        n = tamano(valor)
+        with self._lock:
+            existente = self._entradas.get(clave)
+            if existente is not None:
+                self._entradas.move_to_end(clave)
+                return existente
+            if n > self.max_bytes:
+                return valor
+            self._entradas[clave], self._bytes[clave] = valor, n
+            self.bytes += n
+            while self.bytes > self.max_bytes:
+                viejo, _ = self._entradas.popitem(last=False)
+                self.bytes -= self._bytes.pop(viejo)
+            return valor
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+            self._bytes.clear()
+            self.bytes = 0
+
+
+class CacheResultados:
+    """Caché LRU en memoria; con `almacen` (motor.almacen.AlmacenResultados) los fallos se buscan
+    en disco antes de simular, y lo simulado se guarda ahí para otros procesos y sesiones.
+
+    Con `compartida` (CacheCompartida) los resultados se buscan y se publican también en memoria
+    del proceso: sesiones con las mismas entradas referencian un único DataFrame. `max_bytes`
+    acota lo que referencia esta caché (compartido o no).
+    """
+
+    def __init__(self, motor, max_entradas=256, almacen=None, compartida=None, max_bytes=None):
+        self.motor = motor
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self.almacen = almacen
+        self.compartida = compartida
+        self._entradas = OrderedDict()
+        self._bytes = {}
+        self.bytes = 0
+        self.aciertos = 0
+        self.aciertos_almacen = 0
+        self.calculos = 0
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def bytes_en_memoria(self, vistos):
+        """Bytes de los resultados no contados aún en `vistos` (p.ej. sin los de la caché compartida)."""
+        total = 0
+        for clave, resultado in self._entradas.items():
+            if id(resultado) not in vistos:
+                vistos.add(id(resultado))
+                total += self._bytes[clave]
+        return total
+
+    def limpiar(self):
+        self._entradas.clear()
+        self._bytes.clear()
+        self.bytes = 0
+
+    def recortar(self, max_bytes):
+        """Desaloja los menos usados hasta referenciar a lo más max_bytes; devuelve los bytes liberados."""
+        antes = self.bytes
+        while self._entradas and self.bytes > max_bytes:
+            viejo, _ = self._entradas.popitem(last=False)
+            self.bytes -= self._bytes.pop(viejo)
+        return antes - self.bytes
+
+    def _guardar(self, clave, resultado):
+        if self.compartida is not None:
+            resultado = self.compartida.compartir(clave, resultado)
+        if clave in self._entradas:
+            self.bytes -= self._bytes[clave]  # reemplazo (ver resultado: sin el detalle por subperíodo)
+        self._bytes[clave] = tamano(resultado)
+        self.bytes += self._bytes[clave]
+        self._entradas[clave] = resultado
+        self._entradas.move_to_end(clave)
+        while len(self._entradas) > self.max_entradas or (self.max_bytes is not None and self.bytes > self.max_bytes
+                                                          and len(self._entradas) > 1):
+            viejo, _ = self._entradas.popitem(last=False)
+            self.bytes -= self._bytes.pop(viejo)
+        return resultado
+
+    def _buscar(self, clave):
+        resultado = self._entradas.get(clave)
+        if resultado is not None:
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+        elif self.compartida is not None:
+            resultado = self.compartida.obtener(clave)
+            if resultado is not None:
+                self.aciertos += 1
+                self._guardar(clave, resultado)
+        return resultado
+
+    def resultado(self, data, motor=None):
+        with medir("caché: hash canónico"):
+            clave = hash_canonico(data)
+        resultado = self._buscar(clave)
+        if resultado is not None and not _completo(resultado, data):
+            resultado = None
+            self.aciertos -= 1
+        if resultado is not None:
+            contar("caché: aciertos en memoria")
+        elif self.almacen is not None:
+            with medir("caché: lectura del almacén"):
+                resultado = self.almacen.obtener(clave)
+            if resultado is not None and not _completo(resultado, data):
+                resultado = None
+            if resultado is not None:
+                contar("caché: aciertos en almacén")
+                self.aciertos_almacen += 1
+                resultado = self._guardar(clave, resultado)
+        if resultado is None:
+            resultado = (motor or self.motor)(data)
+            self.calculos += 1
+            resultado = self._guardar(clave, resultado)
+            if self.almacen is not None:
+                self.almacen.guardar(clave, resultado)
+        return resultado
+
+    def resultados_lote(self, lista_escenarios):
+        # Los escenarios sin resultado en caché se simulan juntos con el motor por lotes
+        claves = [hash_canonico(d) for d in lista_escenarios]
+        resultados = [self._buscar(c) for c in claves]
+        pendientes = {}
+        for i, (c, r) in enumerate(zip(claves, resultados)):
+            if r is None: pendientes.setdefault(c, i)
+        nuevos = {}
+        if pendientes and self.almacen is not None:
+            for c, registro in self.almacen.obtener_varios(pendientes).items():
+                nuevos[c] = self._guardar(c, a_resultado(registro))
+                del pendientes[c]
+            self.aciertos_almacen += len(nuevos)
+        if pendientes:
+            idx = list(pendientes.values())
+            lote = calcular_flujo_lote([lista_escenarios[i] for i in idx])
+            for j, i in enumerate(idx):
+                nuevos[claves[i]] = self._guardar(claves[i], resultado_escenario(lote, j))
+            self.calculos += len(idx)
+            if self.almacen is not None:
+                self.almacen.guardar_registros([(claves[i], registro_lote(lote, j)) for j, i in enumerate(idx)])
+        if nuevos:
+            resultados = [r if r is not None else nuevos[c] for c, r in zip(claves, resultados)]
+        return resultados
@@ -0,0 +1,23 @@
+"""Hash canónico de escenarios para reutilizar resultados entre reruns."""
+import hashlib
+import json
+
+
+def _normalizar(obj):
+    # 1 y 1.0 (o una tupla y una lista) describen el mismo escenario
+    if isinstance(obj, bool) or obj is None or isinstance(obj, str):
+        return obj
+    if isinstance(obj, (int, float)):
+        return float(obj)
+    if isinstance(obj, dict):
+        return {str(k): _normalizar(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_normalizar(v) for v in obj]
+    if hasattr(obj, "item"):  # escalares numpy
+        return _normalizar(obj.item())
+    raise TypeError(f"Tipo no serializable en escenario: {type(obj).__name__}")
+
+
+def hash_canonico(obj):
+    texto = json.dumps(_normalizar(obj), sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()
@@ -0,0 +1,185 @@
+"""Consolidación de una cartera de proyectos en un calendario común, con re-agregación incremental."""
+import copy
+import json
+
+import numpy as np
+
+from motor.canonico import hash_canonico
+from motor.lote import calcular_flujo_lote
+from motor.persistencia import MAGIA_GZIP, cargar, desde_sobre, es_sobre
+
+# Curvas que se arrastran después del horizonte del proyecto (saldos) y curvas de flujo (sólo dentro)
+CURVAS_SALDO = ["Deuda Total", "Flujo Acumulado"]
+CURVAS_FLUJO = ["Devengado Total"]
+CURVAS = CURVAS_SALDO + CURVAS_FLUJO
+
+
+def mes_absoluto(inicio):
+    """'2026-03' -> número de mes absoluto; un entero se toma tal cual."""
+    if isinstance(inicio, str):
+        anio, mes = inicio.split("-")[:2]
+        return int(anio) * 12 + int(mes) - 1
+    return int(inicio)
+
+
+def etiqueta_mes(mes_abs):
+    return f"{mes_abs // 12:04d}-{mes_abs % 12 + 1:02d}"
+
+
+def _desde_archivo(sobre, escenario):
+    # Archivo de motor.persistencia: ya migrado y con el hash de cada escenario
+    registros = sobre.get("proyectos") or [{"id": "Proyecto 1", "inicio": 0, **sobre}]
+    return [(p["id"], p["inicio"], p["escenarios"][escenario], p["hashes"][escenario])
+            for p in registros if escenario in p["escenarios"]]
+
+
+def leer_cartera(texto, escenario="Real"):
+    """Lee un JSON ({"proyectos": [...]}, o lista) o JSONL de proyectos, o un archivo de motor.persistencia.
+
+    Cada proyecto: {"id", "inicio": "AAAA-MM", "escenario": {...}} o con "escenarios": {"Real": {...}, ...}.
+    Devuelve una lista de (id, inicio, data), o (id, inicio, data, hash) si el archivo trae los hashes.
+    """
+    if isinstance(texto, bytes):
+        if texto[:2] == MAGIA_GZIP:
+            return _desde_archivo(cargar(texto), escenario)
+        texto = texto.decode("utf-8")
+    try:
+        obj = json.loads(texto)
+        if es_sobre(obj):
+            return _desde_archivo(desde_sobre(obj), escenario)
+        registros = obj.get("proyectos", [obj]) if isinstance(obj, dict) else obj
+    except json.JSONDecodeError:
+        registros = [json.loads(l) for l in texto.splitlines() if l.strip()]
+    proyectos = []
+    for i, p in enumerate(registros):
+        data = p["escenarios"].get(escenario) if "escenarios" in p else p.get("escenario")
+        if data is None:
+            continue
+        proyectos.append((str(p.get("id", f"Proyecto {i + 1}")), p.get("inicio", 0), data))
+    return proyectos
+
+
+def _curvas_lote(lote, i):
+    h = int(lote["horizonte"][i])
+    cols = lote["columnas"]
+    devengado = cols["Devengado Banco"][i, :h + 1] + cols["Devengado KPs"][i, :h + 1] + cols["Devengado Relac."][i, :h + 1]
+    return {
+        "Deuda Total": cols["Deuda Total"][i, :h + 1].copy(),
+        "Flujo Acumulado": cols["Flujo Acumulado"][i, :h + 1].copy(),
+        "Devengado Total": devengado,
+    }
+
+
+class Cartera:
+    """Agregado mensual de muchos proyectos.
+
+    Al editar un proyecto sólo se re-simula ese proyecto: su contribución anterior
+    se resta del agregado y se suma la nueva.
+    """
+
+    def __init__(self):
+        self.proyectos = {}  # id -> {"data", "hash", "inicio", "curvas"}
+        self.origen = None
+        self.agregado = {c: np.zeros(0) for c in CURVAS}
+        self._cola = {c: 0.0 for c in CURVAS_SALDO}
+        self.simulaciones = 0
+
+    def __len__(self):
+        return len(self.proyectos)
+
+    # --- Contribuciones ---
+    def _extension(self, p):
+        return p["inicio"] - self.origen + len(p["curvas"]["Deuda Total"])
+
+    def _redimensionar(self, largo):
+        actual = len(self.agregado["Deuda Total"])
+        if largo > actual:
+            for c in CURVAS:
+                relleno = self._cola.get(c, 0.0)
+                self.agregado[c] = np.concatenate([self.agregado[c], np.full(largo - actual, relleno)])
+        elif largo < actual:
+            for c in CURVAS:
+                self.agregado[c] = self.agregado[c][:largo]
+
+    def _aplicar(self, p, signo):
+        desde = p["inicio"] - self.origen
+        for c in CURVAS:
+            v = p["curvas"][c]
+            hasta = desde + len(v)
+            self.agregado[c][desde:hasta] += signo * v
+            if c in self._cola:
+                # Los saldos quedan en su último valor después del horizonte del proyecto
+                self.agregado[c][hasta:] += signo * v[-1]
+                self._cola[c] += signo * v[-1]
+
+    # --- API ---
+    def cargar(self, proyectos):
+        """Carga (id, inicio, data[, hash]) en bloque: una sola simulación por lotes para todos."""
+        proyectos = list(proyectos)
+        if not proyectos:
+            return
+        lote = calcular_flujo_lote([p[2] for p in proyectos])
+        self.simulaciones += len(proyectos)
+        for i, (pid, inicio, data, *clave) in enumerate(proyectos):
+            self.proyectos[pid] = {"data": data, "hash": clave[0] if clave else hash_canonico(data), "inicio": mes_absoluto(inicio),
+                                   "curvas": _curvas_lote(lote, i)}
+        self.reconstruir()
+
+    def reconstruir(self):
+        """Agregado completo desde cero (también corrige la deriva numérica de muchos parches)."""
+        if not self.proyectos:
+            self.origen = None
+            self.agregado = {c: np.zeros(0) for c in CURVAS}
+            self._cola = {c: 0.0 for c in CURVAS_SALDO}
+            return
+        self.origen = min(p["inicio"] for p in self.proyectos.values())
+        self.agregado = {c: np.zeros(0) for c in CURVAS}
+        self._cola = {c: 0.0 for c in CURVAS_SALDO}
+        self._redimensionar(max(self._extension(p) for p in self.proyectos.values()))
+        for p in self.proyectos.values():
+            self._aplicar(p, +1)
+
+    def actualizar(self, pid, data, inicio=None):
+        """Inserta o reemplaza un proyecto parchando el agregado. Devuelve True si hubo que simular."""
+        anterior = self.proyectos.get(pid)
+        inicio_abs = mes_absoluto(inicio) if inicio is not None else (anterior["inicio"] if anterior else 0)
+        clave = hash_canonico(data)
+        if anterior is not None and anterior["hash"] == clave and anterior["inicio"] == inicio_abs:
+            return False
+        simulado = anterior is None or anterior["hash"] != clave
+        if simulado:
+            curvas = _curvas_lote(calcular_flujo_lote([data]), 0)
+            self.simulaciones += 1
+        else:
+            curvas = anterior["curvas"]
+        nuevo = {"data": copy.deepcopy(data), "hash": clave, "inicio": inicio_abs, "curvas": curvas}
+
+        if self.origen is None or inicio_abs < self.origen:
+            # Un proyecto que parte antes que todos mueve el origen del calendario
+            self.proyectos[pid] = nuevo
+            self.reconstruir()
+            return simulado
+        if anterior is not None:
+            self._aplicar(anterior, -1)
+        self.proyectos[pid] = nuevo
+        self._redimensionar(max(self._extension(p) for p in self.proyectos.values()))
+        self._aplicar(nuevo, +1)
+        return simulado
+
+    def quitar(self, pid):
+        p = self.proyectos.pop(pid, None)
+        if p is None:
+            return
+        if not self.proyectos:
+            self.reconstruir()
+            return
+        self._aplicar(p, -1)
+        if p["inicio"] == self.origen:
+            self.reconstruir()
+        else:
+            self._redimensionar(max(self._extension(q) for q in self.proyectos.values()))
+
+    def meses(self):
+        if self.origen is None:
+            return []
+        return [etiqueta_mes(self.origen + i) for i in range(len(self.agregado["Deuda Total"]))]
@@ -0,0 +1,212 @@
+"""Evaluación por lotes desde la línea de comandos.
+
+    python -m motor proyectos/ --formato csv > resultados.csv
+    python -m motor proyectos.jsonl --formato jsonl --mensual -o flujos.jsonl
+
+La entrada es un directorio de archivos .json o un archivo .jsonl. Cada registro
+es un escenario con el esquema de get_default_config, o {"id": ..., "escenario": {...}}.
+Los resultados se escriben en el mismo orden de entrada a medida que se calculan.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from motor.almacen import AlmacenResultados, registro_lote
+from motor.canonico import hash_canonico
+from motor.flujo import get_default_config
+from motor.lote import COLUMNAS, calcular_flujo_lote
+
+CAMPOS_RESUMEN = ["id", "utilidad", "roi", "costo_financiero_total", "int_banco", "int_kps", "int_relacionada",
+                  "peak_deuda", "break_even", "horizonte", "error"]
+
+
+def leer_registros(ruta):
+    """Genera (id, escenario) sin cargar toda la entrada en memoria.
+
+    Un archivo o una línea ilegible no corta la lectura: su escenario es un ValueError
+    con la ruta o el número de línea, y evaluar_bloque lo escribe como fila de error.
+    """
+    if os.path.isdir(ruta):
+        nombres = sorted(e.name for e in os.scandir(ruta) if e.is_file() and e.name.endswith(".json"))
+        for nombre in nombres:
+            camino = os.path.join(ruta, nombre)
+            try:
+                with open(camino, encoding="utf-8") as f:
+                    obj = json.load(f)
+                yield _registro(obj, os.path.splitext(nombre)[0])
+            except (OSError, ValueError) as e:
+                yield os.path.splitext(nombre)[0], ValueError(f"{camino}: {e}")
+    else:
+        with open(ruta, encoding="utf-8") as f:
+            for n_linea, linea in enumerate(f, start=1):
+                if linea.strip():
+                    try:
+                        yield _registro(json.loads(linea), str(n_linea))
+                    except ValueError as e:
+                        yield str(n_linea), ValueError(f"línea {n_linea}: {e}")
+
+
+def _registro(obj, id_defecto):
+    if not isinstance(obj, dict):
+        raise ValueError(f"se esperaba un objeto JSON, no {type(obj).__name__}")
+    if "escenario" in obj:
+        return str(obj.get("id", id_defecto)), obj["escenario"]
+    return str(obj.get("id", id_defecto)), obj
+
+
+def _completar(data):
+    # Claves ausentes toman el valor por defecto del esquema
+    return {**get_default_config("Real"), **data}
+
+
+_ALMACENES = {}
+
+
+def _almacen(ruta):
+    # Uno por proceso: cada worker abre su propia conexión al mismo archivo
+    if ruta not in _ALMACENES:
+        _ALMACENES[ruta] = AlmacenResultados(ruta)
+    return _ALMACENES[ruta]
+
+
+def _fila(rid, registro, mensual):
+    h = len(registro["columnas"]["Mes"]) - 1
+    det = registro["detalles_fin"]
+    fila = {
+        "id": rid, "utilidad": registro["utilidad"], "roi": registro["roi"],
+        "costo_financiero_total": registro["costo_financiero_total"],
+        "int_banco": det["banco"], "int_kps": det["kps"], "int_relacionada": det["relacionada"],
+        "peak_deuda": registro["peak_deuda"], "break_even": registro["break_even"], "horizonte": h,
+    }
+    if mensual:
+        fila["flujo"] = {c: np.nan_to_num(registro["columnas"][c], nan=0.0).tolist() for c in COLUMNAS}
+        fila["flujo"]["Mes"] = list(range(h + 1))
+    return fila
+
+
+def evaluar_bloque(registros, mensual=False, almacen=None):
+    """Evalúa un bloque de (id, escenario) con el motor por lotes; devuelve filas listas para escribir.
+
+    Con `almacen` (ruta de un motor.almacen) los escenarios ya simulados se leen de ahí y los
+    nuevos se guardan.
+    """
+    # Una fila por registro, en el orden de entrada: los errores quedan en su lugar
+    registros = list(registros)
+    filas = [None] * len(registros)
+    validos = []
+    for n, (rid, data) in enumerate(registros):
+        if isinstance(data, Exception):  # registro ilegible (ver leer_registros)
+            filas[n] = {"id": rid, "error": str(data)}
+            continue
+        try:
+            validos.append((n, rid, _completar(data)))
+        except (TypeError, ValueError) as e:
+            filas[n] = {"id": rid, "error": str(e)}
+    guardados, claves = {}, []
+    if almacen and validos:
+        claves = [hash_canonico(d) for _, _, d in validos]
+        guardados = _almacen(almacen).obtener_varios(claves)
+    pendientes = [i for i in range(len(validos)) if not claves or claves[i] not in guardados]
+    try:
+        lote = calcular_flujo_lote([validos[i][2] for i in pendientes]) if pendientes else None
+    except (KeyError, TypeError, ValueError) as e:
+        # Un escenario malformado no debe botar el bloque completo: se reintenta uno a uno
+        if len(validos) == 1:
+            n, rid, _ = validos[0]
+            filas[n] = {"id": rid, "error": f"{type(e).__name__}: {e}"}
+        else:
+            for n, rid, data in validos:
+                filas[n] = evaluar_bloque([(rid, data)], mensual, almacen)[0]
+        return filas
+    nuevos = {i: registro_lote(lote, j) for j, i in enumerate(pendientes)}
+    if almacen and nuevos:
+        _almacen(almacen).guardar_registros([(claves[i], r) for i, r in nuevos.items()])
+    for i, (n, rid, _) in enumerate(validos):
+        filas[n] = _fila(rid, nuevos[i] if i in nuevos else guardados[claves[i]], mensual)
+    return filas
+
+
+def _bloques(registros, tam):
+    bloque = []
+    for r in registros:
+        bloque.append(r)
+        if len(bloque) >= tam:
+            yield bloque
+            bloque = []
+    if bloque:
+        yield bloque
+
+
+def evaluar_en_paralelo(registros, workers=None, tam_bloque=32, mensual=False, almacen=None):
+    """Evalúa en un pool de procesos con a lo sumo 2 bloques en vuelo por worker (memoria acotada)."""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for bloque in _bloques(registros, tam_bloque):
+            yield from evaluar_bloque(bloque, mensual, almacen)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        en_vuelo = deque()
+        for bloque in _bloques(registros, tam_bloque):
+            en_vuelo.append(pool.submit(evaluar_bloque, bloque, mensual, almacen))
+            if len(en_vuelo) >= 2 * workers:
+                yield from en_vuelo.popleft().result()
+        while en_vuelo:
+            yield from en_vuelo.popleft().result()
+
+
+def _escribir_csv(filas, salida, mensual):
+    if mensual:
+        escritor = csv.writer(salida)
+        escritor.writerow(["id"] + COLUMNAS)
+        for fila in filas:
+            if "flujo" not in fila:
+                print(f"[{fila['id']}] {fila.get('error')}", file=sys.stderr)
+                continue
+            flujo = fila["flujo"]
+            for j in range(len(flujo["Mes"])):
+                escritor.writerow([fila["id"]] + [flujo[c][j] for c in COLUMNAS])
+    else:
+        escritor = csv.DictWriter(salida, fieldnames=CAMPOS_RESUMEN, extrasaction="ignore")
+        escritor.writeheader()
+        for fila in filas:
+            escritor.writerow(fila)
+
+
+def _escribir_jsonl(filas, salida):
+    for fila in filas:
+        salida.write(json.dumps(fila, ensure_ascii=False) + "\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m motor", description="Evalúa escenarios de proyectos en lote.")
+    parser.add_argument("entrada", help="Directorio con archivos .json o archivo .jsonl")
+    parser.add_argument("--formato", choices=["csv", "jsonl"], default="csv")
+    parser.add_argument("-o", "--salida", help="Archivo de salida (por defecto stdout)")
+    parser.add_argument("--mensual", action="store_true", help="Incluye el flujo mensual completo")
+    parser.add_argument("--workers", type=int, default=None, help="Procesos (por defecto, todos los núcleos)")
+    parser.add_argument("--bloque", type=int, default=32, help="Escenarios por tarea")
+    parser.add_argument("--almacen", default=os.environ.get("GASTO_ALMACEN"),
+                        help="Archivo SQLite de resultados compartido (por defecto $GASTO_ALMACEN; sin él no se usa)")
+    args = parser.parse_args(argv)
+
+    filas = evaluar_en_paralelo(leer_registros(args.entrada), args.workers, args.bloque, args.mensual, args.almacen)
+    salida = open(args.salida, "w", encoding="utf-8", newline="") if args.salida else sys.stdout
+    try:
+        if args.formato == "csv":
+            _escribir_csv(filas, salida, args.mensual)
+        else:
+            _escribir_jsonl(filas, salida)
+    finally:
+        if salida is not sys.stdout:
+            salida.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
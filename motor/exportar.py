@@ -0,0 +1,132 @@
+"""Libro Excel con todos los escenarios, hitos, sensibilidad y entradas.
+
+Se escribe con xlsxwriter en modo constant_memory: cada fila se vuelca a disco apenas
+se completa, así un libro de varios escenarios a 600 meses no infla la memoria.
+"""
+import io
+import json
+import math
+
+from motor.lote import COLUMNAS
+
+MIME_XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+CLAVES_RESUMEN = [
+    ("Utilidad (UF)", lambda r: r["utilidad"]), ("ROI (%)", lambda r: r["roi"]),
+    ("Costo Financiero (UF)", lambda r: r["costo_financiero_total"]),
+    ("Int. Banco (UF)", lambda r: r["detalles_fin"]["banco"]), ("Int. KPs (UF)", lambda r: r["detalles_fin"]["kps"]),
+    ("Int. Relacionadas (UF)", lambda r: r["detalles_fin"]["relacionada"]),
+    ("Peak Deuda (UF)", lambda r: r["peak_deuda"]), ("Mes Flujo Positivo", lambda r: r["break_even"]),
+]
+
+
+def _numero(hoja, fila, col, v, formato):
+    if v is None or (isinstance(v, float) and not math.isfinite(v)):
+        hoja.write_blank(fila, col, None, formato)
+    elif isinstance(v, (bool, str)):
+        hoja.write(fila, col, v)
+    else:
+        hoja.write_number(fila, col, float(v), formato)
+
+
+def _filas_tabla(valor):
+    """Lista de dicts (tramos, plan de ventas) o libro en columnas -> filas; None si no es tabla."""
+    if isinstance(valor, list) and valor and all(isinstance(v, dict) for v in valor):
+        return valor
+    if isinstance(valor, dict) and valor and all(isinstance(v, list) for v in valor.values()):
+        return [dict(zip(valor, fila)) for fila in zip(*valor.values())]
+    return None
+
+
+def _celda(v):
+    return json.dumps(v) if isinstance(v, (list, dict)) else v
+
+
+def _tabla(hoja, fila, encabezados, filas, formatos, f_titulo):
+    """Escribe encabezado + filas desde `fila`; devuelve la siguiente fila libre."""
+    hoja.write_row(fila, 0, encabezados, f_titulo)
+    for valores in filas:
+        fila += 1
+        for j, v in enumerate(valores):
+            _numero(hoja, fila, j, v, formatos.get(encabezados[j]))
+    return fila + 2
+
+
+def libro_excel(resultados, entradas, hitos=None, sensibilidad=None):
+    """Bytes de un .xlsx con una hoja Resumen, una por escenario, Hitos, Sensibilidad y Entradas.
+
+    resultados: {escenario: resultado de calcular_flujo}; entradas: {escenario: data};
+    hitos: filas de tabla_hitos; sensibilidad: {"titulo", "x", "y", "z"} (z con forma len(y) x len(x)).
+    """
+    import xlsxwriter
+
+    salida = io.BytesIO()
+    libro = xlsxwriter.Workbook(salida, {"constant_memory": True})
+    f_titulo = libro.add_format({"bold": True, "bg_color": "#1E3A8A", "font_color": "#FFFFFF"})
+    f_uf = libro.add_format({"num_format": "#,##0.00"})
+    f_entero = libro.add_format({"num_format": "0"})
+    f_pct = libro.add_format({"num_format": "0.0"})
+
+    # --- Resumen ---
+    hoja = libro.add_worksheet("Resumen")
+    hoja.set_column(0, 0, 26)
+    hoja.set_column(1, len(resultados), 18)
+    hoja.write_row(0, 0, ["Métrica"] + list(resultados), f_titulo)
+    for i, (etiqueta, extraer) in enumerate(CLAVES_RESUMEN, start=1):
+        hoja.write(i, 0, etiqueta)
+        formato = f_pct if "%" in etiqueta else (f_entero if etiqueta.startswith("Mes") else f_uf)
+        for j, r in enumerate(resultados.values(), start=1):
+            _numero(hoja, i, j, extraer(r), formato)
+
+    # --- Un flujo mensual por escenario ---
+    for nombre, r in resultados.items():
+        hoja = libro.add_worksheet(nombre[:31])
+        hoja.set_column(0, 0, 8)
+        hoja.set_column(1, len(COLUMNAS) - 1, 16)
+        hoja.freeze_panes(1, 1)
+        hoja.write_row(0, 0, COLUMNAS, f_titulo)
+        columnas = [r["df"][c].tolist() for c in COLUMNAS]
+        for i in range(len(columnas[0])):
+            hoja.write_number(i + 1, 0, int(columnas[0][i]), f_entero)
+            for j in range(1, len(COLUMNAS)):
+                _numero(hoja, i + 1, j, columnas[j][i], f_uf)
+
+    # --- Hitos ---
+    if hitos:
+        hoja = libro.add_worksheet("Hitos")
+        hoja.set_column(0, 0, 32)
+        hoja.set_column(1, 5, 16)
+        encabezados = list(hitos[0])
+        formatos = {c: f_uf for c in encabezados}
+        formatos.update({"Mes": f_entero, "% del Total": f_pct})
+        _tabla(hoja, 0, encabezados, [list(h.values()) for h in hitos], formatos, f_titulo)
+
+    # --- Matriz de sensibilidad (corte 2D mostrado en el dashboard) ---
+    if sensibilidad is not None:
+        hoja = libro.add_worksheet("Sensibilidad")
+        hoja.set_column(0, len(sensibilidad["x"]), 20)
+        hoja.write(0, 0, sensibilidad["titulo"], f_titulo)
+        hoja.write_row(1, 1, list(sensibilidad["x"]), f_titulo)
+        for i, (etiqueta, fila_z) in enumerate(zip(sensibilidad["y"], sensibilidad["z"]), start=2):
+            hoja.write(i, 0, etiqueta, f_titulo)
+            for j, v in enumerate(fila_z, start=1):
+                _numero(hoja, i, j, float(v), f_uf)
+
+    # --- Entradas: escalares lado a lado y listas (tramos, ventas, libro) como tablas ---
+    hoja = libro.add_worksheet("Entradas")
+    hoja.set_column(0, 0, 34)
+    hoja.set_column(1, max(6, len(entradas)), 16)
+    claves = list(dict.fromkeys(k for d in entradas.values() for k in d))
+    escalares = [k for k in claves if not any(_filas_tabla(d.get(k)) for d in entradas.values())]
+    filas = [[k] + [_celda(d.get(k)) for d in entradas.values()] for k in escalares]
+    fila = _tabla(hoja, 0, ["Parámetro"] + list(entradas), filas, {}, f_titulo)
+    for nombre, d in entradas.items():
+        for clave, valor in d.items():
+            items = _filas_tabla(valor)
+            if not items:
+                continue
+            hoja.write(fila, 0, f"{clave} — {nombre}", f_titulo)
+            encabezados = list(dict.fromkeys(k for item in items for k in item))
+            fila = _tabla(hoja, fila + 1, encabezados, [[item.get(k) for k in encabezados] for item in items], {}, f_titulo)
+
+    libro.close()
+    return salida.getvalue()
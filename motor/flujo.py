@@ -0,0 +1,483 @@
+"""Motor de referencia: simulación mensual del flujo de caja de un escenario (sin Streamlit)."""
+import time
+
+import numpy as np
+
+from motor import perfil
+from motor.tramos import LibroTramos
+from motor.ventas import calendario_denso, eventos_recuperos
+
+# Subir al cambiar cualquier resultado del motor: invalida lo guardado en motor.almacen
+VERSION_MOTOR = 2
+
+# Formas de salida de calcular_flujo (ver su docstring)
+MODOS = ("df", "columnas", "resumen")
+
+# Paso de tiempo del escenario ("paso_tiempo") -> subperíodos por mes, en convención 30/360:
+# "Semanal" son 4 semanas de tesorería de 7,5 días y "Diario" 30 días por mes
+PASOS_TIEMPO = {"Mensual": 1, "Semanal": 4, "Diario": 30}
+
+# Columnas del flujo mensual, en el orden del DataFrame (la fila del mes 0 no trae las deudas por fuente)
+COLUMNAS = [
+    "Mes", "Deuda Total", "Ingresos", "Ingresos Deuda", "Otros Costos (Op)",
+    "Int. Banco", "Int. KPs", "Int. Relac.",
+    "Devengado Banco", "Devengado KPs", "Devengado Relac.",
+    "Pago Intereses Total", "Pago Capital",
+    "Inversión (Equity)", "Flujo Neto", "Flujo Acumulado",
+    "Deuda Banco", "Deuda KPs", "Deuda Relac.",
+]
+
+
+def get_default_config(type_scen):
+    if type_scen == "Optimista":
+        venta, tasa_uf, constr = 155000, 5.5, 68000
+        inflacion, tasa_clp = 3.0, 9.0
+        otros_costos_ini = 2500.0
+    elif type_scen == "Pesimista":
+        venta, tasa_uf, constr = 130000, 8.0, 75000
+        inflacion, tasa_clp = 6.0, 14.0
+        otros_costos_ini = 4000.0
+    else: # Real
+        venta, tasa_uf, constr = 140000, 6.5, 70000
+        inflacion, tasa_clp = 4.0, 11.0
+        otros_costos_ini = 3000.0
+        
+    return {
+        "valor_terreno": 0.0,
+        "pct_fin_terreno": 0.0,
+        "valor_contrato": 0.0,
+        "pct_fin_construccion": 0.0,
+        "duracion_obra": 0, 
+        "mes_inicio_obra": 0,
+        "pct_avance_inicial": 0.0, 
+        "mes_recepcion": 0,
+        "saldo_inicial_uf": 0.0,
+        "intereses_previos_uf": 0.0,
+        "aporte_socios": 0.0,
+        "total_otros_costos_inicial": 0.0,
+        "otros_costos_mensuales": 0.0,
+        "otros_costos_pagados_anteriores": 0.0,
+        "rango_pago_terreno": [1, 60], 
+        "prioridad_terreno": False,      
+        "tasa_anual_uf": 0.0,
+        "pct_deuda_pesos": 0.0, 
+        "tasa_anual_clp": 0.0, 
+        "inflacion_anual": 0.0,
+        "pagar_intereses_construccion": False,
+        "lista_relacionadas": [], 
+        "lista_kps": [], 
+        "valor_venta_total": 0.0,
+        "plan_ventas": [] 
+    }
+
+
+# Columnas que son saldos: al agregar subperíodos a meses se toma el valor al cierre (el resto se suma)
+COLUMNAS_SALDO = {"Mes", "Deuda Total", "Flujo Acumulado", "Deuda Banco", "Deuda KPs", "Deuda Relac."}
+
+
+def subperiodos(data):
+    """Subperíodos por mes del escenario (1 si es mensual o no indica paso)."""
+    paso = data.get("paso_tiempo", "Mensual")
+    if paso not in PASOS_TIEMPO:
+        raise ValueError(f"Paso de tiempo desconocido: {paso!r} (se espera uno de {list(PASOS_TIEMPO)})")
+    return PASOS_TIEMPO[paso]
+
+
+def _preparar(data):
+    # Parámetros del escenario que el ciclo mensual sólo lee
+    P = {}
+    P["v_terr"] = data["valor_terreno"]
+    P["v_cont"] = data["valor_contrato"]
+    P["v_otros_inicial"] = data.get("total_otros_costos_inicial", 0.0)
+    P["v_otros_mensual"] = data.get("otros_costos_mensuales", 0.0)
+    P["v_otros_anteriores"] = data.get("otros_costos_pagados_anteriores", 0.0)
+    P["v_aporte_socios"] = data.get("aporte_socios", 0.0)
+    P["valor_venta_total"] = data["valor_venta_total"]
+
+    duracion = int(data["duracion_obra"])
+    P["duracion"] = duracion
+    P["inicio_obra"] = int(data.get("mes_inicio_obra", 0))
+    P["pct_avance_inicial"] = data.get("pct_avance_inicial", 0.0) / 100.0
+    P["recepcion"] = int(data["mes_recepcion"])
+    P["fin_obra"] = (P["inicio_obra"] + duracion - 1) if duracion > 0 else -1
+
+    P["saldo_inicial"] = data.get("saldo_inicial_uf", 0)
+    P["pagar_int_const"] = data.get("pagar_intereses_construccion", False)
+
+    P["pct_clp"] = data["pct_deuda_pesos"] / 100.0
+    P["pct_uf"] = 1.0 - P["pct_clp"]
+    P["tasa_mensual_uf"] = (data["tasa_anual_uf"]/100) / 12
+    P["tasa_mensual_clp"] = (data["tasa_anual_clp"]/100) / 12
+    P["inflacion_mensual"] = ((1 + data["inflacion_anual"]/100)**(1/12)) - 1
+
+    P["pct_fin_terr"] = data["pct_fin_terreno"]/100
+    P["pct_fin_const"] = data["pct_fin_construccion"]/100
+
+    P["lista_relacionadas"] = data.get("lista_relacionadas", [])
+    P["lista_kps"] = data.get("lista_kps", [])
+
+    meses_venta, montos_venta, P["ultimo_mes_venta"], escala = eventos_recuperos(data)
+
+    horizonte = P["recepcion"] + 12
+    if len(meses_venta):
+        horizonte = max(horizonte, int(meses_venta.max()) + 6)
+    horizonte = max(horizonte, P["fin_obra"] + 6)
+    if horizonte < 12: horizonte = 12
+    # Recupero, giro de obra y gasto operativo de cada mes precalculados: el ciclo los lee por índice
+    P["ingresos_mes"] = (calendario_denso(meses_venta, montos_venta, horizonte) * escala).tolist()
+    P["costo_obra"] = [None] * (horizonte + 1)  # None: mes sin giro de obra
+    if duracion > 0:
+        for m in range(max(1, P["inicio_obra"]), min(P["fin_obra"], horizonte) + 1):
+            if m == P["inicio_obra"]:
+                P["costo_obra"][m] = P["v_cont"] if duracion == 1 else P["v_cont"] * P["pct_avance_inicial"]
+            else:
+                remanente = P["v_cont"] * (1.0 - P["pct_avance_inicial"])
+                P["costo_obra"][m] = remanente / (duracion - 1) if duracion - 1 > 0 else 0
+    P["gasto_op"] = [P["v_otros_mensual"] if m <= P["recepcion"] + 6 else 0 for m in range(horizonte + 1)]
+    P["horizonte"] = horizonte
+    P["subperiodos"] = k = subperiodos(data)
+    if k > 1:
+        _a_subperiodos(P, k)
+    P["perfil"] = perfil.actual()  # None salvo con el perfil de tiempos activo (motor.perfil)
+    return P
+
+
+def _a_subperiodos(P, k):
+    # Lleva el calendario mensual de P a k subperíodos por mes. El paso p (p >= 1) pertenece al mes
+    # ceil(p / k); tasas e inflación se componen a la equivalente del subperíodo, giros de obra y
+    # gastos se reparten en partes iguales dentro del mes y los recuperos (y el cierre) caen en el
+    # último subperíodo, como en el ciclo mensual, donde entran después de devengar el mes completo
+    horizonte = P["horizonte"]
+    for clave in ("tasa_mensual_uf", "tasa_mensual_clp", "inflacion_mensual"):
+        P[clave] = (1 + P[clave]) ** (1 / k) - 1
+    ingresos = [0.0] * (horizonte * k + 1)
+    ingresos[k::k] = P["ingresos_mes"][1:]
+    P["ingresos_mes"] = ingresos
+    P["costo_obra"] = [None] + [c if c is None else c / k for c in P["costo_obra"][1:] for _ in range(k)]
+    P["gasto_op"] = [0] + [g / k for g in P["gasto_op"][1:] for _ in range(k)]
+    if P["ultimo_mes_venta"] > 0:
+        P["ultimo_mes_venta"] *= k
+    P["horizonte"] = horizonte * k
+
+
+def _estado_inicial(P):
+    # Estado completo de la simulación al cierre del mes 0, y la fila del mes 0
+    deuda_terr_total = P["v_terr"] * P["pct_fin_terr"]
+    E = {
+        "saldo_terr_uf": deuda_terr_total * P["pct_uf"],
+        "saldo_terr_clp_nominal": deuda_terr_total * P["pct_clp"],
+        "saldo_const_uf": P["saldo_inicial"] * P["pct_uf"],
+        "saldo_const_clp_nominal": P["saldo_inicial"] * P["pct_clp"],
+    }
+
+    k = P["subperiodos"]
+    E["rel_activos"] = LibroTramos(P["lista_relacionadas"], "Al Final", otra_es_al_final=True, subperiodos=k)
+    E["kps_activos"] = LibroTramos(P["lista_kps"], "Mensual", otra_es_al_final=False, subperiodos=k)
+
+    equity_terreno = P["v_terr"] * (1 - P["pct_fin_terr"])
+    inversion_inicial = equity_terreno + P["v_otros_inicial"]
+    ingreso_deuda_mes_0 = E["rel_activos"].desembolso_mes_0(E["kps_activos"].desembolso_mes_0())
+            
+    flujo_neto_ini = -inversion_inicial + ingreso_deuda_mes_0 + P["v_aporte_socios"]
+    
+    saldo_total_rel = E["rel_activos"].saldo_total
+    saldo_total_kps = E["kps_activos"].saldo_total
+
+    deuda_total_0 = (E["saldo_const_uf"] + E["saldo_terr_uf"]) + (E["saldo_const_clp_nominal"] + E["saldo_terr_clp_nominal"]) + saldo_total_rel + saldo_total_kps
+    # Fila del mes 0 en el orden de COLUMNAS; las deudas por fuente quedan en NaN
+    fila_0 = (0, deuda_total_0, 0.0, ingreso_deuda_mes_0, 0.0,
+              0.0, 0.0, 0.0,
+              0.0, 0.0, 0.0,
+              0.0, 0.0,
+              inversion_inicial, flujo_neto_ini, flujo_neto_ini,
+              np.nan, np.nan, np.nan)
+    
+    E["interes_acum_banco_total"] = 0 
+    E["interes_acum_kps"] = 0
+    E["interes_acum_relacionada"] = 0
+    E["total_otros_costos_operativos"] = 0 
+    
+    E["factor_uf"] = 1.0 
+    E["acumulado_actual"] = flujo_neto_ini
+    E["mes_break_even"] = 0 if flujo_neto_ini >= 0 else None
+    # Máximo de deuda y mínimo del acumulado al paso: el modo resumen no guarda filas
+    E["peak_deuda"] = deuda_total_0
+    E["min_acumulado"] = flujo_neto_ini
+    return E, fila_0
+
+
+def _matriz(P, fila_0):
+    """Filas preasignadas (paso x COLUMNAS) que _avanzar_mes llena, con la del mes 0 ya escrita."""
+    filas = np.empty((P["horizonte"] + 1, len(COLUMNAS)))
+    filas[0] = fila_0
+    return filas
+
+
+def copiar_estado(E):
+    """Copia independiente del estado (los libros de tramos son mutables)."""
+    C = dict(E)
+    C["rel_activos"] = E["rel_activos"].copia()
+    C["kps_activos"] = E["kps_activos"].copia()
+    return C
+
+
+def _avanzar_mes(P, E, m, filas=None):
+    # Simula el mes m sobre el estado E (lo modifica) y escribe su fila en filas[m] (ver _matriz;
+    # sin filas sólo se llevan el peak de deuda y el mínimo acumulado); con subperíodos, m es
+    # el paso y P trae tasas y calendario por paso (ver _a_subperiodos)
+    saldo_terr_uf = E["saldo_terr_uf"]
+    saldo_terr_clp_nominal = E["saldo_terr_clp_nominal"]
+    saldo_const_uf = E["saldo_const_uf"]
+    saldo_const_clp_nominal = E["saldo_const_clp_nominal"]
+    rel_activos = E["rel_activos"]
+    kps_activos = E["kps_activos"]
+    tasa_mensual_uf = P["tasa_mensual_uf"]
+    tasa_mensual_clp = P["tasa_mensual_clp"]
+    pct_uf = P["pct_uf"]
+    pct_clp = P["pct_clp"]
+    pagar_int_const = P["pagar_int_const"]
+    pct_fin_const = P["pct_fin_const"]
+    ingresos_mes = P["ingresos_mes"]
+    ultimo_mes_venta = P["ultimo_mes_venta"]
+    interes_acum_banco_total = E["interes_acum_banco_total"]
+    interes_acum_kps = E["interes_acum_kps"]
+    interes_acum_relacionada = E["interes_acum_relacionada"]
+    total_otros_costos_operativos = E["total_otros_costos_operativos"]
+    acumulado_actual = E["acumulado_actual"]
+    mes_break_even = E["mes_break_even"]
+
+    E["factor_uf"] *= (1 + P["inflacion_mensual"])
+    factor_uf = E["factor_uf"]
+        
+    ingreso_deuda_este_mes = kps_activos.activar(m, rel_activos.activar(m))
+    
+    int_uf_mes = (saldo_const_uf + saldo_terr_uf) * tasa_mensual_uf
+    if m == 1: saldo_terr_clp_nominal *= 1.0 
+    int_clp_nom_mes = (saldo_const_clp_nominal + saldo_terr_clp_nominal) * tasa_mensual_clp
+    int_banco_mes_en_uf = int_uf_mes + (int_clp_nom_mes / factor_uf)
+    
+    saldo_const_uf += int_uf_mes
+    saldo_const_clp_nominal += int_clp_nom_mes
+    interes_acum_banco_total += int_banco_mes_en_uf
+
+    int_kps_generado_mes, total_interes_kp_exigible_hoy = kps_activos.devengar(m)
+    interes_acum_kps += int_kps_generado_mes
+    
+    int_rel_mes, total_interes_rel_exigible_hoy = rel_activos.devengar(m)
+    interes_acum_relacionada += int_rel_mes
+
+    egreso_equity_const = 0
+    costo_mes_total = P["costo_obra"][m]
+    if costo_mes_total is not None:
+        giro_banco = costo_mes_total * pct_fin_const
+        egreso_equity_const = costo_mes_total - giro_banco 
+        saldo_const_uf += giro_banco * pct_uf
+        saldo_const_clp_nominal += (giro_banco * pct_clp) * factor_uf 
+    
+    ingreso_uf = ingresos_mes[m]
+    gasto_operativo_mes = P["gasto_op"][m]
+    total_otros_costos_operativos += gasto_operativo_mes
+    
+    flujo_operativo = ingreso_uf + ingreso_deuda_este_mes - gasto_operativo_mes
+    dinero_para_deuda = max(0.0, flujo_operativo)
+    
+    if pagar_int_const:
+        if dinero_para_deuda < int_banco_mes_en_uf:
+            deficit = int_banco_mes_en_uf - dinero_para_deuda
+            dinero_para_deuda += deficit 
+            egreso_equity_const += deficit 
+    
+    perfil_activo = P["perfil"]
+    if perfil_activo is not None:
+        t_cascada = time.perf_counter()
+    es_mes_cierre = (m == ultimo_mes_venta)
+    
+    real_const_uf = saldo_const_uf + (saldo_const_clp_nominal / factor_uf)
+    real_terr_uf = saldo_terr_uf + (saldo_terr_clp_nominal / factor_uf)
+    deuda_banco_total = real_const_uf + real_terr_uf
+    
+    pago_banco_total = 0
+    pago_banco_interes = 0
+    pago_banco_capital = 0
+
+    if deuda_banco_total > 0:
+        if es_mes_cierre:
+            monto_a_pagar_banco = deuda_banco_total
+        else:
+            monto_a_pagar_banco = min(deuda_banco_total, dinero_para_deuda) if dinero_para_deuda > 0 else 0
+        
+        if monto_a_pagar_banco > 0:
+            pago_banco_interes = min(monto_a_pagar_banco, int_banco_mes_en_uf)
+            if pagar_int_const and pago_banco_interes < int_banco_mes_en_uf and monto_a_pagar_banco >= int_banco_mes_en_uf:
+                pago_banco_interes = int_banco_mes_en_uf
+
+            pago_banco_capital = monto_a_pagar_banco - pago_banco_interes
+            
+            p_terr, p_const = 0, 0
+            if pago_banco_capital > 0:
+                p_terr = min(real_terr_uf, pago_banco_capital)
+                p_const = pago_banco_capital - p_terr
+
+            if p_terr > 0 and real_terr_uf > 0:
+                prop = p_terr / real_terr_uf
+                if es_mes_cierre and p_terr >= real_terr_uf - 0.1: 
+                     saldo_terr_uf = 0
+                     saldo_terr_clp_nominal = 0
+                else:
+                    saldo_terr_uf -= (saldo_terr_uf * prop)
+                    saldo_terr_clp_nominal -= (saldo_terr_clp_nominal * prop)
+
+            if p_const > 0 and real_const_uf > 0:
+                prop = p_const / real_const_uf
+                if es_mes_cierre and p_const >= real_const_uf - 0.1:
+                    saldo_const_uf = 0
+                    saldo_const_clp_nominal = 0
+                else:
+                    saldo_const_uf -= (saldo_const_uf * prop)
+                    saldo_const_clp_nominal -= (saldo_const_clp_nominal * prop)
+            
+            pago_banco_total = monto_a_pagar_banco
+            dinero_para_deuda -= pago_banco_total
+
+    dinero_para_deuda, pago_kps_interes, pago_kps_total = kps_activos.pagar(m, dinero_para_deuda, total_interes_kp_exigible_hoy, es_mes_cierre)
+    dinero_para_deuda, pago_rel_interes, pago_rel_total = rel_activos.pagar(m, dinero_para_deuda, total_interes_rel_exigible_hoy, es_mes_cierre)
+    if perfil_activo is not None:
+        perfil_activo.sumar("motor: cascada de deuda", time.perf_counter() - t_cascada)
+
+    total_pagado_intereses = pago_banco_interes + pago_kps_interes + pago_rel_interes
+    total_pagado_capital = (pago_banco_total + pago_kps_total + pago_rel_total) - total_pagado_intereses
+    flujo_neto_mes = dinero_para_deuda - egreso_equity_const 
+    if flujo_operativo < 0:
+        flujo_neto_mes = flujo_operativo - egreso_equity_const
+
+    acumulado_actual += flujo_neto_mes
+    saldo_kps_reporte = kps_activos.saldo_total
+    saldo_rel_reporte = rel_activos.saldo_total
+    
+    if acumulado_actual >= 0 and mes_break_even is None:
+        mes_break_even = m
+
+    deuda_banco_reporte = (saldo_const_uf + saldo_terr_uf) + ((saldo_const_clp_nominal + saldo_terr_clp_nominal) / factor_uf)
+    deuda_total = deuda_banco_reporte + saldo_kps_reporte + saldo_rel_reporte
+    if deuda_total > E["peak_deuda"]:
+        E["peak_deuda"] = deuda_total
+    if acumulado_actual < E["min_acumulado"]:
+        E["min_acumulado"] = acumulado_actual
+
+    E["saldo_terr_uf"] = saldo_terr_uf
+    E["saldo_terr_clp_nominal"] = saldo_terr_clp_nominal
+    E["saldo_const_uf"] = saldo_const_uf
+    E["saldo_const_clp_nominal"] = saldo_const_clp_nominal
+    E["interes_acum_banco_total"] = interes_acum_banco_total
+    E["interes_acum_kps"] = interes_acum_kps
+    E["interes_acum_relacionada"] = interes_acum_relacionada
+    E["total_otros_costos_operativos"] = total_otros_costos_operativos
+    E["acumulado_actual"] = acumulado_actual
+    E["mes_break_even"] = mes_break_even
+
+    if filas is not None:
+        # En el orden de COLUMNAS
+        filas[m] = (m, deuda_total, ingreso_uf, ingreso_deuda_este_mes, gasto_operativo_mes,
+                    pago_banco_interes, pago_kps_interes, pago_rel_interes,
+                    int_banco_mes_en_uf, int_kps_generado_mes, int_rel_mes,
+                    total_pagado_intereses, total_pagado_capital,
+                    egreso_equity_const, flujo_neto_mes, acumulado_actual,
+                    deuda_banco_reporte, saldo_kps_reporte, saldo_rel_reporte)
+
+
+def _a_meses(filas, k):
+    # Filas por subperíodo -> (mes x COLUMNAS): saldos al cierre del mes, flujos sumados
+    meses = (len(filas) - 1) // k
+    cuerpo = filas[1:].reshape(meses, k, len(COLUMNAS))
+    saldo = np.array([c in COLUMNAS_SALDO for c in COLUMNAS])
+    mensual = np.empty((meses + 1, len(COLUMNAS)))
+    mensual[0] = filas[0]
+    mensual[1:] = np.where(saldo, cuerpo[:, -1, :], cuerpo.sum(axis=1))
+    mensual[:, 0] = np.arange(meses + 1)
+    return mensual
+
+
+def _resumen_subperiodos(P, E, filas, modo):
+    # Resultado agregado a meses; el peak de deuda y el mínimo acumulado se llevan por subperíodo
+    # (pueden ocurrir dentro del mes) y el break-even se informa como mes
+    k = P["subperiodos"]
+    be = E["mes_break_even"]
+    salida = _kpis(P, dict(E, mes_break_even=None if be is None else -(-be // k)))
+    if modo == "resumen":
+        return salida
+    mensual = _a_meses(filas, k)
+    if modo == "columnas":
+        salida["columnas"] = dict(zip(COLUMNAS, mensual.T.copy()))
+        return salida
+    import pandas as pd
+    df = pd.DataFrame(mensual, columns=COLUMNAS)
+    df["Mes"] = df["Mes"].astype(int)
+    # Detalle por subperíodo para posicionamiento de caja dentro del mes
+    return {"df": df, "df_paso": tabla_por_paso(filas, k), **salida}
+
+
+def tabla_por_paso(filas, k):
+    """DataFrame por subperíodo ("Paso" y su "Mes") desde filas en el orden de COLUMNAS
+    (la matriz del ciclo o un dict {columna: arreglo}, como lo guarda motor.almacen)."""
+    import pandas as pd
+    df_paso = pd.DataFrame(filas, columns=COLUMNAS).rename(columns={"Mes": "Paso"})
+    df_paso["Paso"] = df_paso["Paso"].astype(int)
+    df_paso.insert(1, "Mes", -(-df_paso["Paso"] // k))
+    return df_paso
+
+
+def _kpis(P, E):
+    costo_fin_total = E["interes_acum_banco_total"] + E["interes_acum_kps"] + E["interes_acum_relacionada"]
+    costo_proyecto_total = P["v_terr"] + P["v_cont"] + P["v_otros_inicial"] + E["total_otros_costos_operativos"] + costo_fin_total + P["v_otros_anteriores"]
+    utilidad = P["valor_venta_total"] - costo_proyecto_total
+    roi = (utilidad / costo_proyecto_total) * 100 if costo_proyecto_total > 0 else 0
+
+    return {
+        "utilidad": utilidad, "costo_financiero_total": costo_fin_total,
+        "detalles_fin": { "banco": E["interes_acum_banco_total"], "kps": E["interes_acum_kps"], "relacionada": E["interes_acum_relacionada"] },
+        "roi": roi, "peak_deuda": E["peak_deuda"], "break_even": E["mes_break_even"],
+        "min_flujo_acumulado": E["min_acumulado"]
+    }
+
+
+def _resumen(P, E, filas, modo="df"):
+    # filas: la matriz que llenó el ciclo (None en modo resumen, ver _matriz)
+    if modo not in MODOS:
+        raise ValueError(f"Modo desconocido: {modo!r} (se espera uno de {MODOS})")
+    if P["subperiodos"] > 1:
+        return _resumen_subperiodos(P, E, filas, modo)
+    salida = _kpis(P, E)
+    if modo == "resumen":
+        return salida
+    if modo == "columnas":
+        # Una columna contigua por nombre; el DataFrame se arma sólo si una vista lo
+        # necesita (motor.almacen.a_resultado)
+        salida["columnas"] = dict(zip(COLUMNAS, filas.T.copy()))
+        return salida
+    # pandas sólo se importa al armar el DataFrame: el motor carga con la biblioteca estándar y numpy
+    import pandas as pd
+    df = pd.DataFrame(filas, columns=COLUMNAS)
+    df["Mes"] = df["Mes"].astype(int)
+    return {"df": df, **salida}
+
+
+def calcular_flujo(data, modo="df"):
+    """Simula un escenario mes a mes.
+
+    modo "df": KPIs + "df" (una fila por mes). "columnas": KPIs + "columnas" {columna: arreglo},
+    sin pandas. "resumen": sólo los KPIs (para grillas, goal-seek y Monte Carlo), sin guardar
+    filas: el ciclo lleva el peak de deuda y el mínimo acumulado ("min_flujo_acumulado").
+
+    Con "paso_tiempo" Semanal o Diario el ciclo avanza por subperíodos (ver _a_subperiodos) y
+    el resultado se agrega a meses; en modo "df" trae además "df_paso" (una fila por subperíodo).
+    """
+    perfil.contar("motor: calcular_flujo")
+    with perfil.medir("motor: preparar"):
+        P = _preparar(data)
+        E, fila_0 = _estado_inicial(P)
+        filas = None if modo == "resumen" else _matriz(P, fila_0)
+    with perfil.medir("motor: ciclo mensual"):
+        for m in range(1, P["horizonte"] + 1):
+            _avanzar_mes(P, E, m, filas)
+    with perfil.medir(f"motor: resumen ({modo})"):
+        return _resumen(P, E, filas, modo)
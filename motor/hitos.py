@@ -0,0 +1,68 @@
+"""Intereses devengados acumulados a los hitos del proyecto."""
+import numpy as np
+
+# Fuente de interés -> columna de devengado del flujo mensual
+FUENTES_DEVENGADO = {"banco": "Devengado Banco", "kps": "Devengado KPs", "relacionada": "Devengado Relac."}
+
+
+def indice_intereses(resultado):
+    """Sumas acumuladas del devengado por fuente (posición = mes): el acumulado a cualquier mes es O(1).
+
+    Acepta resultados con "df" o con "columnas" (modo columnas de calcular_flujo).
+    """
+    columnas = resultado.get("columnas")
+    if columnas is None:
+        columnas = {c: resultado["df"][c].to_numpy(dtype=float) for c in FUENTES_DEVENGADO.values()}
+    return {f: np.nancumsum(np.asarray(columnas[c], dtype=float)) for f, c in FUENTES_DEVENGADO.items()}
+
+
+def devengado_hasta(indice, mes):
+    """Devengado acumulado por fuente hasta `mes` inclusive (escalar o arreglo de meses).
+
+    Antes del mes 0 es cero; después del horizonte se mantiene el total.
+    """
+    mes = np.asarray(mes)
+    salida = {}
+    for f, acumulado in indice.items():
+        i = np.clip(mes, -1, len(acumulado) - 1).astype(int)
+        valores = np.where(i >= 0, acumulado[np.maximum(i, 0)], 0.0)
+        salida[f] = float(valores) if valores.ndim == 0 else valores
+    return salida
+
+
+def hitos_proyecto(resultado, data):
+    """Término de construcción, recepción final y último recupero (cierre de deuda), con su mes."""
+    mes_inicio_obra = int(data.get("mes_inicio_obra", 1))
+    duracion_obra = int(data.get("duracion_obra", 18))
+    mes_recepcion = int(data["mes_recepcion"])
+    df = resultado["df"]
+    con_ingreso = df[df["Ingresos"] > 0]
+    mes_ultimo_recupero = int(con_ingreso.iloc[-1]["Mes"]) if len(con_ingreso) else mes_recepcion
+    return [
+        {"nombre": "Término Construcción", "mes": mes_inicio_obra + duracion_obra - 1},
+        {"nombre": "Recepción Final", "mes": mes_recepcion},
+        {"nombre": "Último Recupero (Cierre Deuda)", "mes": mes_ultimo_recupero},
+    ]
+
+
+def tabla_hitos(resultado, data, hitos=None, indice=None):
+    """Devengado acumulado (banco + intereses previos, privados y total) hasta el mes de cada hito.
+
+    `indice` (de indice_intereses) evita recalcular las sumas acumuladas del resultado.
+    """
+    hitos = hitos if hitos is not None else hitos_proyecto(resultado, data)
+    indice = indice if indice is not None else indice_intereses(resultado)
+    int_previos = data.get("intereses_previos_uf", 0.0)
+    total_costo_global = resultado["costo_financiero_total"] + int_previos
+    acum = devengado_hasta(indice, [int(h["mes"]) for h in hitos])
+    filas = []
+    for k, h in enumerate(hitos):
+        acum_banco = acum["banco"][k] + int_previos
+        acum_privados = acum["kps"][k] + acum["relacionada"][k]
+        total = acum_banco + acum_privados
+        filas.append({
+            "Hito": h["nombre"], "Mes": int(h["mes"]),
+            "Acum. Banco": float(acum_banco), "Acum. Privados": float(acum_privados), "Total Devengado": float(total),
+            "% del Total": float(total / total_costo_global * 100) if total_costo_global > 0 else 0.0,
+        })
+    return filas
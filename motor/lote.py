@@ -0,0 +1,412 @@
+"""Motor vectorizado: simula N escenarios a la vez con arreglos (escenario x mes)."""
+import numpy as np
+
+from motor.flujo import COLUMNAS, calcular_flujo, subperiodos
+from motor.perfil import contar, medir
+from motor.tramos import FREQ_AL_FINAL, FREQ_MENSUAL, FREQ_OTRA, FREQ_TRIMESTRAL, codigo_freq, suma
+from motor.ventas import calendario_denso, eventos_recuperos, tiene_libro
+
+
+def _tramos(lista_escenarios, clave, freq_defecto, otra_es_al_final):
+    # Matrices (S, K) rellenas con tramos inertes (monto 0, nunca se activan)
+    n = len(lista_escenarios)
+    k_max = max([len(d.get(clave, [])) for d in lista_escenarios] + [0])
+    monto = np.zeros((n, k_max))
+    mes_ini = np.full((n, k_max), -1, dtype=np.int64)
+    tasa = np.zeros((n, k_max))
+    freq = np.full((n, k_max), FREQ_AL_FINAL, dtype=np.int8)
+    for s, d in enumerate(lista_escenarios):
+        for j, t in enumerate(d.get(clave, [])):
+            monto[s, j] = t["monto"]
+            mes_ini[s, j] = int(t.get("mes_inicio", 1))
+            tasa[s, j] = (t["tasa_anual"] / 100) / 12
+            freq[s, j] = codigo_freq(t.get("frecuencia_pago", freq_defecto), otra_es_al_final)
+    saldo = np.where(mes_ini == 0, monto, 0.0)
+    return {"monto": monto, "mes_ini": mes_ini, "tasa": tasa, "freq": freq, "saldo": saldo,
+            "acum_trim": np.zeros((n, k_max))}
+
+
+def _devengar(tr, m, suma_al_saldo):
+    # Devengo mensual de todos los tramos; devuelve (generado, exigible hoy) por escenario
+    saldo = tr["saldo"]
+    pos = saldo > 0
+    ik = np.where(pos, saldo * tr["tasa"], 0.0)
+    tr["saldo"] = saldo + np.where(suma_al_saldo, ik, 0.0)
+    es_trim = tr["freq"] == FREQ_TRIMESTRAL
+    tr["acum_trim"] = tr["acum_trim"] + np.where(es_trim, ik, 0.0)
+    exigible = np.where(pos & (tr["freq"] == FREQ_MENSUAL), ik, 0.0)
+    if m % 3 == 0:
+        corte = pos & es_trim
+        exigible = exigible + np.where(corte, tr["acum_trim"], 0.0)
+        tr["acum_trim"] = np.where(corte, 0.0, tr["acum_trim"])
+    return suma(ik), suma(exigible)
+
+
+def _pagar_tramos(tr, m, dinero, exigible_total, cierre):
+    # Cascada de pago de KPs / relacionadas: intereses pro-rata y luego capital pro-rata
+    saldo = tr["saldo"]
+    saldo_total = suma(saldo)
+    hay = saldo_total > 0
+    c_cierre = hay & cierre
+    c_pago = hay & ~cierre & (dinero > 0)
+
+    monto_int = np.where(c_pago, np.minimum(dinero, exigible_total), 0.0)
+    exig_kp = np.where(tr["freq"] == FREQ_MENSUAL, saldo * tr["tasa"], 0.0)
+    if m % 3 == 0:
+        exig_kp = exig_kp + np.where(tr["freq"] == FREQ_TRIMESTRAL, tr["acum_trim"], 0.0)
+    con_exig = (c_pago & (exigible_total > 0))[:, None]
+    divisor = np.where(exigible_total > 0, exigible_total, 1.0)[:, None]
+    saldo = np.where(con_exig, saldo - monto_int[:, None] * (exig_kp / divisor), saldo)
+    dinero = dinero - monto_int
+
+    c_cap = c_pago & (dinero > 0)
+    saldo_actual = suma(saldo)
+    monto_cap = np.where(c_cap, np.minimum(dinero, saldo_actual), 0.0)
+    con_saldo = (c_cap & (saldo_actual > 0))[:, None]
+    divisor = np.where(saldo_actual > 0, saldo_actual, 1.0)[:, None]
+    saldo = np.where(con_saldo, saldo - monto_cap[:, None] * (saldo / divisor), saldo)
+    dinero = dinero - monto_cap
+
+    pago_total = np.where(c_cierre, saldo_total, monto_int + monto_cap)
+    dinero = dinero - np.where(c_cierre, saldo_total, 0.0)
+    tr["saldo"] = np.where(c_cierre[:, None], 0.0, saldo)
+    return dinero, monto_int, pago_total
+
+
+def _amortizar(pago, deuda_real, cierre, saldo_uf, saldo_clp):
+    # Abono proporcional a los saldos UF/CLP; en el cierre se anula el saldo residual
+    cond = (pago > 0) & (deuda_real > 0)
+    anular = cond & cierre & (pago >= deuda_real - 0.1)
+    prop = pago / np.where(deuda_real > 0, deuda_real, 1.0)
+    saldo_uf = np.where(anular, 0.0, np.where(cond, saldo_uf - saldo_uf * prop, saldo_uf))
+    saldo_clp = np.where(anular, 0.0, np.where(cond, saldo_clp - saldo_clp * prop, saldo_clp))
+    return saldo_uf, saldo_clp
+
+
+def calcular_flujo_lote(lista_escenarios, columnas=True):
+    """Simula un lote de escenarios (esquema de get_default_config) en paralelo.
+
+    Devuelve arreglos por escenario; las columnas mensuales tienen forma
+    (escenarios, horizonte_max + 1) y quedan en NaN después del horizonte propio.
+    Con `columnas=False` (modo resumen) no se guardan: sólo los KPIs, con memoria
+    proporcional al número de escenarios y no a escenarios x meses. Una lista de
+    nombres guarda sólo esas columnas (p.ej. las curvas de un abanico Monte Carlo).
+
+    Los escenarios con "paso_tiempo" no mensual se simulan con el ciclo de referencia
+    (agregado a meses) y se intercalan en el lote.
+    """
+    contar("motor: escenarios en lote", len(lista_escenarios))
+    with medir("motor: lote"):
+        if any(subperiodos(d) > 1 for d in lista_escenarios):
+            return _lote_mixto(lista_escenarios, columnas)
+        return _lote(lista_escenarios, columnas)
+
+
+def _lote(lista_escenarios, columnas):
+    n = len(lista_escenarios)
+    col = lambda clave, defecto=None: np.array(
+        [d[clave] if defecto is None else d.get(clave, defecto) for d in lista_escenarios], dtype=float)
+
+    v_terr = col("valor_terreno")
+    v_cont = col("valor_contrato")
+    v_otros_inicial = col("total_otros_costos_inicial", 0.0)
+    v_otros_mensual = col("otros_costos_mensuales", 0.0)
+    v_otros_anteriores = col("otros_costos_pagados_anteriores", 0.0)
+    v_aporte_socios = col("aporte_socios", 0.0)
+    v_venta = col("valor_venta_total")
+
+    duracion = col("duracion_obra").astype(np.int64)
+    inicio_obra = col("mes_inicio_obra", 0).astype(np.int64)
+    pct_avance_inicial = col("pct_avance_inicial", 0.0) / 100.0
+    recepcion = col("mes_recepcion").astype(np.int64)
+    fin_obra = np.where(duracion > 0, inicio_obra + duracion - 1, -1)
+    pagar_int_const = np.array([bool(d.get("pagar_intereses_construccion", False)) for d in lista_escenarios])
+
+    pct_clp = col("pct_deuda_pesos") / 100.0
+    pct_uf = 1.0 - pct_clp
+    tasa_mensual_uf = (col("tasa_anual_uf") / 100) / 12
+    tasa_mensual_clp = (col("tasa_anual_clp") / 100) / 12
+    # pow de Python y no np.power: el vectorizado puede diferir en el último bit del ciclo de referencia
+    inflacion_mensual = np.array([((1 + d["inflacion_anual"] / 100) ** (1 / 12)) - 1 for d in lista_escenarios], dtype=float)
+
+    pct_fin_terr = col("pct_fin_terreno") / 100
+    deuda_terr_total = v_terr * pct_fin_terr
+    pct_fin_const = col("pct_fin_construccion") / 100
+    saldo_inicial = col("saldo_inicial_uf", 0.0)
+
+    saldo_terr_uf = deuda_terr_total * pct_uf
+    saldo_terr_clp = deuda_terr_total * pct_clp
+    saldo_const_uf = saldo_inicial * pct_uf
+    saldo_const_clp = saldo_inicial * pct_clp
+
+    rel = _tramos(lista_escenarios, "lista_relacionadas", "Al Final", True)
+    kps = _tramos(lista_escenarios, "lista_kps", "Mensual", False)
+
+    # --- Horizonte y recuperos por escenario ---
+    horizonte = np.empty(n, dtype=np.int64)
+    ultimo_mes_venta = np.full(n, -1, dtype=np.int64)
+    recuperos, libros = [], {}
+    for s, d in enumerate(lista_escenarios):
+        meses_venta, montos_venta, ultimo_mes_venta[s], escala = eventos_recuperos(d, libros)
+        h = recepcion[s] + 12
+        if len(meses_venta): h = max(h, int(meses_venta.max()) + 6)
+        h = max(h, fin_obra[s] + 6, 12)
+        horizonte[s] = h
+        recuperos.append((meses_venta, montos_venta, escala))
+    h_max = int(horizonte.max()) if n else 12
+    meses = np.arange(h_max + 1)
+
+    # Plan en %: un bincount sobre el índice plano (escenario, mes). Libro por unidad: un
+    # calendario por libro distinto, escalado por escenario. Ambos suman en el orden del motor de referencia.
+    ingresos = np.zeros((n, h_max + 1))
+    con_libro = [tiene_libro(d) for d in lista_escenarios]
+    de_plan = [s for s in range(n) if not con_libro[s]]
+    if de_plan:
+        idx_s = np.repeat(np.array(de_plan, dtype=np.int64), [len(recuperos[s][0]) for s in de_plan])
+        idx_mes = np.concatenate([recuperos[s][0] for s in de_plan])
+        montos = np.concatenate([recuperos[s][1] for s in de_plan])
+        validos = (idx_mes >= 1) & (idx_mes <= h_max)
+        plano = idx_s[validos] * (h_max + 1) + idx_mes[validos]
+        ingresos = np.bincount(plano, weights=montos[validos], minlength=n * (h_max + 1)).reshape(n, h_max + 1)
+    densos = {}
+    for s, d in enumerate(lista_escenarios):
+        if con_libro[s]:
+            clave = id(d["libro_ventas"])
+            if clave not in densos:
+                densos[clave] = calendario_denso(recuperos[s][0], recuperos[s][1], h_max)
+            ingresos[s] = densos[clave] * recuperos[s][2]
+
+    # Factor UF acumulado (producto secuencial, igual que el ciclo de referencia)
+    factor = np.ones((n, h_max + 1))
+    factor[:, 1:] = np.cumprod(np.repeat((1 + inflacion_mensual)[:, None], h_max, axis=1), axis=1)
+
+    # Giros de construcción por mes
+    mm = meses[None, :]
+    en_obra = (duracion[:, None] > 0) & (mm >= inicio_obra[:, None]) & (mm <= fin_obra[:, None]) & (mm >= 1)
+    primer_giro = np.where(duracion == 1, v_cont, v_cont * pct_avance_inicial)
+    resto = (v_cont * (1.0 - pct_avance_inicial)) / np.where(duracion > 1, duracion - 1, 1)
+    costo_obra = np.where(en_obra, np.where(mm == inicio_obra[:, None], primer_giro[:, None], resto[:, None]), 0.0)
+
+    gasto_op = np.where(mm <= (recepcion + 6)[:, None], v_otros_mensual[:, None], 0.0)
+    gasto_op[:, 0] = 0.0
+
+    # --- Mes 0 ---
+    equity_terreno = v_terr * (1 - pct_fin_terr)
+    inversion_inicial = equity_terreno + v_otros_inicial
+    # Sumas tramo a tramo en el orden del ciclo de referencia (ver motor.tramos.suma)
+    ingreso_deuda_0 = suma(np.concatenate([kps["monto"] * (kps["mes_ini"] == 0), rel["monto"] * (rel["mes_ini"] == 0)], axis=1))
+    flujo_neto_ini = -inversion_inicial + ingreso_deuda_0 + v_aporte_socios
+    deuda_total_0 = (saldo_const_uf + saldo_terr_uf) + (saldo_const_clp + saldo_terr_clp) + suma(rel["saldo"]) + suma(kps["saldo"])
+    # Máximo de deuda y mínimo del acumulado se llevan al paso (los necesita también el modo resumen)
+    peak_deuda = deuda_total_0.copy()
+    min_acumulado = flujo_neto_ini.copy()
+    nombres = COLUMNAS if columnas is True else [c for c in COLUMNAS if c in (columnas or ())]
+    out = None
+    if nombres:
+        out = {c: np.full((n, h_max + 1), np.nan) for c in nombres}
+        # Mes 0: las deudas por fuente quedan en NaN, como en la fila 0 del motor de referencia
+        inicial = {"Mes": 0.0, "Deuda Total": deuda_total_0, "Ingresos Deuda": ingreso_deuda_0,
+                   "Inversión (Equity)": inversion_inicial, "Flujo Neto": flujo_neto_ini, "Flujo Acumulado": flujo_neto_ini}
+        for c in ("Ingresos", "Otros Costos (Op)", "Int. Banco", "Int. KPs", "Int. Relac.", "Devengado Banco",
+                  "Devengado KPs", "Devengado Relac.", "Pago Intereses Total", "Pago Capital"):
+            inicial[c] = 0.0
+        for c in out:
+            if c in inicial:
+                out[c][:, 0] = inicial[c]
+        if "Mes" in out:
+            out["Mes"][:] = meses
+
+    interes_banco = np.zeros(n)
+    interes_kps = np.zeros(n)
+    interes_rel = np.zeros(n)
+    total_otros_op = np.zeros(n)
+    acumulado = flujo_neto_ini.copy()
+    break_even = np.where(acumulado >= 0, 0, -1)
+    kp_suma_saldo = kps["freq"] != FREQ_OTRA
+
+    for m in range(1, h_max + 1):
+        activo = m <= horizonte
+        f = factor[:, m]
+
+        act_rel = rel["mes_ini"] == m
+        act_kp = kps["mes_ini"] == m
+        rel["saldo"] = rel["saldo"] + np.where(act_rel, rel["monto"], 0.0)
+        kps["saldo"] = kps["saldo"] + np.where(act_kp, kps["monto"], 0.0)
+        ingreso_deuda = suma(np.concatenate([np.where(act_rel, rel["monto"], 0.0), np.where(act_kp, kps["monto"], 0.0)], axis=1))
+
+        # Devengo bancario
+        int_uf = (saldo_const_uf + saldo_terr_uf) * tasa_mensual_uf
+        int_clp = (saldo_const_clp + saldo_terr_clp) * tasa_mensual_clp
+        int_banco = int_uf + (int_clp / f)
+        saldo_const_uf = saldo_const_uf + int_uf
+        saldo_const_clp = saldo_const_clp + int_clp
+
+        int_kps, exig_kps = _devengar(kps, m, kp_suma_saldo)
+        int_rel, exig_rel = _devengar(rel, m, True)
+
+        # Giros de obra
+        costo = costo_obra[:, m]
+        giro = costo * pct_fin_const
+        egreso_equity = costo - giro
+        saldo_const_uf = saldo_const_uf + giro * pct_uf
+        saldo_const_clp = saldo_const_clp + (giro * pct_clp) * f
+
+        ingreso = ingresos[:, m]
+        gasto = gasto_op[:, m]
+        flujo_operativo = ingreso + ingreso_deuda - gasto
+        dinero = np.maximum(0.0, flujo_operativo)
+
+        deficit = pagar_int_const & (dinero < int_banco)
+        egreso_equity = egreso_equity + np.where(deficit, int_banco - dinero, 0.0)
+        dinero = np.where(deficit, int_banco, dinero)
+
+        cierre = ultimo_mes_venta == m
+
+        # Cascada bancaria: primero terreno, luego construcción
+        real_const = saldo_const_uf + (saldo_const_clp / f)
+        real_terr = saldo_terr_uf + (saldo_terr_clp / f)
+        deuda_banco = real_const + real_terr
+        monto_banco = np.where(cierre, deuda_banco, np.where(dinero > 0, np.minimum(deuda_banco, dinero), 0.0))
+        paga_banco = (deuda_banco > 0) & (monto_banco > 0)
+        pago_banco_int = np.where(paga_banco, np.minimum(monto_banco, int_banco), 0.0)
+        pago_banco_cap = np.where(paga_banco, monto_banco - pago_banco_int, 0.0)
+        p_terr = np.where(pago_banco_cap > 0, np.minimum(real_terr, pago_banco_cap), 0.0)
+        p_const = np.where(pago_banco_cap > 0, pago_banco_cap - p_terr, 0.0)
+
+        saldo_terr_uf, saldo_terr_clp = _amortizar(p_terr, real_terr, cierre, saldo_terr_uf, saldo_terr_clp)
+        saldo_const_uf, saldo_const_clp = _amortizar(p_const, real_const, cierre, saldo_const_uf, saldo_const_clp)
+
+        pago_banco_total = np.where(paga_banco, monto_banco, 0.0)
+        dinero = dinero - pago_banco_total
+
+        dinero, pago_kps_int, pago_kps_total = _pagar_tramos(kps, m, dinero, exig_kps, cierre)
+        dinero, pago_rel_int, pago_rel_total = _pagar_tramos(rel, m, dinero, exig_rel, cierre)
+
+        total_int = pago_banco_int + pago_kps_int + pago_rel_int
+        total_cap = (pago_banco_total + pago_kps_total + pago_rel_total) - total_int
+        flujo_neto = np.where(flujo_operativo < 0, flujo_operativo - egreso_equity, dinero - egreso_equity)
+        acumulado = acumulado + flujo_neto
+
+        saldo_kps = suma(kps["saldo"])
+        saldo_rel = suma(rel["saldo"])
+        break_even = np.where((break_even < 0) & activo & (acumulado >= 0), m, break_even)
+        deuda_banco_rep = (saldo_const_uf + saldo_terr_uf) + ((saldo_const_clp + saldo_terr_clp) / f)
+
+        interes_banco += np.where(activo, int_banco, 0.0)
+        interes_kps += np.where(activo, int_kps, 0.0)
+        interes_rel += np.where(activo, int_rel, 0.0)
+        total_otros_op += np.where(activo, gasto, 0.0)
+
+        deuda_total = deuda_banco_rep + saldo_kps + saldo_rel
+        peak_deuda = np.where(activo, np.fmax(peak_deuda, deuda_total), peak_deuda)
+        min_acumulado = np.where(activo, np.fmin(min_acumulado, acumulado), min_acumulado)
+        if out is None:
+            continue
+        for c, v in (("Deuda Banco", deuda_banco_rep), ("Deuda KPs", saldo_kps), ("Deuda Relac.", saldo_rel),
+                     ("Deuda Total", deuda_total), ("Ingresos", ingreso),
+                     ("Ingresos Deuda", ingreso_deuda), ("Otros Costos (Op)", gasto),
+                     ("Inversión (Equity)", egreso_equity), ("Int. Banco", pago_banco_int),
+                     ("Int. KPs", pago_kps_int), ("Int. Relac.", pago_rel_int), ("Devengado Banco", int_banco),
+                     ("Devengado KPs", int_kps), ("Devengado Relac.", int_rel), ("Pago Intereses Total", total_int),
+                     ("Pago Capital", total_cap), ("Flujo Neto", flujo_neto), ("Flujo Acumulado", acumulado)):
+            if c in out:
+                out[c][:, m] = v
+
+    if out is not None:
+        fuera = meses[None, :] > horizonte[:, None]
+        for c in out:
+            out[c][fuera] = np.nan
+
+    costo_fin = interes_banco + interes_kps + interes_rel
+    costo_proyecto = v_terr + v_cont + v_otros_inicial + total_otros_op + costo_fin + v_otros_anteriores
+    utilidad = v_venta - costo_proyecto
+    roi = np.where(costo_proyecto > 0, (utilidad / np.where(costo_proyecto > 0, costo_proyecto, 1.0)) * 100, 0.0)
+
+    return {
+        "horizonte": horizonte, "columnas": out, "utilidad": utilidad, "costo_financiero_total": costo_fin,
+        "detalles_fin": {"banco": interes_banco, "kps": interes_kps, "relacionada": interes_rel},
+        "roi": roi, "peak_deuda": peak_deuda, "min_flujo_acumulado": min_acumulado,
+        "break_even": break_even,
+    }
+
+
+def _lote_mixto(lista_escenarios, columnas):
+    # Escenarios mensuales vectorizados; los con subperíodos por el ciclo de referencia, fila por fila
+    n = len(lista_escenarios)
+    finos = [subperiodos(d) > 1 for d in lista_escenarios]
+    idx_lote = [i for i in range(n) if not finos[i]]
+    lote = _lote([lista_escenarios[i] for i in idx_lote], columnas) if idx_lote else None
+    refs = {i: calcular_flujo(lista_escenarios[i], modo="columnas") for i in range(n) if finos[i]}
+    h_ref = {i: len(r["columnas"]["Mes"]) - 1 for i, r in refs.items()}
+    h_max = max(list(h_ref.values()) + ([int(lote["horizonte"].max())] if lote else []))
+
+    horizonte = np.empty(n, dtype=np.int64)
+    escalares = {k: np.empty(n) for k in ("utilidad", "costo_financiero_total", "roi", "peak_deuda", "min_flujo_acumulado")}
+    detalles = {k: np.empty(n) for k in ("banco", "kps", "relacionada")}
+    break_even = np.empty(n, dtype=np.int64)
+    nombres = COLUMNAS if columnas is True else [c for c in COLUMNAS if c in (columnas or ())]
+    out = {c: np.full((n, h_max + 1), np.nan) for c in nombres} or None
+    if lote:
+        horizonte[idx_lote] = lote["horizonte"]
+        break_even[idx_lote] = lote["break_even"]
+        for k in escalares:
+            escalares[k][idx_lote] = lote[k]
+        for k in detalles:
+            detalles[k][idx_lote] = lote["detalles_fin"][k]
+        for c in nombres:
+            out[c][idx_lote, :lote["columnas"][c].shape[1]] = lote["columnas"][c]
+    for i, r in refs.items():
+        horizonte[i] = h_ref[i]
+        break_even[i] = -1 if r["break_even"] is None else r["break_even"]
+        for k in escalares:
+            escalares[k][i] = r[k]
+        for k in detalles:
+            detalles[k][i] = r["detalles_fin"][k]
+        for c in nombres:
+            out[c][i, :h_ref[i] + 1] = r["columnas"][c]
+    return {"horizonte": horizonte, "columnas": out, **escalares, "detalles_fin": detalles, "break_even": break_even}
+
+
+def resultado_escenario(lote, i):
+    """Extrae el escenario i de un lote con la misma forma que devuelve calcular_flujo."""
+    import pandas as pd
+    h = int(lote["horizonte"][i])
+    df = pd.DataFrame({c: lote["columnas"][c][i, :h + 1] for c in COLUMNAS})
+    df["Mes"] = df["Mes"].astype(int)
+    be = int(lote["break_even"][i])
+    return {
+        "df": df, "utilidad": float(lote["utilidad"][i]),
+        "costo_financiero_total": float(lote["costo_financiero_total"][i]),
+        "detalles_fin": {k: float(v[i]) for k, v in lote["detalles_fin"].items()},
+        "roi": float(lote["roi"][i]), "peak_deuda": float(lote["peak_deuda"][i]),
+        "min_flujo_acumulado": float(lote["min_flujo_acumulado"][i]), "break_even": be if be >= 0 else None,
+    }
+
+
+def comparar_con_referencia(lista_escenarios, motor_referencia, rtol=1e-9, atol=1e-6):
+    """Compara mes a mes el motor por lotes contra el ciclo de referencia.
+
+    Devuelve una lista de discrepancias (escenario, columna, mes, esperado, obtenido).
+    """
+    lote = calcular_flujo_lote(lista_escenarios)
+    diferencias = []
+    for i, data in enumerate(lista_escenarios):
+        ref = motor_referencia(data)
+        df_ref = ref["df"]
+        h = int(lote["horizonte"][i])
+        if len(df_ref) != h + 1:
+            diferencias.append((i, "horizonte", None, len(df_ref) - 1, h))
+            continue
+        for c in df_ref.columns:
+            esperado = df_ref[c].to_numpy(dtype=float)
+            obtenido = lote["columnas"][c][i, :h + 1]
+            malos = ~np.isclose(obtenido, esperado, rtol=rtol, atol=atol, equal_nan=True)
+            for mes in np.flatnonzero(malos):
+                diferencias.append((i, c, int(mes), float(esperado[mes]), float(obtenido[mes])))
+        for k in ("utilidad", "roi", "costo_financiero_total", "peak_deuda"):
+            if not np.isclose(lote[k][i], ref[k], rtol=rtol, atol=atol):
+                diferencias.append((i, k, None, float(ref[k]), float(lote[k][i])))
+        be = int(lote["break_even"][i])
+        if (be if be >= 0 else None) != ref["break_even"]:
+            diferencias.append((i, "break_even", None, ref["break_even"], be))
+    return diferencias
@@ -0,0 +1,46 @@
+"""Medición aproximada de memoria (estado de sesión, resultados, cachés) sin dependencias extra."""
+import sys
+
+import numpy as np
+
+
+def tamano(obj, vistos=None):
+    """Bytes de obj y de lo que referencia; cada objeto se cuenta una vez por `vistos` (set de ids).
+
+    Pasar en `vistos` los ids de objetos compartidos los deja fuera de la cuenta.
+    """
+    if vistos is None:
+        vistos = set()
+    if id(obj) in vistos:
+        return 0
+    vistos.add(id(obj))
+    if hasattr(obj, "bytes_en_memoria"):  # objetos que saben estimarse (y excluir lo compartido)
+        return obj.bytes_en_memoria(vistos)
+    if isinstance(obj, np.ndarray):
+        # getsizeof incluye los datos sólo si el arreglo es dueño; una vista suma su base (una sola vez)
+        return sys.getsizeof(obj) + (tamano(obj.base, vistos) if obj.base is not None else 0)
+    if hasattr(obj, "memory_usage") and hasattr(obj, "columns"):  # DataFrame
+        return int(obj.memory_usage(index=True, deep=True).sum())
+    if isinstance(obj, (bytes, bytearray, str, int, float, bool)) or obj is None:
+        return sys.getsizeof(obj)
+    total = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            total += tamano(k, vistos) + tamano(v, vistos)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        for v in obj:
+            total += tamano(v, vistos)
+    elif hasattr(obj, "__dict__"):
+        total += tamano(vars(obj), vistos)
+    elif hasattr(type(obj), "__slots__"):
+        for nombre in type(obj).__slots__:
+            total += tamano(getattr(obj, nombre, None), vistos)
+    return total
+
+
+def formatear_bytes(n):
+    for unidad in ("B", "KB", "MB"):
+        if abs(n) < 1024:
+            return f"{n:,.0f} {unidad}" if unidad == "B" else f"{n:,.1f} {unidad}"
+        n /= 1024
+    return f"{n:,.1f} GB"
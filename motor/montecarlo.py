@@ -0,0 +1,147 @@
+"""Simulación Monte Carlo de riesgo sobre el motor por lotes."""
+import numpy as np
+
+from motor.lote import calcular_flujo_lote
+from motor.ventas import desfasar_libro, tiene_libro
+
+DISTRIBUCIONES = ["Triangular", "Normal", "Uniforme", "Fija"]
+
+# Variable -> etiqueta. Las variaciones son % sobre el valor base, salvo el desfase de ventas (meses).
+VARIABLES_MC = {
+    "valor_venta_total": "Precio Venta",
+    "valor_contrato": "Costo Construcción",
+    "tasa_anual_uf": "Tasa UF",
+    "tasa_anual_clp": "Tasa CLP",
+    "inflacion_anual": "Inflación",
+    "desfase_ventas": "Desfase Ventas (meses)",
+}
+
+METRICAS_MC = ["utilidad", "roi", "peak_deuda", "break_even"]
+PERCENTILES = (5, 25, 50, 75, 95)
+
+# Trayectorias mensuales que se guardan por sorteo para el gráfico de abanico, submuestreadas a
+# lo más MAX_PUNTOS_CURVA meses: la memoria y lo que llega al navegador no crecen con el horizonte
+CURVAS_MC = ("Flujo Acumulado", "Deuda Total")
+MAX_PUNTOS_CURVA = 150
+
+
+def config_montecarlo_defecto():
+    return [
+        {"variable": "valor_venta_total", "distribucion": "Triangular", "min": -10.0, "moda": 0.0, "max": 5.0, "desv": 0.0},
+        {"variable": "valor_contrato", "distribucion": "Triangular", "min": -5.0, "moda": 0.0, "max": 15.0, "desv": 0.0},
+        {"variable": "tasa_anual_uf", "distribucion": "Normal", "min": 0.0, "moda": 0.0, "max": 0.0, "desv": 10.0},
+        {"variable": "tasa_anual_clp", "distribucion": "Normal", "min": 0.0, "moda": 0.0, "max": 0.0, "desv": 10.0},
+        {"variable": "inflacion_anual", "distribucion": "Normal", "min": 0.0, "moda": 0.0, "max": 0.0, "desv": 25.0},
+        {"variable": "desfase_ventas", "distribucion": "Triangular", "min": -2.0, "moda": 0.0, "max": 6.0, "desv": 0.0},
+    ]
+
+
+def _muestra(rng, fila, n):
+    dist = fila["distribucion"]
+    if dist == "Triangular":
+        lo, hi = min(fila["min"], fila["max"]), max(fila["min"], fila["max"])
+        mo = min(max(fila["moda"], lo), hi)
+        return rng.triangular(lo, mo, hi, n) if hi > lo else np.full(n, lo)
+    if dist == "Normal":
+        return rng.normal(0.0, fila["desv"], n)
+    if dist == "Uniforme":
+        lo, hi = min(fila["min"], fila["max"]), max(fila["min"], fila["max"])
+        return rng.uniform(lo, hi, n)
+    return np.zeros(n)
+
+
+def muestrear(config, n, seed):
+    """Muestras conjuntas: una fila por sorteo con la variación de cada variable."""
+    rng = np.random.default_rng(seed)
+    muestras = {}
+    for fila in config:
+        if fila["variable"] in VARIABLES_MC:
+            muestras[fila["variable"]] = _muestra(rng, fila, n)
+    return muestras
+
+
+def _escenarios(base, muestras, inicio, fin):
+    escenarios = []
+    libros = {}  # libro de ventas desfasado, uno por desfase distinto
+    for i in range(inicio, fin):
+        data = dict(base)
+        for campo, valores in muestras.items():
+            if campo == "desfase_ventas":
+                desfase = int(round(valores[i]))
+                if desfase:
+                    data["plan_ventas"] = [{**p, "mes": max(1, int(p["mes"]) + desfase)} for p in base["plan_ventas"]]
+                    if tiene_libro(base):
+                        if desfase not in libros:
+                            libros[desfase] = desfasar_libro(base["libro_ventas"], desfase)
+                        data["libro_ventas"] = libros[desfase]
+            else:
+                data[campo] = max(0.0, float(base.get(campo, 0.0)) * (1 + valores[i] / 100))
+        escenarios.append(data)
+    return escenarios
+
+
+def _trayectorias(lote, paso):
+    """Curvas del lote en los meses 0, paso, 2*paso, ...; tras su horizonte, cada sorteo mantiene el valor final."""
+    meses = np.arange(0, int(lote["horizonte"].max()) + paso, paso)
+    idx = np.minimum(meses[None, :], lote["horizonte"][:, None])
+    filas = np.arange(len(idx))[:, None]
+    return {c: lote["columnas"][c][filas, idx].astype(np.float32) for c in CURVAS_MC}
+
+
+def simular_montecarlo(base, config, n=10000, seed=0, tam_bloque=2000, progreso=None, curvas=True):
+    """Corre n sorteos en bloques del motor por lotes y devuelve las métricas por sorteo.
+
+    Con `curvas`, agrega "curvas": {"meses", curva: matriz sorteos x meses (float32)} con las
+    CURVAS_MC submuestreadas (ver bandas_percentiles). `progreso(hechos, total)` se llama
+    después de cada bloque.
+    """
+    muestras = muestrear(config, n, seed)
+    salida = {m: np.empty(n) for m in METRICAS_MC}
+    bloques = []
+    paso = None
+    for inicio in range(0, n, tam_bloque):
+        fin = min(n, inicio + tam_bloque)
+        lote = calcular_flujo_lote(_escenarios(base, muestras, inicio, fin), columnas=CURVAS_MC if curvas else False)
+        for m in METRICAS_MC:
+            valores = np.asarray(lote[m], dtype=float)
+            salida[m][inicio:fin] = np.where(valores < 0, np.nan, valores) if m == "break_even" else valores
+        if curvas:
+            # El paso sale del primer bloque y queda fijo: todos los bloques comparten la grilla de meses
+            paso = paso or max(1, -(-(int(lote["horizonte"].max()) + 1) // MAX_PUNTOS_CURVA))
+            bloques.append(_trayectorias(lote, paso))
+        if progreso is not None:
+            progreso(fin, n)
+    if curvas and bloques:
+        # Un bloque más corto se extiende repitiendo su último mes (ahí todos sus sorteos ya cerraron)
+        largo = max(b[CURVAS_MC[0]].shape[1] for b in bloques)
+        salida["curvas"] = {"meses": np.arange(largo) * paso}
+        for c in CURVAS_MC:
+            salida["curvas"][c] = np.concatenate([np.pad(b[c], ((0, 0), (0, largo - b[c].shape[1])), mode="edge")
+                                                  for b in bloques])
+    salida["muestras"] = muestras
+    return salida
+
+
+def resumen_percentiles(resultado, percentiles=PERCENTILES):
+    """Tabla {métrica: {"P5": .., ..., "Media": ..}}; break_even ignora los sorteos sin quiebre."""
+    tabla = {}
+    for m in METRICAS_MC:
+        valores = resultado[m]
+        validos = valores[~np.isnan(valores)]
+        fila = {f"P{p}": (float(np.percentile(validos, p)) if validos.size else None) for p in percentiles}
+        fila["Media"] = float(validos.mean()) if validos.size else None
+        tabla[m] = fila
+    tabla["prob_perdida"] = float(np.mean(resultado["utilidad"] < 0)) if len(resultado["utilidad"]) else 0.0
+    tabla["prob_sin_break_even"] = float(np.mean(np.isnan(resultado["break_even"]))) if len(resultado["break_even"]) else 0.0
+    return tabla
+
+
+def bandas_percentiles(curvas, percentiles=PERCENTILES):
+    """{"meses", curva: {"P5": arreglo por mes, ...}} a partir de las matrices sorteos x meses."""
+    bandas = {"meses": curvas["meses"]}
+    for c, matriz in curvas.items():
+        if c == "meses":
+            continue
+        valores = np.percentile(matriz, percentiles, axis=0)
+        bandas[c] = {f"P{p}": v for p, v in zip(percentiles, valores)}
+    return bandas
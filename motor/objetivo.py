@@ -0,0 +1,152 @@
+"""Búsqueda de objetivo (goal-seek): el valor de un input que lleva una métrica a un objetivo."""
+import numpy as np
+
+from motor.flujo import calcular_flujo
+from motor.lote import calcular_flujo_lote
+
+# Campo -> (etiqueta, mínimo, máximo); un máximo None se toma relativo al valor base
+VARIABLES_OBJETIVO = {
+    "valor_venta_total": ("Precio Venta", 0.0, None),
+    "valor_contrato": ("Costo Construcción", 0.0, None),
+    "valor_terreno": ("Valor Terreno", 0.0, None),
+    "pct_fin_construccion": ("% Fin. Construcción", 0.0, 100.0),
+    "pct_fin_terreno": ("% Fin. Terreno", 0.0, 100.0),
+    "tasa_anual_uf": ("Tasa UF", 0.0, 30.0),
+    "tasa_anual_clp": ("Tasa CLP", 0.0, 40.0),
+}
+
+METRICAS_OBJETIVO = {
+    "roi": "ROI (%)",
+    "utilidad": "Utilidad (UF)",
+    "break_even": "Mes Flujo Positivo",
+    "peak_equity": "Peak Equity (UF)",
+}
+# Métricas escalonadas o acotadas en cero: se busca el umbral desde el que metrica <= objetivo
+METRICAS_UMBRAL = {"break_even", "peak_equity"}
+
+PUNTOS_GRILLA = 17
+
+
+def rango_defecto(base, campo):
+    _, lo, hi = VARIABLES_OBJETIVO[campo]
+    if hi is None:
+        hi = max(3.0 * abs(float(base.get(campo, 0.0))), 1000.0)
+    return lo, hi
+
+
+def valor_metrica(resultado, metrica):
+    """Métrica de un resultado de calcular_flujo; un break-even inexistente cuenta como infinito."""
+    if metrica == "peak_equity":
+        # Mayor necesidad de caja acumulada que cubren los socios
+        minimo = resultado["min_flujo_acumulado"] if "min_flujo_acumulado" in resultado else resultado["df"]["Flujo Acumulado"].min()
+        return max(0.0, -float(minimo))
+    if metrica == "break_even":
+        return float("inf") if resultado["break_even"] is None else float(resultado["break_even"])
+    return float(resultado[metrica])
+
+
+def _metrica_lote(lote, metrica):
+    if metrica == "peak_equity":
+        return np.maximum(0.0, -lote["min_flujo_acumulado"])
+    valores = np.asarray(lote[metrica], dtype=float)
+    return np.where(valores < 0, np.inf, valores) if metrica == "break_even" else valores
+
+
+def _escenario(base, campo, x):
+    data = dict(base)
+    data[campo] = float(x)
+    return data
+
+
+def _resumen(data):
+    return calcular_flujo(data, modo="resumen")
+
+
+def buscar_objetivo(base, campo, metrica, objetivo, rango=None, x_inicial=None, evaluar=None,
+                    max_evaluaciones=60):
+    """Resuelve metrica(base con campo = x) = objetivo en el rango dado.
+
+    Con `x_inicial` (p.ej. la solución anterior) se prueba primero un intervalo estrecho a su
+    alrededor; si no encierra el objetivo, una grilla en una sola llamada al motor por lotes
+    lo acota. Luego se refina con regula falsi (Illinois) o, para métricas de umbral, bisección.
+    `evaluar` es el motor escalar; basta con que devuelva los KPIs (por defecto calcular_flujo en modo
+    "resumen"; SimulacionReanudable.evaluar con ese modo reanuda desde checkpoints).
+    """
+    evaluar = evaluar or _resumen
+    lo, hi = rango if rango is not None else rango_defecto(base, campo)
+    umbral = metrica in METRICAS_UMBRAL
+    tol_x = max(hi - lo, 1e-9) * 1e-7
+    tol_f = 1e-6 * max(1.0, abs(objetivo))
+    cuenta = {"evaluaciones": 0, "llamadas_motor": 0}
+
+    def f(x):
+        cuenta["evaluaciones"] += 1
+        cuenta["llamadas_motor"] += 1
+        return valor_metrica(evaluar(_escenario(base, campo, x)), metrica)
+
+    # Lado del objetivo: True = cumple (umbral) o sobre el objetivo (continuas)
+    lado = (lambda v: v <= objetivo + tol_f) if umbral else (lambda v: v > objetivo)
+
+    def salida(x, v, convergio, mensaje=""):
+        return {"campo": campo, "metrica": metrica, "objetivo": objetivo, "valor": float(x), "logrado": float(v),
+                "convergio": convergio, "mensaje": mensaje, **cuenta}
+
+    intervalo = None
+    if x_inicial is not None and lo <= x_inicial <= hi:
+        d = (hi - lo) / 100
+        a, b = max(lo, x_inicial - d), min(hi, x_inicial + d)
+        va, vb = f(a), f(b)
+        if lado(va) != lado(vb):
+            intervalo = (a, va, b, vb)
+    if intervalo is None:
+        xs = np.linspace(lo, hi, PUNTOS_GRILLA)
+        vs = _metrica_lote(calcular_flujo_lote([_escenario(base, campo, x) for x in xs], columnas=False), metrica)
+        cuenta["evaluaciones"] += len(xs)
+        cuenta["llamadas_motor"] += 1
+        lados = np.array([lado(v) for v in vs])
+        cambios = np.nonzero(lados[:-1] != lados[1:])[0]
+        if not len(cambios):
+            i = int(np.argmin(np.abs(np.where(np.isfinite(vs), vs, np.inf) - objetivo)))
+            return salida(xs[i], vs[i], False, "El objetivo no se alcanza dentro del rango")
+        # Con varios cruces se toma el más cercano al punto de partida
+        ref = x_inicial if x_inicial is not None else float(base.get(campo, lo))
+        i = int(cambios[np.argmin(np.abs(xs[cambios] - ref))])
+        intervalo = (xs[i], vs[i], xs[i + 1], vs[i + 1])
+
+    a, va, b, vb = intervalo
+    if umbral:
+        # Bisección: b queda siempre del lado que cumple
+        if not lado(vb):
+            a, va, b, vb = b, vb, a, va
+        while abs(b - a) > tol_x and cuenta["evaluaciones"] < max_evaluaciones:
+            m = (a + b) / 2
+            vm = f(m)
+            if lado(vm):
+                b, vb = m, vm
+            else:
+                a, va = m, vm
+        return salida(b, vb, abs(b - a) <= tol_x)
+
+    # Regula falsi con la modificación de Illinois (evita que un extremo quede fijo)
+    ga, gb = va - objetivo, vb - objetivo
+    mejor = (a, va) if abs(ga) < abs(gb) else (b, vb)
+    retenido = 0
+    while abs(b - a) > tol_x and cuenta["evaluaciones"] < max_evaluaciones:
+        c = (a * gb - b * ga) / (gb - ga) if gb != ga else (a + b) / 2
+        vc = f(c)
+        gc = vc - objetivo
+        if abs(gc) < abs(mejor[1] - objetivo):
+            mejor = (c, vc)
+        if abs(gc) <= tol_f:
+            return salida(c, vc, True)
+        if (gc > 0) == (gb > 0):
+            b, gb = c, gc
+            if retenido == -1:
+                ga /= 2
+            retenido = -1
+        else:
+            a, ga = c, gc
+            if retenido == 1:
+                gb /= 2
+            retenido = 1
+    return salida(mejor[0], mejor[1], abs(mejor[1] - objetivo) <= tol_f or abs(b - a) <= tol_x)
@@ -0,0 +1,79 @@
+"""Perfil opcional de tiempos por fase (motor y secciones del tablero) sin un profiler externo.
+
+Un Perfil se activa para el contexto actual (hilo o corrida) con `activar`; mientras no haya
+uno activo, `medir` y `contar` no hacen nada. Los hilos nuevos (trabajos en segundo plano,
+descarga del Excel) no heredan el perfil: sólo se mide lo que corre dentro de la corrida.
+"""
+import contextvars
+import json
+import time
+from contextlib import contextmanager, nullcontext
+
+_ACTUAL = contextvars.ContextVar("perfil", default=None)
+
+
+class Perfil:
+    def __init__(self, nombre):
+        self.nombre = nombre
+        self.inicio = time.time()
+        self.total = None
+        self.fases = {}  # fase -> [llamadas, segundos, máximo]
+        self.contadores = {}
+        self._t0 = time.perf_counter()
+
+    def sumar(self, fase, segundos, llamadas=1):
+        f = self.fases.get(fase)
+        if f is None:
+            self.fases[fase] = [llamadas, segundos, segundos]
+        else:
+            f[0] += llamadas
+            f[1] += segundos
+            f[2] = max(f[2], segundos)
+
+    def contar(self, clave, n=1):
+        self.contadores[clave] = self.contadores.get(clave, 0) + n
+
+    @contextmanager
+    def medir(self, fase):
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.sumar(fase, time.perf_counter() - t)
+
+    def cerrar(self):
+        self.total = time.perf_counter() - self._t0
+        return self
+
+    def a_dict(self):
+        """Registro serializable (milisegundos), con las fases de mayor a menor tiempo."""
+        total = self.total if self.total is not None else time.perf_counter() - self._t0
+        fases = sorted(self.fases.items(), key=lambda kv: -kv[1][1])
+        return {"nombre": self.nombre, "inicio": self.inicio, "total_ms": total * 1000,
+                "fases": {f: {"llamadas": n, "total_ms": s * 1000, "max_ms": m * 1000} for f, (n, s, m) in fases},
+                "contadores": dict(self.contadores)}
+
+
+def actual():
+    return _ACTUAL.get()
+
+
+def activar(perfil):
+    """Deja `perfil` como el activo del contexto (None desactiva)."""
+    _ACTUAL.set(perfil)
+
+
+def medir(fase):
+    perfil = _ACTUAL.get()
+    return nullcontext() if perfil is None else perfil.medir(fase)
+
+
+def contar(clave, n=1):
+    perfil = _ACTUAL.get()
+    if perfil is not None:
+        perfil.contar(clave, n)
+
+
+def exportar_json(registros):
+    """Registros (Perfil.a_dict) como JSON, para seguirlos fuera de la app."""
+    return json.dumps(list(registros), ensure_ascii=False, indent=1)
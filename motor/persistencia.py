@@ -0,0 +1,168 @@
+"""Guardado y carga de conjuntos de escenarios: JSON compacto (gzip), versionado, con migraciones y hash.
+
+Un archivo es un sobre {"formato", "version", "hash", ...} con "escenarios" ({nombre: escenario})
+o "proyectos" (cartera: [{"id", "inicio", "escenarios"}]). Cada escenario lleva su hash canónico
+en "hashes", el mismo con el que CacheResultados y Cartera identifican resultados: al cargar un
+archivo de la versión actual no hay que volver a hashear nada.
+"""
+import gzip
+import json
+import zlib
+
+from motor.canonico import hash_canonico
+from motor.flujo import get_default_config
+from motor.ventas import leer_libro_ventas
+
+FORMATO = "gasto-financiero/escenarios"
+VERSION = 1
+MAGIA_GZIP = b"\x1f\x8b"
+ESCENARIOS = ("Real", "Optimista", "Pesimista")
+
+# Listas de registros que se guardan en columnas (sin repetir las claves en cada fila)
+LISTAS_COLUMNARES = ("lista_kps", "lista_relacionadas", "plan_ventas")
+
+# Campos de cada tramo que los archivos anteriores pueden no traer
+TRAMO_DEFECTO = {
+    "lista_kps": {"nombre": "KP", "monto": 0.0, "tasa_anual": 0.0, "plazo": 24, "frecuencia_pago": "Mensual", "mes_inicio": 0},
+    "lista_relacionadas": {"nombre": "Rel", "monto": 0.0, "tasa_anual": 0.0, "frecuencia_pago": "Al Final", "mes_inicio": 0},
+}
+
+
+def _migrar_v0(data, nombre):
+    """Escenario sin versión (estado de sesión o JSON anterior a este formato)."""
+    # Claves ausentes (p.ej. pct_avance_inicial, mes_inicio_obra, aporte_socios) toman el valor por defecto
+    data = {**get_default_config(nombre if nombre in ESCENARIOS else "Real"), **data}
+    for lista, defecto in TRAMO_DEFECTO.items():
+        data[lista] = [{**defecto, **t} for t in data.get(lista) or []]
+    data["rango_pago_terreno"] = list(data["rango_pago_terreno"])
+    if isinstance(data.get("libro_ventas"), list):
+        # Libro por filas (una unidad por registro) -> columnas
+        data["libro_ventas"] = leer_libro_ventas(json.dumps(data["libro_ventas"]))
+    return data
+
+
+# Versión de origen -> migración de un escenario a la versión siguiente
+MIGRACIONES = {0: _migrar_v0}
+
+
+def migrar(escenarios, version):
+    """Lleva un {nombre: escenario} de `version` a VERSION."""
+    if version > VERSION:
+        raise ValueError(f"Archivo de versión {version}; esta versión del motor lee hasta la {VERSION}")
+    while version < VERSION:
+        escenarios = {n: MIGRACIONES[version](d, n) for n, d in escenarios.items()}
+        version += 1
+    return escenarios
+
+
+def hashes(escenarios):
+    return {n: hash_canonico(d) for n, d in escenarios.items()}
+
+
+def hash_conjunto(hashes_escenarios):
+    """Hash de un conjunto a partir de los hashes de sus escenarios (no recorre los datos de nuevo)."""
+    return hash_canonico(hashes_escenarios)
+
+
+def _json(obj):
+    if hasattr(obj, "tolist"):  # arreglos y escalares numpy
+        return obj.tolist()
+    raise TypeError(f"Tipo no serializable en escenario: {type(obj).__name__}")
+
+
+def _a_columnas(escenario):
+    salida = dict(escenario)
+    for lista in LISTAS_COLUMNARES:
+        filas = escenario.get(lista)
+        if filas and all(f.keys() == filas[0].keys() for f in filas):
+            salida[lista] = {c: [f[c] for f in filas] for c in filas[0]}
+    return salida
+
+
+def _a_filas(escenario):
+    for lista in LISTAS_COLUMNARES:
+        columnas = escenario.get(lista)
+        if isinstance(columnas, dict):
+            escenario[lista] = [dict(zip(columnas, valores)) for valores in zip(*columnas.values())]
+    return escenario
+
+
+def _empaquetar(sobre, comprimir):
+    texto = json.dumps(sobre, separators=(",", ":"), ensure_ascii=False, default=_json).encode("utf-8")
+    return gzip.compress(texto, compresslevel=6, mtime=0) if comprimir else texto
+
+
+def guardar_escenarios(escenarios, comprimir=True):
+    """{nombre: escenario} -> bytes (JSON compacto, con gzip por defecto)."""
+    h = hashes(escenarios)
+    return _empaquetar({"formato": FORMATO, "version": VERSION, "hash": hash_conjunto(h), "hashes": h,
+                        "escenarios": {n: _a_columnas(d) for n, d in escenarios.items()}}, comprimir)
+
+
+def guardar_cartera(proyectos, comprimir=True):
+    """[{"id", "inicio", "escenarios": {nombre: escenario}}] -> bytes."""
+    salida = []
+    for p in proyectos:
+        h = hashes(p["escenarios"])
+        salida.append({"id": str(p["id"]), "inicio": p.get("inicio", 0), "hash": hash_conjunto(h), "hashes": h,
+                       "escenarios": {n: _a_columnas(d) for n, d in p["escenarios"].items()}})
+    return _empaquetar({"formato": FORMATO, "version": VERSION, "hash": hash_canonico([p["hash"] for p in salida]),
+                        "proyectos": salida}, comprimir)
+
+
+def es_sobre(obj):
+    return isinstance(obj, dict) and obj.get("formato") == FORMATO
+
+
+def _conjunto(obj, version, verificar):
+    escenarios = migrar({n: _a_filas(d) for n, d in obj["escenarios"].items()}, version)
+    h = obj.get("hashes")
+    if version < VERSION or h is None or verificar:
+        calculados = hashes(escenarios)
+        if verificar and version == VERSION and h is not None and h != calculados:
+            raise ValueError("El contenido no coincide con su hash")
+        h = calculados
+    return escenarios, h
+
+
+def desde_sobre(obj, verificar=False):
+    """Sobre ya parseado -> {"version_origen", "hash", "hashes", "escenarios"} o {..., "proyectos"}."""
+    version = int(obj.get("version", 0))
+    salida = {"version_origen": version}
+    if "proyectos" in obj:
+        proyectos = []
+        for p in obj["proyectos"]:
+            escenarios, h = _conjunto(p, version, verificar)
+            proyectos.append({"id": str(p["id"]), "inicio": p.get("inicio", 0), "hash": hash_conjunto(h),
+                              "hashes": h, "escenarios": escenarios})
+        salida["proyectos"] = proyectos
+        salida["hash"] = hash_canonico([p["hash"] for p in proyectos])
+    else:
+        escenarios, h = _conjunto(obj, version, verificar)
+        salida.update(escenarios=escenarios, hashes=h, hash=hash_conjunto(h))
+    return salida
+
+
+def cargar(datos, verificar=False):
+    """bytes o str (con o sin gzip) -> ver desde_sobre.
+
+    Un JSON sin sobre (un {nombre: escenario} o un escenario suelto) se toma como versión 0 y
+    se migra. Con `verificar`, los hashes guardados se recalculan y se comparan.
+    """
+    if isinstance(datos, str):
+        datos = datos.encode("utf-8")
+    try:
+        if datos[:2] == MAGIA_GZIP:
+            datos = gzip.decompress(datos)
+        obj = json.loads(datos)
+    except (OSError, EOFError, zlib.error, json.JSONDecodeError, UnicodeDecodeError) as e:
+        raise ValueError(f"Archivo ilegible: {e}") from None
+    if not es_sobre(obj):
+        if not isinstance(obj, dict):
+            raise ValueError("Se esperaba un objeto JSON con escenarios")
+        # Un escenario suelto se reconoce por sus campos obligatorios
+        obj = {"version": 0, "escenarios": {"Real": obj} if "valor_venta_total" in obj else obj}
+    try:
+        return desde_sobre(obj, verificar)
+    except (KeyError, TypeError, AttributeError) as e:
+        raise ValueError(f"Archivo con estructura inválida: {type(e).__name__} {e}") from None
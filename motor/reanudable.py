@@ -0,0 +1,173 @@
+"""Simulación con checkpoints mensuales: un cambio cuyo primer efecto es el mes k se recalcula desde k."""
+import copy
+import time
+
+from motor import perfil
+from motor.flujo import _avanzar_mes, _estado_inicial, _matriz, _preparar, _resumen, copiar_estado
+from motor.ventas import eventos_recuperos
+
+# Claves que no entran al ciclo mensual (sólo al resumen final o a ninguna parte)
+CLAVES_SOLO_RESUMEN = {"otros_costos_pagados_anteriores", "intereses_previos_uf", "rango_pago_terreno", "prioridad_terreno"}
+CLAVES_OBRA = {"valor_contrato", "pct_fin_construccion", "pct_avance_inicial", "duracion_obra", "mes_inicio_obra"}
+CLAVES_VENTAS = {"valor_venta_total", "plan_ventas", "libro_ventas"}
+CLAVES_TRAMOS = {"lista_kps", "lista_relacionadas"}
+SIN_EFECTO = float("inf")
+
+
+def _giros_obra(data):
+    duracion = int(data["duracion_obra"])
+    if duracion <= 0:
+        return {}
+    inicio = int(data.get("mes_inicio_obra", 0))
+    v_cont = data["valor_contrato"]
+    pct_ini = data.get("pct_avance_inicial", 0.0) / 100.0
+    pct_fin = data["pct_fin_construccion"]
+    giros = {}
+    for m in range(max(inicio, 1), inicio + duracion):
+        if m == inicio:
+            costo = v_cont if duracion == 1 else v_cont * pct_ini
+        else:
+            costo = (v_cont * (1.0 - pct_ini)) / (duracion - 1)
+        giros[m] = (costo, pct_fin)
+    return giros
+
+
+def _recuperos(data):
+    meses, montos, ultimo, escala = eventos_recuperos(data)
+    por_mes = {}
+    for mes, monto in zip(meses.tolist(), montos.tolist()):
+        if mes >= 1:
+            por_mes.setdefault(mes, []).append(monto * escala)
+    return por_mes, ultimo
+
+
+def _primer_mes_distinto(a, b):
+    meses = [m for m in set(a) | set(b) if a.get(m) != b.get(m)]
+    return min(meses) if meses else SIN_EFECTO
+
+
+def _inicio_efectivo(tramo):
+    mes = int(tramo.get("mes_inicio", 1))
+    return SIN_EFECTO if mes < 0 else mes
+
+
+def _primer_mes_tramos(viejos, nuevos):
+    campos = ("monto", "tasa_anual", "frecuencia_pago", "mes_inicio")
+    k = SIN_EFECTO
+    for i in range(max(len(viejos), len(nuevos))):
+        v = viejos[i] if i < len(viejos) else None
+        n = nuevos[i] if i < len(nuevos) else None
+        if v is not None and n is not None and all(v.get(c) == n.get(c) for c in campos):
+            continue
+        for t in (v, n):
+            if t is not None:
+                k = min(k, _inicio_efectivo(t))
+    return k
+
+
+def primer_mes_afectado(viejo, nuevo):
+    """Primer mes cuyo resultado puede cambiar al pasar de `viejo` a `nuevo` (0 = todo; inf = sólo resumen)."""
+    cambiadas = {c for c in set(viejo) | set(nuevo) if viejo.get(c) != nuevo.get(c)}
+    k = SIN_EFECTO
+    for c in cambiadas:
+        if c in CLAVES_SOLO_RESUMEN:
+            continue
+        elif c in CLAVES_OBRA:
+            k = min(k, _primer_mes_distinto(_giros_obra(viejo), _giros_obra(nuevo)))
+        elif c in CLAVES_VENTAS:
+            rec_v, ult_v = _recuperos(viejo)
+            rec_n, ult_n = _recuperos(nuevo)
+            k = min(k, _primer_mes_distinto(rec_v, rec_n))
+            if ult_v != ult_n:
+                # Cambia el mes de cierre (pago total de la deuda)
+                k = min(k, max(1, min(m for m in (ult_v, ult_n) if m >= 0)))
+        elif c in CLAVES_TRAMOS:
+            k = min(k, _primer_mes_tramos(viejo.get(c, []), nuevo.get(c, [])))
+        elif c == "otros_costos_mensuales":
+            k = min(k, 1)
+        elif c == "mes_recepcion":
+            # El gasto operativo corre hasta recepción + 6
+            k = min(k, max(1, min(int(viejo[c]), int(nuevo[c])) + 7))
+        else:
+            return 0
+    return k
+
+
+class SimulacionReanudable:
+    """Guarda el estado completo al cierre de cada mes para reanudar desde el primer mes afectado.
+
+    `evaluar` sirve para loops que perturban el escenario base sin reemplazarlo
+    (goal-seek, sensibilidad); `actualizar` adopta el nuevo escenario como base.
+    """
+
+    def __init__(self, data):
+        self.meses_simulados = 0
+        self._base = None
+        self._filas = None  # matriz (paso x COLUMNAS) de la base, ver motor.flujo._matriz
+        self._estados = []
+        self.resultado = None
+        self.actualizar(data)
+
+    def _simular(self, data, desde, guardar, modo="df"):
+        perfil_activo = perfil.actual()
+        t_preparar = time.perf_counter()
+        P = _preparar(data)
+        # Sin guardar y en modo resumen no hacen falta filas: el estado lleva peak y mínimo
+        con_filas = guardar or modo != "resumen"
+        if desde <= 0 or not self._estados:
+            E, fila_0 = _estado_inicial(P)
+            filas = _matriz(P, fila_0) if con_filas else None
+            estados, desde = [copiar_estado(E)], 1
+        else:
+            # Reanuda desde el estado al cierre del mes desde - 1 (con subperíodos, del paso que cierra ese mes)
+            desde = (desde - 1) * P["subperiodos"] + 1
+            desde = min(desde, P["horizonte"] + 1, len(self._estados))
+            E = copiar_estado(self._estados[desde - 1])
+            # Los parámetros de los tramos vienen del escenario nuevo; los saldos, del checkpoint
+            frescos, _ = _estado_inicial(P)
+            # (un tramo modificado aún no se activa antes del mes de reanudación)
+            for clave in ("kps_activos", "rel_activos"):
+                frescos[clave].reanudar_desde(E[clave])
+                E[clave] = frescos[clave]
+            estados = self._estados[:desde]
+            filas = None
+            if con_filas:
+                filas = _matriz(P, self._filas[0])
+                filas[:desde] = self._filas[:desde]
+        if perfil_activo is not None:
+            perfil_activo.sumar("motor: preparar", time.perf_counter() - t_preparar)
+            perfil_activo.contar("motor: simulación reanudable")
+            perfil_activo.contar("motor: pasos simulados (reanudable)", max(0, P["horizonte"] + 1 - desde))
+        with perfil.medir("motor: ciclo mensual"):
+            for m in range(desde, P["horizonte"] + 1):
+                _avanzar_mes(P, E, m, filas)
+                if guardar:
+                    estados.append(copiar_estado(E))
+                self.meses_simulados += 1
+        with perfil.medir(f"motor: resumen ({modo})"):
+            return _resumen(P, E, filas, modo), filas, estados
+
+    def evaluar(self, data, modo="df"):
+        """Resultado de `data` reanudando desde la base, sin adoptarlo (modo: ver calcular_flujo)."""
+        resultado, _, _ = self._simular(data, primer_mes_afectado(self._base, data), guardar=False, modo=modo)
+        return resultado
+
+    def actualizar(self, data):
+        k = primer_mes_afectado(self._base, data) if self._base is not None else 0
+        resultado, self._filas, self._estados = self._simular(data, k, guardar=True)
+        self._base = copy.deepcopy(data)
+        self.resultado = resultado
+        return resultado
+
+    # --- Memoria ---
+    def bytes_en_memoria(self, vistos):
+        """Estimación de la memoria retenida: los checkpoints pesan casi todo (un estado por mes)."""
+        from motor.memoria import tamano
+        total = tamano(self._base, vistos) + tamano(self.resultado, vistos)
+        if self._estados:
+            total += tamano(self._filas, vistos) + tamano(self._estados[-1], vistos) * len(self._estados)
+        return total
+
+    def descartar_checkpoints(self):
+        """Libera los checkpoints; la próxima actualización simula desde el mes 0 y los vuelve a guardar."""
+        self._filas, self._estados = None, []
@@ -0,0 +1,133 @@
+"""Cubo de sensibilidad N-dimensional evaluado en bloques sobre un pool de procesos."""
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from motor.lote import calcular_flujo_lote
+
+# Campo -> (etiqueta, es_entero)
+VARIABLES_SENSIBILIDAD = {
+    "valor_venta_total": ("Precio Venta", False),
+    "valor_contrato": ("Costo Construcción", False),
+    "valor_terreno": ("Valor Terreno", False),
+    "tasa_anual_uf": ("Tasa UF", False),
+    "tasa_anual_clp": ("Tasa CLP", False),
+    "inflacion_anual": ("Inflación", False),
+    "pct_fin_construccion": ("% Fin. Construcción", False),
+    "pct_fin_terreno": ("% Fin. Terreno", False),
+    "pct_deuda_pesos": ("% Deuda CLP", False),
+    "otros_costos_mensuales": ("Gasto Operativo Mensual", False),
+    "duracion_obra": ("Meses Obra", True),
+    "mes_recepcion": ("Mes Recepción", True),
+}
+
+METRICAS = ["roi", "utilidad", "costo_financiero_total", "peak_deuda", "break_even"]
+
+# Bajo este número de celdas no compensa levantar procesos
+MIN_CELDAS_PARALELO = 512
+
+_POOL = None
+_POOL_WORKERS = 0
+
+
+def pasos_variacion(variacion_pct, pasos):
+    """Variaciones relativas simétricas, p.ej. (10, 5) -> [-10, -5, 0, 5, 10]."""
+    if pasos <= 1:
+        return np.zeros(1)
+    return np.linspace(-variacion_pct, variacion_pct, int(pasos))
+
+
+def valores_eje(base, campo, variaciones):
+    valores = float(base.get(campo, 0.0)) * (1 + np.asarray(variaciones, dtype=float) / 100)
+    if VARIABLES_SENSIBILIDAD.get(campo, ("", False))[1]:
+        valores = np.rint(valores)
+    return valores
+
+
+def _escenario_celda(base, campos, valores):
+    # Copia superficial: el motor por lotes no modifica listas ni diccionarios anidados
+    data = dict(base)
+    for campo, v in zip(campos, valores):
+        data[campo] = int(v) if VARIABLES_SENSIBILIDAD.get(campo, ("", False))[1] else float(v)
+    # Para evitar divisiones por cero en simulaciones vacías
+    if data["duracion_obra"] == 0: data["duracion_obra"] = 1
+    return data
+
+
+def _metrica(lote, metrica):
+    valores = np.asarray(lote[metrica], dtype=float)
+    if metrica == "break_even":
+        valores = np.where(valores < 0, np.nan, valores)
+    return valores
+
+
+def _evaluar_bloque(base, campos, ejes, metrica, inicio, fin):
+    forma = tuple(len(e) for e in ejes)
+    indices = np.unravel_index(np.arange(inicio, fin), forma)
+    escenarios = [
+        _escenario_celda(base, campos, [ejes[d][indices[d][i]] for d in range(len(ejes))])
+        for i in range(fin - inicio)
+    ]
+    return _metrica(calcular_flujo_lote(escenarios, columnas=False), metrica)
+
+
+def _pool(workers):
+    global _POOL, _POOL_WORKERS
+    if _POOL is None or _POOL_WORKERS != workers:
+        if _POOL is not None:
+            _POOL.shutdown(wait=False, cancel_futures=True)
+        # spawn: el servidor de Streamlit tiene hilos y fork no es seguro ahí
+        _POOL = ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn"))
+        _POOL_WORKERS = workers
+    return _POOL
+
+
+def evaluar_cubo(base, ejes, metrica="roi", workers=None, tam_bloque=256, evaluar_lote=None, progreso=None):
+    """Evalúa la métrica en todas las combinaciones de `ejes` ({campo: valores}).
+
+    Devuelve un ndarray con un eje por campo, en el orden de `ejes`. Los cubos
+    pequeños se evalúan en el proceso actual (con `evaluar_lote` si se entrega,
+    que recibe la lista de escenarios y devuelve la métrica por escenario).
+    `progreso(hechos, total)` se llama después de cada bloque (ver motor.trabajos);
+    si lanza una excepción, los bloques pendientes se cancelan.
+    """
+    campos = list(ejes)
+    valores = [np.asarray(ejes[c], dtype=float) for c in campos]
+    forma = tuple(len(v) for v in valores)
+    total = int(np.prod(forma))
+    workers = workers or os.cpu_count() or 1
+
+    if total < MIN_CELDAS_PARALELO or workers == 1:
+        if evaluar_lote is None:
+            # Sin progreso, un solo lote; con progreso, bloques para poder informar y cancelar
+            paso = tam_bloque if progreso is not None else max(total, 1)
+            partes = []
+            for a in range(0, total, paso):
+                partes.append(_evaluar_bloque(base, campos, valores, metrica, a, min(total, a + paso)))
+                if progreso is not None:
+                    progreso(min(total, a + paso), total)
+            return np.concatenate(partes).reshape(forma)
+        escenarios = [_escenario_celda(base, campos, [valores[d][idx[d]] for d in range(len(forma))])
+                      for idx in np.ndindex(*forma)]
+        return np.asarray(evaluar_lote(escenarios), dtype=float).reshape(forma)
+
+    # Bloques de tamaño parejo para repartir la carga entre todos los núcleos
+    n_bloques = max(workers, -(-total // tam_bloque))
+    cortes = np.linspace(0, total, n_bloques + 1).astype(int)
+    pool = _pool(workers)
+    futuros = {pool.submit(_evaluar_bloque, base, campos, valores, metrica, int(a), int(b)): int(b - a)
+               for a, b in zip(cortes[:-1], cortes[1:]) if b > a}
+    if progreso is not None:
+        hechos = 0
+        try:
+            for f in as_completed(futuros):
+                hechos += futuros[f]
+                progreso(hechos, total)
+        except BaseException:
+            for f in futuros:
+                f.cancel()
+            raise
+    salida = np.concatenate([f.result() for f in futuros])
+    return salida.reshape(forma)
@@ -0,0 +1,102 @@
+"""Tornado: sensibilidad de a un parámetro a la vez, con todas las perturbaciones en un solo lote."""
+import numpy as np
+
+from motor.lote import calcular_flujo_lote
+
+# Campo -> (etiqueta, tipo): "monto", "pct" (acotado a 0-100) o "mes" (entero)
+PARAMETROS_TORNADO = {
+    "valor_venta_total": ("Precio Venta", "monto"),
+    "valor_contrato": ("Costo Construcción", "monto"),
+    "valor_terreno": ("Valor Terreno", "monto"),
+    "pct_fin_terreno": ("% Fin. Terreno", "pct"),
+    "pct_fin_construccion": ("% Fin. Construcción", "pct"),
+    "pct_avance_inicial": ("% Avance 1er Mes", "pct"),
+    "duracion_obra": ("Meses Obra", "mes"),
+    "mes_inicio_obra": ("Mes Inicio Obra", "mes"),
+    "mes_recepcion": ("Mes Recepción", "mes"),
+    "saldo_inicial_uf": ("Deuda Inicial", "monto"),
+    "aporte_socios": ("Aporte Socios", "monto"),
+    "total_otros_costos_inicial": ("Otros Costos Iniciales", "monto"),
+    "otros_costos_mensuales": ("Gasto Operativo Mensual", "monto"),
+    "otros_costos_pagados_anteriores": ("Costos Históricos", "monto"),
+    "tasa_anual_uf": ("Tasa UF", "monto"),
+    "tasa_anual_clp": ("Tasa CLP", "monto"),
+    "pct_deuda_pesos": ("% Deuda CLP", "pct"),
+    "inflacion_anual": ("Inflación", "monto"),
+}
+# Campos de cada tramo de deuda privada que se perturban
+CAMPOS_TRAMO = {"monto": "Monto", "tasa_anual": "Tasa"}
+METRICAS_TORNADO = {"roi": "ROI (%)", "costo_financiero_total": "Costo Financiero (UF)"}
+
+
+def parametros(base):
+    """Rutas perturbables del escenario: (campo,) o (lista, índice, campo), con etiqueta y tipo.
+
+    Los parámetros en cero se omiten (una variación porcentual no los mueve).
+    """
+    salida = []
+    for campo, (etiqueta, tipo) in PARAMETROS_TORNADO.items():
+        if float(base.get(campo, 0) or 0) != 0:
+            salida.append(((campo,), etiqueta, tipo))
+    for lista, nombre in (("lista_kps", "KP"), ("lista_relacionadas", "Rel")):
+        for i, tramo in enumerate(base.get(lista, [])):
+            for campo, etiqueta in CAMPOS_TRAMO.items():
+                if float(tramo.get(campo, 0) or 0) != 0:
+                    salida.append(((lista, i, campo), f"{tramo.get('nombre') or f'{nombre} {i + 1}'} · {etiqueta}", "monto"))
+    return salida
+
+
+def _leer(data, ruta):
+    return data[ruta[0]] if len(ruta) == 1 else data[ruta[0]][ruta[1]][ruta[2]]
+
+
+def _valor_perturbado(valor, tipo, signo, variacion_pct):
+    nuevo = valor * (1 + signo * variacion_pct / 100)
+    if tipo == "pct":
+        return min(100.0, max(0.0, nuevo))
+    if tipo == "mes":
+        nuevo = int(round(nuevo))
+        # Un mes siempre se mueve al menos uno
+        return max(0, nuevo if nuevo != valor else int(valor) + signo)
+    return nuevo
+
+
+def _perturbar(base, ruta, valor):
+    # Copia superficial: sólo se copia lo que está en la ruta modificada
+    data = dict(base)
+    if len(ruta) == 1:
+        data[ruta[0]] = valor
+    else:
+        lista, i, campo = ruta
+        data[lista] = list(base[lista])
+        data[lista][i] = {**base[lista][i], campo: valor}
+    return data
+
+
+def calcular_tornado(base, variacion_pct=10.0, metricas=tuple(METRICAS_TORNADO)):
+    """Evalúa base, base - x% y base + x% de cada parámetro en una sola llamada al motor por lotes.
+
+    Devuelve {"base": {metrica: valor}, "filas": [{"ruta", "etiqueta", "bajo", "alto",
+    "<metrica>": (valor_bajo, valor_alto), ...}]}.
+    """
+    params = parametros(base)
+    escenarios, filas = [base], []
+    for ruta, etiqueta, tipo in params:
+        v = _leer(base, ruta)
+        bajo = _valor_perturbado(v, tipo, -1, variacion_pct)
+        alto = _valor_perturbado(v, tipo, +1, variacion_pct)
+        escenarios += [_perturbar(base, ruta, bajo), _perturbar(base, ruta, alto)]
+        filas.append({"ruta": ruta, "etiqueta": etiqueta, "bajo": bajo, "alto": alto})
+
+    lote = calcular_flujo_lote(escenarios, columnas=False)
+    valores = {m: np.asarray(lote[m], dtype=float) for m in metricas}
+    for k, fila in enumerate(filas):
+        for m in metricas:
+            fila[m] = (float(valores[m][1 + 2 * k]), float(valores[m][2 + 2 * k]))
+    return {"base": {m: float(valores[m][0]) for m in metricas}, "filas": filas, "evaluaciones": len(escenarios)}
+
+
+def ordenar(tornado, metrica):
+    """Filas ordenadas de mayor a menor impacto (ancho de la barra, incluido el valor base) sobre la métrica."""
+    v0 = tornado["base"][metrica]
+    return sorted(tornado["filas"], key=lambda f: max(v0, *f[metrica]) - min(v0, *f[metrica]), reverse=True)
@@ -0,0 +1,105 @@
+"""Trabajos en segundo plano (grilla de sensibilidad, Monte Carlo) con progreso y cancelación.
+
+Cada trabajo corre en un pool de hilos: quien lo envía (el hilo del script de Streamlit) sigue
+libre y sólo consulta su estado. La función recibe `progreso(hechos, total)` y lo llama entre
+bloques; la cancelación es cooperativa: el siguiente llamado a `progreso` lanza Cancelado.
+Los trabajos no tocan Streamlit: el resultado queda en el trabajo hasta que la sesión lo recoge.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+EN_CURSO, LISTO, CANCELADO, ERROR = "en curso", "listo", "cancelado", "error"
+
+
+class Cancelado(Exception):
+    """Se lanza dentro del trabajo en el primer llamado a progreso después de cancelar."""
+
+
+class Trabajo:
+    def __init__(self, nombre, clave, contexto=None):
+        self.nombre = nombre
+        self.clave = clave
+        self.contexto = contexto  # lo que la sesión necesita para recoger el resultado
+        self.estado = EN_CURSO
+        self.hechos = 0
+        self.total = 0
+        self.resultado = None
+        self.error = None
+        self.inicio = time.time()
+        self.fin = None
+        self._cancelar = threading.Event()
+
+    @property
+    def terminado(self):
+        return self.estado != EN_CURSO
+
+    @property
+    def fraccion(self):
+        return self.hechos / self.total if self.total else 0.0
+
+    @property
+    def segundos(self):
+        return (self.fin or time.time()) - self.inicio
+
+    def progreso(self, hechos, total):
+        if self._cancelar.is_set():
+            raise Cancelado(self.nombre)
+        self.hechos, self.total = hechos, total
+
+    def cancelar(self):
+        """Pide la cancelación; el trabajo se detiene en su próximo bloque."""
+        self._cancelar.set()
+        if not self.terminado and self.hechos == 0:
+            self.estado = CANCELADO  # puede que ni haya partido: no hay que esperarlo
+
+    def _correr(self, funcion, args, kwargs):
+        try:
+            if self._cancelar.is_set():
+                raise Cancelado(self.nombre)
+            resultado = funcion(*args, progreso=self.progreso, **kwargs)
+            self.resultado, self.estado = resultado, (CANCELADO if self._cancelar.is_set() else LISTO)
+        except Cancelado:
+            self.estado = CANCELADO
+        except Exception as e:  # el error se muestra en la sesión que envió el trabajo
+            self.error, self.estado = e, ERROR
+        finally:
+            self.fin = time.time()
+
+
+class GestorTrabajos:
+    """Pool de hilos compartido; cada sesión guarda sus trabajos por nombre (ver `enviar`)."""
+
+    def __init__(self, max_workers=2):
+        self.max_workers = max_workers
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="trabajo")
+
+    def enviar(self, trabajos, nombre, clave, funcion, *args, contexto=None, forzar=False, **kwargs):
+        """Envía `funcion(*args, progreso=..., **kwargs)` como trabajo `nombre` en el dict `trabajos`.
+
+        Si ya hay un trabajo con ese nombre y la misma clave se devuelve ese (también si fue
+        cancelado o falló: no se relanza solo); con `forzar` se relanza si ya terminó. Si la
+        clave cambió (cambiaron las entradas) el anterior se cancela.
+        """
+        previo = trabajos.get(nombre)
+        if previo is not None:
+            if previo.clave == clave and not (forzar and previo.terminado):
+                return previo
+            previo.cancelar()
+        trabajo = Trabajo(nombre, clave, contexto)
+        trabajos[nombre] = trabajo
+        self._pool.submit(trabajo._correr, funcion, args, kwargs)
+        return trabajo
+
+    def cerrar(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def cancelar_obsoletos(trabajos, nombre, clave):
+    """Cancela el trabajo `nombre` si sigue en curso con otra clave; devuelve el trabajo vigente o None."""
+    trabajo = trabajos.get(nombre)
+    if trabajo is None:
+        return None
+    if trabajo.clave != clave and not trabajo.terminado:
+        trabajo.cancelar()
+    return trabajo
@@ -0,0 +1,190 @@
+"""Libro de tramos de deuda privada (KPs y relacionadas) en arreglos paralelos."""
+import numpy as np
+
+FREQ_MENSUAL, FREQ_TRIMESTRAL, FREQ_AL_FINAL, FREQ_OTRA = 0, 1, 2, 3
+
+
+def codigo_freq(freq, otra_es_al_final):
+    if freq == "Mensual": return FREQ_MENSUAL
+    if freq == "Trimestral": return FREQ_TRIMESTRAL
+    if freq == "Al Final" or otra_es_al_final: return FREQ_AL_FINAL
+    return FREQ_OTRA
+
+
+def suma(valores):
+    """Suma tramo a tramo en el orden de la lista (último eje), como el ciclo original por tramo.
+
+    np.sum suma por pares: con otro orden el residuo de un saldo pagado completo puede quedar
+    en +1e-13 en vez de 0 o negativo, y eso cambia la rama `total > 0` de los meses siguientes.
+    """
+    if valores.shape[-1] == 0:
+        return np.zeros(valores.shape[:-1]) if valores.ndim > 1 else 0.0
+    total = np.cumsum(valores, axis=-1)[..., -1]
+    return float(total) if valores.ndim == 1 else total
+
+
+class LibroTramos:
+    """Tramos como arreglos paralelos: cada operación mensual es vectorizada sobre todos los tramos.
+
+    Para KPs una frecuencia desconocida no capitaliza intereses; para relacionadas
+    cualquier frecuencia distinta de Mensual/Trimestral se trata como "Al Final".
+
+    Con `subperiodos` = k > 1 cada paso es 1/k de mes (ver motor.flujo.PASOS_TIEMPO): la tasa
+    se compone a la equivalente del subperíodo, un tramo se desembolsa en el primer subperíodo
+    de su mes y los intereses Mensual/Trimestral se hacen exigibles al cierre del mes.
+    """
+
+    __slots__ = ("monto", "mes_inicio", "tasa", "freq", "saldo", "acum_trim", "interes_hist",
+                 "capitaliza", "es_mensual", "es_trim", "saldo_total", "_por_mes",
+                 "_f_capitaliza", "_f_mensual", "_f_trim", "_hay_trim", "k", "acum_mes", "_exigible")
+
+    def __init__(self, lista, freq_defecto, otra_es_al_final, subperiodos=1):
+        n = len(lista)
+        self.k = subperiodos
+        self.monto = np.array([float(t["monto"]) for t in lista], dtype=float)
+        self.mes_inicio = np.array([int(t.get("mes_inicio", 1)) for t in lista], dtype=np.int64)
+        self.tasa = np.array([(t["tasa_anual"] / 100) / 12 for t in lista], dtype=float)
+        if subperiodos > 1:
+            self.tasa = (1 + self.tasa) ** (1 / subperiodos) - 1
+        self.freq = np.array([codigo_freq(t.get("frecuencia_pago", freq_defecto), otra_es_al_final) for t in lista], dtype=np.int8)
+        self.capitaliza = self.freq != FREQ_OTRA
+        self.es_mensual = self.freq == FREQ_MENSUAL
+        self.es_trim = self.freq == FREQ_TRIMESTRAL
+        # Máscaras como 0/1 para multiplicar en vez de np.where en cada mes
+        self._f_capitaliza = self.capitaliza.astype(float)
+        self._f_mensual = self.es_mensual.astype(float)
+        self._f_trim = self.es_trim.astype(float)
+        self._hay_trim = bool(self.es_trim.any())
+        self.saldo = np.where(self.mes_inicio == 0, self.monto, 0.0) if n else np.zeros(0)
+        self.acum_trim = np.zeros(n)
+        self.acum_mes = np.zeros(n)
+        self._exigible = np.zeros(n)
+        self.interes_hist = np.zeros(n)
+        self.saldo_total = suma(self.saldo)
+        # Índices de los tramos que se desembolsan en cada paso (búsqueda O(1) en el ciclo)
+        self._por_mes = {}
+        for i, mes in enumerate(self.mes_inicio.tolist()):
+            paso = mes if subperiodos == 1 or mes <= 0 else (mes - 1) * subperiodos + 1
+            self._por_mes.setdefault(paso, []).append(i)
+
+    def __len__(self):
+        return len(self.monto)
+
+    def copia(self):
+        otro = LibroTramos.__new__(LibroTramos)
+        for campo in ("monto", "mes_inicio", "tasa", "freq", "capitaliza", "es_mensual", "es_trim", "_por_mes",
+                      "_f_capitaliza", "_f_mensual", "_f_trim", "_hay_trim", "k"):
+            setattr(otro, campo, getattr(self, campo))  # inmutables durante la simulación
+        otro.saldo = self.saldo.copy()
+        otro.acum_trim = self.acum_trim.copy()
+        otro.acum_mes = self.acum_mes.copy()
+        otro._exigible = self._exigible.copy()
+        otro.interes_hist = self.interes_hist.copy()
+        otro.saldo_total = self.saldo_total
+        return otro
+
+    def reanudar_desde(self, guardado):
+        """Toma saldos y acumuladores de un checkpoint para los tramos comunes (por posición)."""
+        k = min(len(self), len(guardado))
+        self.saldo[:k] = guardado.saldo[:k]
+        self.acum_trim[:k] = guardado.acum_trim[:k]
+        self.acum_mes[:k] = guardado.acum_mes[:k]
+        self.interes_hist[:k] = guardado.interes_hist[:k]
+        self.saldo_total = suma(self.saldo)
+
+    def desembolso_mes_0(self, ingreso=0.0):
+        for monto in self.monto[self.mes_inicio == 0].tolist():
+            ingreso += monto
+        return ingreso
+
+    def activar(self, m, ingreso=0.0):
+        """Desembolsa los tramos que parten en el mes m; devuelve `ingreso` más el ingreso de deuda."""
+        idx = self._por_mes.get(m)
+        if not idx:
+            return ingreso
+        for i in idx:
+            self.saldo[i] += self.monto[i]
+            ingreso += self.monto[i]
+        self.saldo_total = suma(self.saldo)
+        return ingreso
+
+    def devengar(self, m):
+        """Interés del mes (del paso m, con subperíodos); devuelve (generado, exigible hoy)."""
+        if not len(self.monto):
+            return 0.0, 0.0
+        if self.k > 1:
+            return self._devengar_subperiodo(m)
+        saldo = self.saldo
+        pos = saldo > 0
+        if not pos.any():
+            return 0.0, 0.0
+        ik = saldo * self.tasa * pos
+        self.interes_hist += ik
+        saldo += ik * self._f_capitaliza
+        exigible = ik * self._f_mensual
+        if self._hay_trim:
+            self.acum_trim += ik * self._f_trim
+            if m % 3 == 0:
+                corte = pos & self.es_trim
+                exigible[corte] = self.acum_trim[corte]
+                self.acum_trim[corte] = 0.0
+        self.saldo_total = suma(saldo)
+        return suma(ik), suma(exigible)
+
+    def _devengar_subperiodo(self, p):
+        # Como devengar, pero los intereses Mensual se acumulan y se cortan al cierre del mes
+        # (p múltiplo de k) y los Trimestral al cierre de los meses múltiplos de 3
+        saldo = self.saldo
+        pos = saldo > 0
+        if not pos.any():
+            return 0.0, 0.0
+        ik = saldo * self.tasa * pos
+        self.interes_hist += ik
+        saldo += ik * self._f_capitaliza
+        self.acum_mes += ik * self._f_mensual
+        if self._hay_trim:
+            self.acum_trim += ik * self._f_trim
+        self._exigible[:] = 0.0
+        if p % self.k == 0:
+            self._exigible += self.acum_mes
+            self.acum_mes[:] = 0.0
+            if self._hay_trim and (p // self.k) % 3 == 0:
+                corte = pos & self.es_trim
+                self._exigible[corte] += self.acum_trim[corte]
+                self.acum_trim[corte] = 0.0
+        self.saldo_total = suma(saldo)
+        return suma(ik), suma(self._exigible)
+
+    def pagar(self, m, dinero, exigible_total, es_cierre):
+        """Cascada de pago: en el cierre se salda todo; si no, intereses exigibles y luego capital pro-rata.
+
+        Devuelve (dinero restante, pago de intereses, pago total).
+        """
+        total = self.saldo_total
+        if total <= 0:
+            return dinero, 0, 0
+        if es_cierre:
+            self.saldo[:] = 0.0
+            self.saldo_total = 0.0
+            return dinero - total, 0, total
+        if dinero <= 0:
+            return dinero, 0, 0
+        monto_interes = min(dinero, exigible_total)
+        if exigible_total > 0 and self.k > 1:
+            self.saldo -= monto_interes * (self._exigible / exigible_total)
+        elif exigible_total > 0:
+            exigible = np.where(self.es_mensual, self.saldo * self.tasa, 0.0)
+            if m % 3 == 0:
+                exigible = exigible + np.where(self.es_trim, self.acum_trim, 0.0)
+            self.saldo -= monto_interes * (exigible / exigible_total)
+        dinero -= monto_interes
+        pago_total = monto_interes
+        if dinero > 0:
+            saldo_actual = suma(self.saldo)
+            monto_capital = min(dinero, saldo_actual)
+            if saldo_actual > 0:
+                self.saldo -= monto_capital * (self.saldo / saldo_actual)
+            dinero -= monto_capital
+            pago_total = monto_interes + monto_capital
+        self.saldo_total = suma(self.saldo)
+        return dinero, monto_interes, pago_total
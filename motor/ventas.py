@@ -0,0 +1,106 @@
+"""Recuperos de ventas: plan en % del total o libro de ventas por unidad, como calendario mensual denso."""
+import csv
+import io
+import json
+
+import numpy as np
+
+# Libro en columnas (listas paralelas): liviano de guardar, hashear y pasar a numpy
+CAMPOS_LIBRO = ("unidad", "precio", "mes_promesa", "mes_escritura", "pct_pie", "cuotas_pie")
+
+
+def leer_libro_ventas(texto):
+    """Lee un CSV (con encabezado) o JSON (lista de unidades) y devuelve el libro en columnas.
+
+    Por unidad: precio y mes_escritura obligatorios; mes_promesa (por defecto = escritura),
+    pct_pie (% del precio pagado como pie, por defecto 0) y cuotas_pie (meses en que se paga
+    el pie desde la promesa, por defecto 1).
+    """
+    texto = texto.strip()
+    if texto.startswith("[") or texto.startswith("{"):
+        obj = json.loads(texto)
+        filas = obj.get("unidades", []) if isinstance(obj, dict) else obj
+    else:
+        filas = list(csv.DictReader(io.StringIO(texto)))
+    libro = {c: [] for c in CAMPOS_LIBRO}
+    for i, f in enumerate(filas, start=1):
+        f = {k.strip().lower(): v for k, v in f.items() if k}
+        try:
+            escritura = int(float(f["mes_escritura"]))
+            promesa = int(float(f.get("mes_promesa") or escritura))
+            unidad = {
+                "unidad": str(f.get("unidad") or i),
+                "precio": float(f["precio"]),
+                "mes_promesa": promesa,
+                "mes_escritura": escritura,
+                "pct_pie": float(f.get("pct_pie") or 0.0),
+                "cuotas_pie": max(1, int(float(f.get("cuotas_pie") or 1))),
+            }
+        except (KeyError, ValueError) as e:
+            raise ValueError(f"Unidad {i}: {type(e).__name__} {e}") from None
+        if unidad["mes_escritura"] < unidad["mes_promesa"]:
+            raise ValueError(f"Unidad {unidad['unidad']}: escritura antes de la promesa")
+        if not 0.0 <= unidad["pct_pie"] <= 100.0:
+            raise ValueError(f"Unidad {unidad['unidad']}: pct_pie fuera de 0-100")
+        for c in CAMPOS_LIBRO:
+            libro[c].append(unidad[c])
+    return libro
+
+
+def precio_total(libro):
+    return float(sum(libro["precio"])) if libro else 0.0
+
+
+def tiene_libro(data):
+    libro = data.get("libro_ventas")
+    return bool(libro) and len(libro["precio"]) > 0
+
+
+def _eventos_libro(libro):
+    precio = np.asarray(libro["precio"], dtype=float)
+    cuotas = np.maximum(1, np.asarray(libro["cuotas_pie"], dtype=np.int64))
+    promesa = np.asarray(libro["mes_promesa"], dtype=np.int64)
+    pie = precio * (np.asarray(libro["pct_pie"], dtype=float) / 100)
+
+    idx = np.repeat(np.arange(len(precio)), cuotas)
+    desfase = np.arange(len(idx)) - np.repeat(np.cumsum(cuotas) - cuotas, cuotas)
+    meses = np.concatenate([promesa[idx] + desfase, np.asarray(libro["mes_escritura"], dtype=np.int64)])
+    montos = np.concatenate([(pie / cuotas)[idx], precio - pie])
+    positivos = montos > 0
+    return meses, montos, (int(meses[positivos].max()) if positivos.any() else -1), float(precio.sum())
+
+
+def eventos_recuperos(data, memo=None):
+    """(meses, montos, último mes con venta, escala) de cada recupero, en el orden en que se suman.
+
+    El ingreso de cada mes es la suma de sus montos multiplicada por `escala`. En un libro los
+    precios fijan la forma del calendario y valor_venta_total el nivel (así la sensibilidad y
+    Monte Carlo sobre el precio de venta siguen funcionando). `memo` (dict) reutiliza el
+    calendario de un mismo libro entre escenarios de un lote.
+    """
+    if tiene_libro(data):
+        libro = data["libro_ventas"]
+        if memo is None:
+            memo = {}
+        if id(libro) not in memo:
+            memo[id(libro)] = (libro, _eventos_libro(libro))  # guarda el libro para que su id no se recicle
+        meses, montos, ultimo, total = memo[id(libro)][1]
+        return meses, montos, ultimo, (data["valor_venta_total"] / total if total > 0 else 0.0)
+    plan = data["plan_ventas"]
+    meses = np.array([int(p["mes"]) for p in plan], dtype=np.int64)
+    montos = np.array([data["valor_venta_total"] * (p["pct"] / 100) for p in plan], dtype=float)
+    meses_venta = [int(p["mes"]) for p in plan if p["pct"] > 0]
+    return meses, montos, (max(meses_venta) if meses_venta else -1), 1.0
+
+
+def calendario_denso(meses, montos, horizonte):
+    """Ingreso por mes 0..horizonte (el mes 0 y los meses fuera de rango no recaudan)."""
+    validos = (meses >= 1) & (meses <= horizonte)
+    return np.bincount(meses[validos], weights=montos[validos], minlength=horizonte + 1)
+
+
+def desfasar_libro(libro, desfase):
+    """Corre promesas y escrituras `desfase` meses (sin bajar del mes 1)."""
+    return {**libro,
+            "mes_promesa": np.maximum(1, np.asarray(libro["mes_promesa"]) + desfase).tolist(),
+            "mes_escritura": np.maximum(1, np.asarray(libro["mes_escritura"]) + desfase).tolist()}
@@ -1,21 +1,40 @@
 import streamlit as st
-import pandas as pd
-import plotly.graph_objects as go
-import io
 import copy
+import functools
+import importlib.util
+import io
+import os
+import time
+import uuid
+from collections import deque
+import numpy as np
+from motor import perfil
+from motor.almacen import AlmacenResultados
+from motor.exportar import MIME_XLSX, libro_excel
+from motor.flujo import PASOS_TIEMPO, calcular_flujo, get_default_config
+from motor.hitos import devengado_hasta, hitos_proyecto, indice_intereses, tabla_hitos
+from motor.memoria import formatear_bytes, tamano
+from motor.cache import CacheCompartida, CacheResultados
+from motor.cartera import Cartera, leer_cartera
+from motor.canonico import hash_canonico
+from motor.montecarlo import (CURVAS_MC, DISTRIBUCIONES, VARIABLES_MC, bandas_percentiles, config_montecarlo_defecto,
+                              resumen_percentiles, simular_montecarlo)
+from motor.persistencia import VERSION as VERSION_ESCENARIOS, cargar, guardar_escenarios, migrar
+from motor.objetivo import METRICAS_OBJETIVO, VARIABLES_OBJETIVO, buscar_objetivo, rango_defecto
+from motor.reanudable import SimulacionReanudable
+from motor.sensibilidad import MIN_CELDAS_PARALELO, VARIABLES_SENSIBILIDAD, METRICAS, evaluar_cubo, pasos_variacion, valores_eje
+from motor.tornado import METRICAS_TORNADO, calcular_tornado, ordenar
+from motor.trabajos import CANCELADO, EN_CURSO, ERROR, LISTO, GestorTrabajos, cancelar_obsoletos
+from motor.ventas import leer_libro_ventas, precio_total, tiene_libro
 
 # --- CONFIGURACIÓN DE PÁGINA ---
 st.set_page_config(page_title="Evaluación Inmobiliaria Pro", layout="wide", page_icon="🏢")
 
-# --- 0. LIMPIEZA DE CACHÉ AUTOMÁTICA ---
-if 'data_scenarios' in st.session_state:
-    try:
-        test_key = st.session_state.data_scenarios["Real"].get("pct_avance_inicial")
-        if test_key is None: 
-            raise KeyError
-    except KeyError:
-        st.session_state.clear()
-        st.rerun()
+# --- 0. MIGRACIÓN DEL ESTADO ---
+# Un estado de sesión de una versión anterior (p.ej. sin pct_avance_inicial) se migra en vez de borrarse
+if 'data_scenarios' in st.session_state and st.session_state.get('version_escenarios', 0) < VERSION_ESCENARIOS:
+    st.session_state.data_scenarios = migrar(st.session_state.data_scenarios, st.session_state.get('version_escenarios', 0))
+    st.session_state.version_escenarios = VERSION_ESCENARIOS
 
 # --- ESTILOS CSS ---
 def local_css():
@@ -75,439 +94,185 @@ if 'menu_expanded' not in st.session_state:
 if 'exp_reset_token' not in st.session_state:
     st.session_state.exp_reset_token = 0
 
-def get_default_config(type_scen):
-    if type_scen == "Optimista":
-        venta, tasa_uf, constr = 155000, 5.5, 68000
-        inflacion, tasa_clp = 3.0, 9.0
-        otros_costos_ini = 2500.0
-    elif type_scen == "Pesimista":
-        venta, tasa_uf, constr = 130000, 8.0, 75000
-        inflacion, tasa_clp = 6.0, 14.0
-        otros_costos_ini = 4000.0
-    else: # Real
-        venta, tasa_uf, constr = 140000, 6.5, 70000
-        inflacion, tasa_clp = 4.0, 11.0
-        otros_costos_ini = 3000.0
-        
-    return {
-        "valor_terreno": 0.0,
-        "pct_fin_terreno": 0.0,
-        "valor_contrato": 0.0,
-        "pct_fin_construccion": 0.0,
-        "duracion_obra": 0, 
-        "mes_inicio_obra": 0,
-        "pct_avance_inicial": 0.0, 
-        "mes_recepcion": 0,
-        "saldo_inicial_uf": 0.0,
-        "intereses_previos_uf": 0.0,
-        "aporte_socios": 0.0,
-        "total_otros_costos_inicial": 0.0,
-        "otros_costos_mensuales": 0.0,
-        "otros_costos_pagados_anteriores": 0.0,
-        "rango_pago_terreno": [1, 60], 
-        "prioridad_terreno": False,      
-        "tasa_anual_uf": 0.0,
-        "pct_deuda_pesos": 0.0, 
-        "tasa_anual_clp": 0.0, 
-        "inflacion_anual": 0.0,
-        "pagar_intereses_construccion": False,
-        "lista_relacionadas": [], 
-        "lista_kps": [], 
-        "valor_venta_total": 0.0,
-        "plan_ventas": [] 
-    }
+if 'config_mc' not in st.session_state:
+    st.session_state.config_mc = config_montecarlo_defecto()
 
 if 'data_scenarios' not in st.session_state:
     st.session_state.data_scenarios = {k: get_default_config(k) for k in SCENARIOS}
+    st.session_state.version_escenarios = VERSION_ESCENARIOS
 
 # --- 2. MOTOR DE CÁLCULO ---
-def calcular_flujo(data):
-    v_terr = data["valor_terreno"]
-    v_cont = data["valor_contrato"]
-    v_otros_inicial = data.get("total_otros_costos_inicial", 0.0)
-    v_otros_mensual = data.get("otros_costos_mensuales", 0.0)
-    v_otros_anteriores = data.get("otros_costos_pagados_anteriores", 0.0)
-    v_aporte_socios = data.get("aporte_socios", 0.0)
-    
-    duracion = int(data["duracion_obra"])
-    inicio_obra = int(data.get("mes_inicio_obra", 0)) 
-    pct_avance_inicial = data.get("pct_avance_inicial", 0.0) / 100.0
-    recepcion = int(data["mes_recepcion"])
-    fin_obra = (inicio_obra + duracion - 1) if duracion > 0 else -1
-    
-    saldo_inicial = data.get("saldo_inicial_uf", 0)
-    rango_terr = data.get("rango_pago_terreno", [1, 60])
-    inicio_pago_t, fin_pago_t = rango_terr[0], rango_terr[1]
-    prioridad_t = data.get("prioridad_terreno", False)
-    pagar_int_const = data.get("pagar_intereses_construccion", False)
-    
-    pct_clp = data["pct_deuda_pesos"] / 100.0
-    pct_uf = 1.0 - pct_clp
-    tasa_mensual_uf = (data["tasa_anual_uf"]/100) / 12
-    tasa_mensual_clp = (data["tasa_anual_clp"]/100) / 12
-    inflacion_mensual = ((1 + data["inflacion_anual"]/100)**(1/12)) - 1
-    
-    pct_fin_terr = data["pct_fin_terreno"]/100
-    deuda_terr_total = v_terr * pct_fin_terr
-    pct_fin_const = data["pct_fin_construccion"]/100
-    
-    saldo_terr_uf = deuda_terr_total * pct_uf
-    saldo_terr_clp_nominal = deuda_terr_total * pct_clp 
-    saldo_const_uf = saldo_inicial * pct_uf
-    saldo_const_clp_nominal = saldo_inicial * pct_clp 
-    
-    rel_activos = []
-    for rel in data.get("lista_relacionadas", []):
-        mes_ini_rel = int(rel.get("mes_inicio", 1))
-        saldo_inicial_rel = rel["monto"] if mes_ini_rel == 0 else 0.0
-        rel_activos.append({
-            "monto_total": rel["monto"], "mes_inicio": mes_ini_rel, "saldo": saldo_inicial_rel,
-            "tasa_mensual": (rel["tasa_anual"] / 100) / 12, "frecuencia": rel.get("frecuencia_pago", "Al Final"), "acumulado_trimestre": 0
-        })
-
-    kps_activos = []
-    for kp in data.get("lista_kps", []):
-        mes_ini_kp = int(kp.get("mes_inicio", 1))
-        saldo_inicial_kp = kp["monto"] if mes_ini_kp == 0 else 0.0
-        kps_activos.append({
-            "monto_total": kp["monto"], "mes_inicio": mes_ini_kp, "saldo": saldo_inicial_kp,
-            "tasa_mensual": (kp["tasa_anual"] / 100) / 12, "plazo": kp["plazo"],
-            "frecuencia": kp.get("frecuencia_pago", "Mensual"), "acumulado_trimestre": 0, "interes_acumulado_hist": 0
-        })
-
-    recuperos = []
-    meses_con_venta = []
-    for p in data["plan_ventas"]:
-        recuperos.append({"Mes": int(p["mes"]), "Monto": data["valor_venta_total"] * (p["pct"]/100)})
-        if p["pct"] > 0: meses_con_venta.append(int(p["mes"]))
-    
-    ultimo_mes_venta = max(meses_con_venta) if meses_con_venta else -1
-    
-    horizonte = recepcion + 12
-    if recuperos:
-        horizonte = max(horizonte, max([r["Mes"] for r in recuperos]) + 6)
-    horizonte = max(horizonte, fin_obra + 6)
-    if horizonte < 12: horizonte = 12
-        
-    flujo = []
-    
-    equity_terreno = v_terr * (1 - pct_fin_terr)
-    inversion_inicial = equity_terreno + v_otros_inicial
-    ingreso_deuda_mes_0 = 0.0
-    for kp in kps_activos:
-        if kp["mes_inicio"] == 0: ingreso_deuda_mes_0 += kp["monto_total"]
-    for rel in rel_activos:
-        if rel["mes_inicio"] == 0: ingreso_deuda_mes_0 += rel["monto_total"]
-            
-    flujo_neto_ini = -inversion_inicial + ingreso_deuda_mes_0 + v_aporte_socios
-    
-    saldo_total_rel = sum(r['saldo'] for r in rel_activos)
-    saldo_total_kps = sum(k['saldo'] for k in kps_activos)
-
-    flujo.append({
-        "Mes": 0,
-        "Deuda Total": (saldo_const_uf + saldo_terr_uf) + (saldo_const_clp_nominal + saldo_terr_clp_nominal) + saldo_total_rel + saldo_total_kps,
-        "Ingresos": 0.0, "Ingresos Deuda": ingreso_deuda_mes_0, "Otros Costos (Op)": 0.0,
-        "Int. Banco": 0.0, "Int. KPs": 0.0, "Int. Relac.": 0.0,
-        "Devengado Banco": 0.0, "Devengado KPs": 0.0, "Devengado Relac.": 0.0,
-        "Pago Intereses Total": 0.0, "Pago Capital": 0.0,
-        "Inversión (Equity)": inversion_inicial, "Flujo Neto": flujo_neto_ini, "Flujo Acumulado": flujo_neto_ini
-    })
-    
-    interes_acum_banco_total = 0 
-    interes_acum_kps = 0
-    interes_acum_relacionada = 0
-    total_otros_costos_operativos = 0 
-    
-    factor_uf = 1.0 
-    acumulado_actual = flujo_neto_ini
-    mes_break_even = None
-    if acumulado_actual >= 0: mes_break_even = 0
-    
-    for m in range(1, horizonte + 1):
-        factor_uf *= (1 + inflacion_mensual)
-        
-        ingreso_deuda_este_mes = 0.0
-        for rel in rel_activos:
-            if m == rel["mes_inicio"]:
-                rel["saldo"] += rel["monto_total"]
-                ingreso_deuda_este_mes += rel["monto_total"]
-        for kp in kps_activos:
-            if m == kp["mes_inicio"]:
-                kp["saldo"] += kp["monto_total"]
-                ingreso_deuda_este_mes += kp["monto_total"]
-        
-        int_uf_mes = (saldo_const_uf + saldo_terr_uf) * tasa_mensual_uf
-        if m == 1: saldo_terr_clp_nominal *= 1.0 
-        int_clp_nom_mes = (saldo_const_clp_nominal + saldo_terr_clp_nominal) * tasa_mensual_clp
-        int_banco_mes_en_uf = int_uf_mes + (int_clp_nom_mes / factor_uf)
-        
-        saldo_const_uf += int_uf_mes
-        saldo_const_clp_nominal += int_clp_nom_mes
-        interes_acum_banco_total += int_banco_mes_en_uf
-
-        int_kps_generado_mes = 0 
-        total_interes_kp_exigible_hoy = 0 
-        for kp in kps_activos:
-            if kp["saldo"] > 0:
-                ik = kp["saldo"] * kp["tasa_mensual"]
-                kp["interes_acumulado_hist"] += ik
-                int_kps_generado_mes += ik
-                interes_exigible_este_kp = 0
-                if kp["frecuencia"] == "Mensual":
-                    kp["saldo"] += ik
-                    interes_exigible_este_kp = ik
-                elif kp["frecuencia"] == "Trimestral":
-                    kp["saldo"] += ik
-                    kp["acumulado_trimestre"] += ik
-                    if m % 3 == 0:
-                        interes_exigible_este_kp = kp["acumulado_trimestre"]
-                        kp["acumulado_trimestre"] = 0 
-                elif kp["frecuencia"] == "Al Final":
-                    kp["saldo"] += ik
-                total_interes_kp_exigible_hoy += interes_exigible_este_kp
-        interes_acum_kps += int_kps_generado_mes
-        
-        int_rel_mes = 0
-        total_interes_rel_exigible_hoy = 0
-        for rel in rel_activos:
-            if rel["saldo"] > 0:
-                ir = rel["saldo"] * rel["tasa_mensual"]
-                int_rel_mes += ir
-                interes_exigible_este_rel = 0
-                if rel["frecuencia"] == "Mensual":
-                    rel["saldo"] += ir
-                    interes_exigible_este_rel = ir
-                elif rel["frecuencia"] == "Trimestral":
-                    rel["saldo"] += ir
-                    rel["acumulado_trimestre"] += ir
-                    if m % 3 == 0:
-                        interes_exigible_este_rel = rel["acumulado_trimestre"]
-                        rel["acumulado_trimestre"] = 0
-                else: 
-                    rel["saldo"] += ir
-                total_interes_rel_exigible_hoy += interes_exigible_este_rel
-        interes_acum_relacionada += int_rel_mes
-
-        egreso_equity_const = 0
-        if duracion > 0 and m >= inicio_obra and m <= fin_obra:
-            if m == inicio_obra:
-                costo_mes_total = v_cont if duracion == 1 else v_cont * pct_avance_inicial
-            else:
-                pct_restante = 1.0 - pct_avance_inicial
-                remanente = v_cont * pct_restante
-                meses_restantes = duracion - 1
-                costo_mes_total = remanente / meses_restantes if meses_restantes > 0 else 0
-            
-            giro_banco = costo_mes_total * pct_fin_const
-            egreso_equity_const = costo_mes_total - giro_banco 
-            saldo_const_uf += giro_banco * pct_uf
-            saldo_const_clp_nominal += (giro_banco * pct_clp) * factor_uf 
-        
-        ingreso_uf = sum([r["Monto"] for r in recuperos if r["Mes"] == m])
-        gasto_operativo_mes = v_otros_mensual if (m <= recepcion + 6) else 0 
-        total_otros_costos_operativos += gasto_operativo_mes
-        
-        flujo_operativo = ingreso_uf + ingreso_deuda_este_mes - gasto_operativo_mes
-        dinero_para_deuda = max(0.0, flujo_operativo)
-        
-        if pagar_int_const:
-            if dinero_para_deuda < int_banco_mes_en_uf:
-                deficit = int_banco_mes_en_uf - dinero_para_deuda
-                dinero_para_deuda += deficit 
-                egreso_equity_const += deficit 
-        
-        es_mes_cierre = (m == ultimo_mes_venta)
-        
-        real_const_uf = saldo_const_uf + (saldo_const_clp_nominal / factor_uf)
-        real_terr_uf = saldo_terr_uf + (saldo_terr_clp_nominal / factor_uf)
-        deuda_banco_total = real_const_uf + real_terr_uf
-        
-        pago_banco_total = 0
-        pago_banco_interes = 0
-        pago_banco_capital = 0
+# calcular_flujo y get_default_config viven en motor/flujo.py (importable sin Streamlit).
 
-        if deuda_banco_total > 0:
-            if es_mes_cierre:
-                monto_a_pagar_banco = deuda_banco_total
-            else:
-                monto_a_pagar_banco = min(deuda_banco_total, dinero_para_deuda) if dinero_para_deuda > 0 else 0
-            
-            if monto_a_pagar_banco > 0:
-                pago_banco_interes = min(monto_a_pagar_banco, int_banco_mes_en_uf)
-                if pagar_int_const and pago_banco_interes < int_banco_mes_en_uf and monto_a_pagar_banco >= int_banco_mes_en_uf:
-                    pago_banco_interes = int_banco_mes_en_uf
+# --- 3. UI ---
+FRECUENCIAS = ["Mensual", "Trimestral", "Al Final"]
+# Campo del escenario -> sufijo de la key de su widget (f"{escenario}_{sufijo}")
+WIDGET_CAMPO = {"valor_venta_total": "vvt", "valor_contrato": "vc", "valor_terreno": "vt", "pct_fin_construccion": "fin_c",
+                "pct_fin_terreno": "fin_t", "tasa_anual_uf": "tuf", "tasa_anual_clp": "tclp"}
+TRAMOS_MAX_FORMULARIO = 8  # sobre esto, los tramos se editan como tabla
 
-                pago_banco_capital = monto_a_pagar_banco - pago_banco_interes
-                
-                p_terr, p_const = 0, 0
-                if pago_banco_capital > 0:
-                    p_terr = min(real_terr_uf, pago_banco_capital)
-                    p_const = pago_banco_capital - p_terr
-
-                if p_terr > 0 and real_terr_uf > 0:
-                    prop = p_terr / real_terr_uf
-                    if es_mes_cierre and p_terr >= real_terr_uf - 0.1: 
-                         saldo_terr_uf = 0
-                         saldo_terr_clp_nominal = 0
-                    else:
-                        saldo_terr_uf -= (saldo_terr_uf * prop)
-                        saldo_terr_clp_nominal -= (saldo_terr_clp_nominal * prop)
-
-                if p_const > 0 and real_const_uf > 0:
-                    prop = p_const / real_const_uf
-                    if es_mes_cierre and p_const >= real_const_uf - 0.1:
-                        saldo_const_uf = 0
-                        saldo_const_clp_nominal = 0
-                    else:
-                        saldo_const_uf -= (saldo_const_uf * prop)
-                        saldo_const_clp_nominal -= (saldo_const_clp_nominal * prop)
-                
-                pago_banco_total = monto_a_pagar_banco
-                dinero_para_deuda -= pago_banco_total
+def editar_tramos_tabla(lista, defecto, key):
+    """Edita una lista de tramos en un data_editor; devuelve la lista saneada."""
+    import pandas as pd
+    # El editor necesita la misma tabla base entre reruns (aplica sus ediciones sobre ella);
+    # sólo se reconstruye si la lista cambió por fuera del editor.
+    tablas = st.session_state.setdefault("tablas_tramos", {})
+    estado = tablas.get(key)
+    if estado is None or estado["salida"] != lista:
+        version = estado["version"] + 1 if estado else 0
+        estado = tablas[key] = {"base": pd.DataFrame(lista, columns=list(defecto)), "salida": None, "version": version}
+    editado = st.data_editor(
+        estado["base"], num_rows="dynamic", use_container_width=True, hide_index=True, key=f"{key}_{estado['version']}",
+        column_config={
+            "monto": st.column_config.NumberColumn("Monto", min_value=0.0, format="%.2f"),
+            "tasa_anual": st.column_config.NumberColumn("Tasa %", format="%.2f"),
+            "mes_inicio": st.column_config.NumberColumn("Mes Inicio", step=1),
+            "plazo": st.column_config.NumberColumn("Plazo", step=1),
+            "frecuencia_pago": st.column_config.SelectboxColumn("Pago Interés", options=FRECUENCIAS),
+        },
+    )
+    tramos = []
+    for i, fila in enumerate(editado.to_dict("records")):
+        # Las filas nuevas llegan con celdas vacías (None/NaN): se completan con el valor por defecto
+        t = {c: (defecto[c] if v is None or (isinstance(v, float) and np.isnan(v)) else v) for c, v in fila.items()}
+        t["monto"], t["tasa_anual"] = float(t["monto"]), float(t["tasa_anual"])
+        t["mes_inicio"] = int(t["mes_inicio"])
+        if "plazo" in t: t["plazo"] = int(t["plazo"])
+        if not t.get("nombre"): t["nombre"] = f"{defecto['nombre']} {i+1}"
+        tramos.append(t)
+    estado["salida"] = tramos
+    return tramos
 
-        pago_kps_total = 0
-        pago_kps_interes = 0
-        saldo_total_kps_contable = sum(k['saldo'] for k in kps_activos)
-        
-        if saldo_total_kps_contable > 0:
-            if es_mes_cierre:
-                monto_total_kp_pagar = saldo_total_kps_contable
-                pago_kps_interes = 0 
-                pago_kps_total = monto_total_kp_pagar
-                for kp in kps_activos: kp["saldo"] = 0
-                dinero_para_deuda -= pago_kps_total
-            elif dinero_para_deuda > 0:
-                monto_interes_kp_pagar = min(dinero_para_deuda, total_interes_kp_exigible_hoy)
-                for kp in kps_activos:
-                    exigible_kp = 0
-                    if kp["frecuencia"] == "Mensual": exigible_kp = (kp["saldo"] * kp["tasa_mensual"])
-                    elif kp["frecuencia"] == "Trimestral" and m % 3 == 0: exigible_kp = kp["acumulado_trimestre"]
-                    if total_interes_kp_exigible_hoy > 0:
-                        peso_int = exigible_kp / total_interes_kp_exigible_hoy
-                        pago_i = monto_interes_kp_pagar * peso_int
-                        kp["saldo"] -= pago_i
-                pago_kps_interes = monto_interes_kp_pagar
-                dinero_para_deuda -= pago_kps_interes
-                if dinero_para_deuda > 0:
-                    monto_capital_kp = min(dinero_para_deuda, sum(k['saldo'] for k in kps_activos))
-                    pago_kps_total = pago_kps_interes + monto_capital_kp
-                    saldo_kps_actual = sum(k['saldo'] for k in kps_activos)
-                    for kp in kps_activos:
-                        if saldo_kps_actual > 0:
-                            peso = kp["saldo"] / saldo_kps_actual
-                            abono = monto_capital_kp * peso
-                            kp["saldo"] -= abono
-                    dinero_para_deuda -= monto_capital_kp
-                else:
-                    pago_kps_total = pago_kps_interes
+st.title("📊 Análisis Gasto financiero proyectos inmobiliarios")
 
-        pago_rel_total = 0
-        pago_rel_interes = 0
-        saldo_total_rel_contable = sum(r['saldo'] for r in rel_activos)
-        
-        if saldo_total_rel_contable > 0:
-            if es_mes_cierre:
-                monto_total_rel_pagar = saldo_total_rel_contable
-                pago_rel_total = monto_total_rel_pagar
-                for rel in rel_activos: rel["saldo"] = 0
-                dinero_para_deuda -= pago_rel_total
-            elif dinero_para_deuda > 0:
-                monto_interes_rel_pagar = min(dinero_para_deuda, total_interes_rel_exigible_hoy)
-                for rel in rel_activos:
-                    exigible_rel = 0
-                    if rel["frecuencia"] == "Mensual": exigible_rel = (rel["saldo"] * rel["tasa_mensual"])
-                    elif rel["frecuencia"] == "Trimestral" and m % 3 == 0: exigible_rel = rel["acumulado_trimestre"]
-                    if total_interes_rel_exigible_hoy > 0:
-                        peso_int = exigible_rel / total_interes_rel_exigible_hoy
-                        pago_i = monto_interes_rel_pagar * peso_int
-                        rel["saldo"] -= pago_i
-                pago_rel_interes = monto_interes_rel_pagar
-                dinero_para_deuda -= pago_rel_interes
-                if dinero_para_deuda > 0:
-                    monto_capital_rel = min(dinero_para_deuda, sum(r['saldo'] for r in rel_activos))
-                    pago_rel_total = pago_rel_interes + monto_capital_rel
-                    saldo_rel_actual = sum(r['saldo'] for r in rel_activos)
-                    for rel in rel_activos:
-                        if saldo_rel_actual > 0:
-                            peso = rel["saldo"] / saldo_rel_actual
-                            abono = monto_capital_rel * peso
-                            rel["saldo"] -= abono
-                    dinero_para_deuda -= monto_capital_rel
-                else:
-                    pago_rel_total = pago_rel_interes
+col_inputs, col_dash = st.columns([1.3, 2.7], gap="medium")
 
-        total_pagado_intereses = pago_banco_interes + pago_kps_interes + pago_rel_interes
-        total_pagado_capital = (pago_banco_total + pago_kps_total + pago_rel_total) - total_pagado_intereses
-        flujo_neto_mes = dinero_para_deuda - egreso_equity_const 
-        if flujo_operativo < 0:
-            flujo_neto_mes = flujo_operativo - egreso_equity_const
+# Caché única de resultados: cada escenario (y cada celda de sensibilidad) se identifica
+# por el hash canónico de sus datos, así un rerun sólo recalcula lo que cambió.
+# Detrás de la caché de cada sesión, un almacén en disco compartido por todas las sesiones y procesos.
+@st.cache_resource
+def almacen_resultados():
+    ruta = os.environ.get("GASTO_ALMACEN", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "resultados.sqlite"))
+    return AlmacenResultados(ruta)
 
-        acumulado_actual += flujo_neto_mes
-        saldo_kps_reporte = sum([k["saldo"] for k in kps_activos])
-        saldo_rel_reporte = sum([r["saldo"] for r in rel_activos])
-        
-        if acumulado_actual >= 0 and mes_break_even is None:
-            mes_break_even = m
-
-        deuda_banco_reporte = (saldo_const_uf + saldo_terr_uf) + ((saldo_const_clp_nominal + saldo_terr_clp_nominal) / factor_uf)
-
-        flujo.append({
-            "Mes": m,
-            "Deuda Banco": deuda_banco_reporte,
-            "Deuda KPs": saldo_kps_reporte,
-            "Deuda Relac.": saldo_rel_reporte,
-            "Deuda Total": deuda_banco_reporte + saldo_kps_reporte + saldo_rel_reporte,
-            "Ingresos": ingreso_uf,
-            "Ingresos Deuda": ingreso_deuda_este_mes, 
-            "Otros Costos (Op)": gasto_operativo_mes,
-            "Inversión (Equity)": egreso_equity_const,
-            "Int. Banco": pago_banco_interes,
-            "Int. KPs": pago_kps_interes,
-            "Int. Relac.": pago_rel_interes,
-            "Devengado Banco": int_banco_mes_en_uf,
-            "Devengado KPs": int_kps_generado_mes,
-            "Devengado Relac.": int_rel_mes,
-            "Pago Intereses Total": total_pagado_intereses,
-            "Pago Capital": total_pagado_capital,
-            "Flujo Neto": flujo_neto_mes,
-            "Flujo Acumulado": acumulado_actual
-        })
-    
-    df = pd.DataFrame(flujo)
-    costo_fin_total = interes_acum_banco_total + interes_acum_kps + interes_acum_relacionada
-    costo_proyecto_total = v_terr + v_cont + v_otros_inicial + total_otros_costos_operativos + costo_fin_total + v_otros_anteriores
-    utilidad = data["valor_venta_total"] - costo_proyecto_total
-    roi = (utilidad / costo_proyecto_total) * 100 if costo_proyecto_total > 0 else 0
-
-    return {
-        "df": df, "utilidad": utilidad, "costo_financiero_total": costo_fin_total,
-        "detalles_fin": { "banco": interes_acum_banco_total, "kps": interes_acum_kps, "relacionada": interes_acum_relacionada },
-        "roi": roi, "peak_deuda": df["Deuda Total"].max(), "break_even": mes_break_even
-    }
+# --- MEMORIA (HOSTING MULTIUSUARIO) ---
+# Cada sesión tiene un presupuesto; lo que no depende de la sesión (resultados de un mismo
+# escenario, libros Excel de las mismas entradas) vive una sola vez en memoria del proceso.
+MB = 2**20
+PRESUPUESTO_SESION = float(os.environ.get("GASTO_MEMORIA_SESION_MB", 64)) * MB
+MEMORIA_COMPARTIDA = float(os.environ.get("GASTO_MEMORIA_COMPARTIDA_MB", 256)) * MB
+SESION_INACTIVA_S = 3600  # el registro de memoria olvida sesiones sin corridas en este plazo
+PERFIL_DEFECTO = os.environ.get("GASTO_PERFIL", "") == "1"  # medir tiempos por fase desde el inicio
+MAX_PERFILES = 50  # corridas medidas que se conservan por sesión
 
-# --- 3. UI ---
-st.title("📊 Análisis Gasto financiero proyectos inmobiliarios")
+@st.cache_resource
+def resultados_compartidos():
+    return CacheCompartida(MEMORIA_COMPARTIDA)
 
-col_inputs, col_dash = st.columns([1.3, 2.7], gap="medium")
+@st.cache_resource
+def libros_excel_compartidos():
+    return CacheCompartida(MEMORIA_COMPARTIDA / 8)
 
-if 'calc_results' not in st.session_state:
-    st.session_state.calc_results = {name: calcular_flujo(st.session_state.data_scenarios[name]) for name in SCENARIOS}
+@st.cache_resource
+def gestor_trabajos():
+    # Hilos compartidos por todas las sesiones para los análisis pesados (ver motor.trabajos)
+    return GestorTrabajos(int(os.environ.get("GASTO_TRABAJOS", 2)))
 
-with col_inputs:
+@st.cache_resource
+def registro_sesiones():
+    # id de sesión -> {"bytes", "actualizado"}; lo escribe cada sesión al terminar una corrida
+    return {}
+
+id_sesion = st.session_state.setdefault("id_sesion", uuid.uuid4().hex)
+
+if 'cache_resultados' not in st.session_state:
+    st.session_state.cache_resultados = CacheResultados(calcular_flujo, almacen=almacen_resultados(),
+                                                        compartida=resultados_compartidos(), max_bytes=PRESUPUESTO_SESION / 2)
+cache_resultados = st.session_state.cache_resultados
+
+# --- PERFIL DE TIEMPOS (OPCIONAL) ---
+# Cada corrida completa tiene un motor.perfil.Perfil activo con las fases del motor y de cada
+# sección; un fragmento que corre solo abre su propio registro. Sin medición activa no cuesta nada.
+def perfil_habilitado():
+    return st.session_state.get("perfil_activo", PERFIL_DEFECTO)
+
+def registrar_perfil(p):
+    st.session_state.setdefault("perfiles", deque(maxlen=MAX_PERFILES)).append(p.cerrar().a_dict())
+
+def medido(nombre):
+    def envolver(funcion):
+        @functools.wraps(funcion)
+        def seccion(*args, **kwargs):
+            if not perfil_habilitado():
+                return funcion(*args, **kwargs)
+            propio = not st.session_state.get("corrida_app", True) or perfil.actual() is None
+            p = perfil.Perfil(f"fragmento: {nombre}") if propio else perfil.actual()
+            if propio:
+                perfil.activar(p)
+            try:
+                with p.medir(f"sección: {nombre}"):
+                    return funcion(*args, **kwargs)
+            finally:
+                if propio:
+                    perfil.activar(None)
+                    registrar_perfil(p)
+        return seccion
+    return envolver
+
+def grafico(fig, **kwargs):
+    # Serializar la figura a JSON y enviarla suele ser la parte cara de un gráfico grande
+    with perfil.medir("plotly: serializar gráfico"):
+        st.plotly_chart(fig, **kwargs)
+
+# --- PANEL DE ENTRADAS (FRAGMENTO) ---
+def olvidar_widgets_escenarios():
+    # Los widgets con key conservan su valor anterior: se borran para que tomen el de los datos cargados
+    for k in list(st.session_state):
+        if not k.startswith("up_") and any(k.startswith(f"{s}_") or f"_{s}" in k for s in SCENARIOS):
+            del st.session_state[k]
+    st.session_state.pop("tablas_tramos", None)
+
+def rerun_panel():
+    # scope="fragment" sólo es válido cuando el panel corre solo; dentro de una corrida completa se re-ejecuta la app
+    st.rerun(scope="app" if st.session_state.get("corrida_app", True) else "fragment")
+
+
+# Editar un input sólo re-ejecuta este panel y las tarjetas KPI; las secciones pesadas del
+# tablero son fragmentos propios que se recalculan al abrirlas o con "Procesar y Actualizar".
+@st.fragment
+@medido("entradas")
+def panel_entradas():
     st.markdown("### Configuración")
     col_btn1, col_btn2 = st.columns(2)
     if col_btn1.button("🔽 Expandir Todo", key="btn_expand", use_container_width=True):
         st.session_state.menu_expanded = True
         st.session_state.exp_reset_token += 1 
-        st.rerun()
+        rerun_panel()
     if col_btn2.button("🔼 Colapsar Todo", key="btn_collapse", use_container_width=True):
         st.session_state.menu_expanded = False
         st.session_state.exp_reset_token += 1 
-        st.rerun()
+        rerun_panel()
     if st.button("🚀 Procesar y Actualizar", type="primary", use_container_width=True):
-        st.session_state.calc_results = {name: calcular_flujo(st.session_state.data_scenarios[name]) for name in SCENARIOS}
+        cache_resultados.limpiar()
         st.rerun()
+
+    with st.expander("💾 Guardar / Cargar Escenarios"):
+        st.download_button("💾 Guardar escenarios", data=lambda: guardar_escenarios(exportar["entradas"]), file_name="escenarios.json.gz",
+                           mime="application/gzip", use_container_width=True, key="btn_guardar_esc")
+        archivo_esc = st.file_uploader("Cargar escenarios (.json.gz o .json)", type=["gz", "json"], key="up_escenarios")
+        if archivo_esc is not None and st.session_state.get("escenarios_archivo") != archivo_esc.file_id:
+            st.session_state.escenarios_archivo = archivo_esc.file_id
+            try:
+                conjunto = cargar(archivo_esc.getvalue())
+            except ValueError as e:
+                st.error(f"No se pudo leer el archivo: {e}")
+            else:
+                if "escenarios" not in conjunto:
+                    st.error("El archivo es una cartera; cárgalo en la sección Cartera Consolidada.")
+                else:
+                    st.session_state.data_scenarios = {k: conjunto["escenarios"].get(k) or get_default_config(k) for k in SCENARIOS}
+                    olvidar_widgets_escenarios()
+                    st.rerun()
     
     tabs = st.tabs(["🟦 Real", "🟩 Optimista", "🟥 Pesimista"])
     
@@ -548,6 +313,14 @@ with col_inputs:
                 data["tasa_anual_clp"] = c2.number_input("Tasa CLP", value=data["tasa_anual_clp"], step=0.1, key=f"{scen_key}_tclp")
                 data["inflacion_anual"] = c3.number_input("Infl. %", value=data["inflacion_anual"], step=0.1, key=f"{scen_key}_inf")
                 data["pagar_intereses_construccion"] = st.checkbox("Pagar intereses durante construcción (Equity)", value=data.get("pagar_intereses_construccion", False), key=f"{scen_key}_pay_int")
+                # Mensual no se guarda en el escenario: su hash (y lo ya calculado) no cambia
+                paso = st.selectbox("Paso de tiempo", list(PASOS_TIEMPO), index=list(PASOS_TIEMPO).index(data.get("paso_tiempo", "Mensual")),
+                                    help="Semanal (4 por mes) o Diario (30 por mes, 30/360): tasas compuestas al subperíodo, obra y gastos "
+                                         "repartidos en el mes. El tablero sigue siendo mensual.", key=f"{scen_key}_paso")
+                if paso == "Mensual":
+                    data.pop("paso_tiempo", None)
+                else:
+                    data["paso_tiempo"] = paso
                 st.markdown("**Pago Terreno**")
                 st.caption("Nota: El modelo prioriza automáticamente el pago total del Terreno cuando hay ingresos por ventas.")
                 rango_val = data.get("rango_pago_terreno", [1, 60])
@@ -555,47 +328,79 @@ with col_inputs:
                 data["prioridad_terreno"] = st.checkbox("Prioridad Terreno (Activado)", value=True, disabled=True, key=f"{scen_key}_prio_vis")
 
             with st.expander(f"🤝 Deuda Privada (KPs y Relac.){lbl_suffix}", expanded=is_expanded):
+                n_tramos = len(data.get("lista_relacionadas", [])) + len(data["lista_kps"])
+                modo_tabla = st.toggle("Editar como tabla", value=n_tramos > TRAMOS_MAX_FORMULARIO, key=f"tabla_tramos_{scen_key}")
                 st.markdown("##### Préstamo Relacionada")
-                if st.button("➕ Agregar Deuda Relacionada", key=f"add_rel_{scen_key}"):
-                    data["lista_relacionadas"].append({"nombre": f"Rel {len(data.get('lista_relacionadas', []))+1}", "monto": 0.0, "tasa_anual": 0.0, "frecuencia_pago": "Al Final", "mes_inicio": 0})
-                    st.rerun()
-                idx_rel_remove = []
-                for i, rel in enumerate(data.get("lista_relacionadas", [])):
-                    st.markdown(f"**Relacionada #{i+1}**")
-                    r1, r2, r3 = st.columns(3)
-                    rel["monto"] = r1.number_input("Monto", value=float(rel["monto"]), key=f"rm_{scen_key}_{i}")
-                    rel["tasa_anual"] = r2.number_input("Tasa %", value=float(rel["tasa_anual"]), step=0.1, key=f"rt_{scen_key}_{i}")
-                    rel["mes_inicio"] = r3.number_input("Mes Inicio", value=int(rel.get("mes_inicio", 0)), key=f"rini_{scen_key}_{i}")
-                    r4, r5 = st.columns([2, 1])
-                    rel["frecuencia_pago"] = r4.selectbox("Pago Interés", ["Mensual", "Trimestral", "Al Final"], index=["Mensual", "Trimestral", "Al Final"].index(rel.get("frecuencia_pago", "Al Final")), key=f"rf_{scen_key}_{i}")
-                    if r5.button("🗑️", key=f"del_rel_{scen_key}_{i}"): idx_rel_remove.append(i)
-                    st.divider()
-                if idx_rel_remove:
-                    for i in sorted(idx_rel_remove, reverse=True): data["lista_relacionadas"].pop(i)
-                    st.rerun()
+                if modo_tabla:
+                    data["lista_relacionadas"] = editar_tramos_tabla(
+                        data.get("lista_relacionadas", []),
+                        {"nombre": "Rel", "monto": 0.0, "tasa_anual": 0.0, "frecuencia_pago": "Al Final", "mes_inicio": 0},
+                        key=f"ed_rel_{scen_key}")
+                else:
+                    if st.button("➕ Agregar Deuda Relacionada", key=f"add_rel_{scen_key}"):
+                        data["lista_relacionadas"].append({"nombre": f"Rel {len(data.get('lista_relacionadas', []))+1}", "monto": 0.0, "tasa_anual": 0.0, "frecuencia_pago": "Al Final", "mes_inicio": 0})
+                        rerun_panel()
+                    idx_rel_remove = []
+                    for i, rel in enumerate(data.get("lista_relacionadas", [])):
+                        st.markdown(f"**Relacionada #{i+1}**")
+                        r1, r2, r3 = st.columns(3)
+                        rel["monto"] = r1.number_input("Monto", value=float(rel["monto"]), key=f"rm_{scen_key}_{i}")
+                        rel["tasa_anual"] = r2.number_input("Tasa %", value=float(rel["tasa_anual"]), step=0.1, key=f"rt_{scen_key}_{i}")
+                        rel["mes_inicio"] = r3.number_input("Mes Inicio", value=int(rel.get("mes_inicio", 0)), key=f"rini_{scen_key}_{i}")
+                        r4, r5 = st.columns([2, 1])
+                        rel["frecuencia_pago"] = r4.selectbox("Pago Interés", ["Mensual", "Trimestral", "Al Final"], index=["Mensual", "Trimestral", "Al Final"].index(rel.get("frecuencia_pago", "Al Final")), key=f"rf_{scen_key}_{i}")
+                        if r5.button("🗑️", key=f"del_rel_{scen_key}_{i}"): idx_rel_remove.append(i)
+                        st.divider()
+                    if idx_rel_remove:
+                        for i in sorted(idx_rel_remove, reverse=True): data["lista_relacionadas"].pop(i)
+                        rerun_panel()
 
                 st.markdown("---")
                 st.markdown("##### Inversionistas (KPs)")
-                if st.button("➕ Agregar KP", key=f"add_kp_{scen_key}"):
-                    data["lista_kps"].append({"nombre": f"KP {len(data['lista_kps'])+1}", "monto": 0.0, "tasa_anual": 0.0, "plazo": 24, "frecuencia_pago": "Mensual", "mes_inicio": 0})
-                    st.rerun()
-                idx_kp_remove = []
-                for i, kp in enumerate(data["lista_kps"]):
-                    st.markdown(f"**KP #{i+1}**")
-                    k1, k2, k3 = st.columns(3)
-                    kp["monto"] = k1.number_input("Monto", value=float(kp["monto"]), key=f"kpm_{scen_key}_{i}")
-                    kp["tasa_anual"] = k2.number_input("Tasa %", value=float(kp["tasa_anual"]), step=0.1, key=f"kpt_{scen_key}_{i}")
-                    kp["mes_inicio"] = k3.number_input("Mes Inicio", value=int(kp.get("mes_inicio", 0)), key=f"kpini_{scen_key}_{i}") 
-                    k4, k5 = st.columns([2, 1])
-                    kp["plazo"] = k4.number_input("Plazo", value=int(kp["plazo"]), key=f"kpp_{scen_key}_{i}")
-                    kp["frecuencia_pago"] = k4.selectbox("Pago Interés", ["Mensual", "Trimestral", "Al Final"], index=["Mensual", "Trimestral", "Al Final"].index(kp.get("frecuencia_pago", "Mensual")), key=f"kpf_{scen_key}_{i}")
-                    if k5.button("🗑️", key=f"del_kp_{scen_key}_{i}"): idx_kp_remove.append(i)
-                    st.divider()
-                if idx_kp_remove:
-                    for i in sorted(idx_kp_remove, reverse=True): data["lista_kps"].pop(i)
-                    st.rerun()
+                if modo_tabla:
+                    data["lista_kps"] = editar_tramos_tabla(
+                        data["lista_kps"],
+                        {"nombre": "KP", "monto": 0.0, "tasa_anual": 0.0, "plazo": 24, "frecuencia_pago": "Mensual", "mes_inicio": 0},
+                        key=f"ed_kp_{scen_key}")
+                else:
+                    if st.button("➕ Agregar KP", key=f"add_kp_{scen_key}"):
+                        data["lista_kps"].append({"nombre": f"KP {len(data['lista_kps'])+1}", "monto": 0.0, "tasa_anual": 0.0, "plazo": 24, "frecuencia_pago": "Mensual", "mes_inicio": 0})
+                        rerun_panel()
+                    idx_kp_remove = []
+                    for i, kp in enumerate(data["lista_kps"]):
+                        st.markdown(f"**KP #{i+1}**")
+                        k1, k2, k3 = st.columns(3)
+                        kp["monto"] = k1.number_input("Monto", value=float(kp["monto"]), key=f"kpm_{scen_key}_{i}")
+                        kp["tasa_anual"] = k2.number_input("Tasa %", value=float(kp["tasa_anual"]), step=0.1, key=f"kpt_{scen_key}_{i}")
+                        kp["mes_inicio"] = k3.number_input("Mes Inicio", value=int(kp.get("mes_inicio", 0)), key=f"kpini_{scen_key}_{i}") 
+                        k4, k5 = st.columns([2, 1])
+                        kp["plazo"] = k4.number_input("Plazo", value=int(kp["plazo"]), key=f"kpp_{scen_key}_{i}")
+                        kp["frecuencia_pago"] = k4.selectbox("Pago Interés", ["Mensual", "Trimestral", "Al Final"], index=["Mensual", "Trimestral", "Al Final"].index(kp.get("frecuencia_pago", "Mensual")), key=f"kpf_{scen_key}_{i}")
+                        if k5.button("🗑️", key=f"del_kp_{scen_key}_{i}"): idx_kp_remove.append(i)
+                        st.divider()
+                    if idx_kp_remove:
+                        for i in sorted(idx_kp_remove, reverse=True): data["lista_kps"].pop(i)
+                        rerun_panel()
 
             with st.expander(f"💰 Plan de Ventas{lbl_suffix}", expanded=is_expanded):
+                archivo_libro = st.file_uploader("Libro de ventas por unidad (CSV/JSON)", type=["csv", "json"], key=f"up_libro_{scen_key}",
+                                                 help="Columnas: unidad, precio, mes_promesa, mes_escritura, pct_pie, cuotas_pie. Reemplaza al plan en %.")
+                if archivo_libro is not None and st.session_state.get(f"libro_archivo_{scen_key}") != archivo_libro.file_id:
+                    st.session_state[f"libro_archivo_{scen_key}"] = archivo_libro.file_id
+                    try:
+                        data["libro_ventas"] = leer_libro_ventas(archivo_libro.getvalue().decode("utf-8"))
+                        # La venta total parte en la suma de precios; editarla escala todo el libro
+                        data["valor_venta_total"] = precio_total(data["libro_ventas"])
+                        st.session_state[f"{scen_key}_vvt"] = data["valor_venta_total"]
+                    except (ValueError, UnicodeDecodeError) as e:
+                        st.error(f"No se pudo leer el libro de ventas: {e}")
+                if tiene_libro(data):
+                    lv1, lv2 = st.columns([3, 1])
+                    lv1.caption(f"📦 Libro de ventas: {len(data['libro_ventas']['precio'])} unidades, "
+                                f"{precio_total(data['libro_ventas']):,.0f} UF a precio de lista. El plan en % se ignora.")
+                    if lv2.button("Quitar libro", key=f"del_libro_{scen_key}"):
+                        data.pop("libro_ventas")
+                        rerun_panel()
                 data["valor_venta_total"] = st.number_input("Venta Total (UF)", value=data["valor_venta_total"], key=f"{scen_key}_vvt")
                 lista_ventas = data["plan_ventas"]
                 total_pct = sum([item["pct"] for item in lista_ventas])
@@ -606,7 +411,7 @@ with col_inputs:
                 if st.button("➕ Hito Venta", key=f"add_v_{scen_key}"):
                     last_mes = lista_ventas[-1]["mes"] if lista_ventas else 23
                     data["plan_ventas"].append({"mes": last_mes + 1, "pct": max(0.0, 100.0 - total_pct)})
-                    st.rerun()
+                    rerun_panel()
                 
                 st.markdown("---")
                 ch1, ch2, ch3 = st.columns([1.5, 1.5, 0.5])
@@ -622,217 +427,724 @@ with col_inputs:
                     if c3.button("x", key=f"del_v_{scen_key}_{i}"): idx_v_rem.append(i)
                 if idx_v_rem:
                     for i in sorted(idx_v_rem, reverse=True): data["plan_ventas"].pop(i)
-                    st.rerun()
+                    rerun_panel()
 
     with tabs[0]: render_scenario_inputs("Real")
     with tabs[1]: render_scenario_inputs("Optimista")
     with tabs[2]: render_scenario_inputs("Pesimista")
 
+    results = resultados_actuales()
+    st.session_state.resultados = results
+    exportar["resultados"], exportar["entradas"] = results, copy.deepcopy(st.session_state.data_scenarios)
+    if st.session_state.get("corrida_app", True):
+        st.session_state.resultados_tablero = results
+    tablero = st.session_state.resultados_tablero
+    mostrar_kpis(results["Real"], desactualizado=any(results[n] is not tablero[n] for n in SCENARIOS))
+
 # --- CALCULO AUTOMÁTICO ---
-results = {name: calcular_flujo(st.session_state.data_scenarios[name]) for name in SCENARIOS}
-res = results["Real"]
+# Cada escenario guarda checkpoints mensuales: una edición que sólo afecta meses tardíos
+# (p.ej. un hito de venta) se recalcula desde el primer mes afectado.
+if 'simulaciones' not in st.session_state:
+    st.session_state.simulaciones = {}
+
+def motor_escenario(name):
+    def _motor(data):
+        sim = st.session_state.simulaciones.get(name)
+        if sim is None:
+            st.session_state.simulaciones[name] = SimulacionReanudable(data)
+            return st.session_state.simulaciones[name].resultado
+        return sim.actualizar(data)
+    return _motor
+
+def resultados_actuales():
+    return {name: cache_resultados.resultado(st.session_state.data_scenarios[name], motor=motor_escenario(name)) for name in SCENARIOS}
+
 fmt_nums = lambda x: f"{x:,.0f}".replace(",", ".")
+cols_export = ["Mes", "Ingresos", "Ingresos Deuda", "Otros Costos (Op)", "Int. Banco", "Int. KPs", "Int. Relac.", "Pago Capital", "Flujo Neto", "Flujo Acumulado", "Deuda Total"]
+FILAS_PAGINA = [60, 120, 240, 600]
+# Formato de montos del lado del navegador (los datos siguen siendo numéricos)
+formato_tabla = {c: st.column_config.NumberColumn(c, format="%,.0f UF") for c in cols_export[1:]}
 
+# Contenedores del tablero que el panel de entradas redibuja al editar
 with col_dash:
-    # --- FUNCIONALIDAD 2: BOTÓN EXCEL (ROBUSTO) ---
-    def convert_df(df_in):
-        # Intentamos exportar a Excel con xlsxwriter
-        try:
-            output = io.BytesIO()
-            with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                df_in.to_excel(writer, index=False, sheet_name='Flujo')
-            return output.getvalue(), "flujo_caja.xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        except ImportError:
-            # Fallback: Si no está instalado xlsxwriter, devolvemos CSV
-            st.warning("⚠️ Librería 'xlsxwriter' no detectada. Descargando como CSV. Para Excel, agrega 'xlsxwriter' a requirements.txt")
-            return df_in.to_csv(index=False).encode('utf-8'), "flujo_caja.csv", "text/csv"
-
-    # Preparar datos
-    cols_export = ["Mes", "Ingresos", "Ingresos Deuda", "Otros Costos (Op)", "Int. Banco", "Int. KPs", "Int. Relac.", "Pago Capital", "Flujo Neto", "Flujo Acumulado", "Deuda Total"]
-    df_excel = res["df"][cols_export].copy()
-    
-    # Generar archivo
-    file_data, file_name, mime_type = convert_df(df_excel)
-    
-    st.download_button(
-        label="📥 Descargar Flujo",
-        data=file_data,
-        file_name=file_name,
-        mime=mime_type,
-        use_container_width=True
-    )
-    
-    st.markdown("### 🏆 KPIs Escenario Real")
-    k1, k2, k3, k4 = st.columns(4)
-    k1.metric("Utilidad", f"{res['utilidad']:,.0f} UF")
-    k2.metric("ROI Proyecto", f"{res['roi']:.1f}%")
-    k3.metric("Mes flujo positivo", f"Mes {res['break_even']}" if res['break_even'] else "N/A")
-    k4.metric("Peak Deuda", f"{res['peak_deuda']:,.0f} UF")
-
-    # --- TARJETA DE INTERESES ---
-    st.markdown("#### 💳 Costos Financieros Totales")
-    int_previos = st.session_state.data_scenarios["Real"].get("intereses_previos_uf", 0.0)
-    total_fin_global = res['costo_financiero_total'] + int_previos
-    
-    with st.container():
-        st.markdown('<div class="interest-card">', unsafe_allow_html=True)
-        st.markdown('<div class="interest-title">Desglose Global (Simulación + Histórico)</div>', unsafe_allow_html=True)
-        det = res["detalles_fin"]
-        ic1, ic2, ic3, ic4 = st.columns(4)
-        ic1.metric("🏦 Banco (Futuro)", f"{det['banco']:,.0f} UF")
-        ic2.metric("⏮️ Int. Previos", f"{int_previos:,.0f} UF", help="Intereses pagados antes del inicio de la simulación")
-        ic3.metric("🤝 Privados (KPs/Rel)", f"{det['kps'] + det['relacionada']:,.0f} UF")
-        ic4.metric("💰 COSTO TOTAL", f"{total_fin_global:,.0f} UF", delta="Final del Proyecto")
-        st.markdown('</div>', unsafe_allow_html=True)
-
-    with st.expander("📋 Tabla Detallada (Verificación de Pagos)", expanded=False):
-        df_display = res["df"][cols_export].copy()
-        df_display["Mes"] = df_display["Mes"].astype(str)
-        total_row = {
-            "Mes": "TOTAL",
-            "Ingresos": df_display["Ingresos"].sum(),
-            "Ingresos Deuda": df_display["Ingresos Deuda"].sum(), 
-            "Otros Costos (Op)": df_display["Otros Costos (Op)"].sum(),
-            "Int. Banco": df_display["Int. Banco"].sum(),
-            "Int. KPs": df_display["Int. KPs"].sum(),
-            "Int. Relac.": df_display["Int. Relac."].sum(),
-            "Pago Capital": df_display["Pago Capital"].sum(),
-            "Flujo Neto": df_display["Flujo Neto"].sum(),
-            "Flujo Acumulado": df_display["Flujo Neto"].sum(), 
-            "Deuda Total": 0.0 
-        }
-        df_final = pd.concat([df_display, pd.DataFrame([total_row])], ignore_index=True)
-        for col in cols_export[1:]: 
-            df_final[col] = df_final[col].apply(lambda x: f"{x:,.0f} UF".replace(",", ".") if pd.notnull(x) else "0 UF")
-        st.dataframe(df_final, use_container_width=True, height=400)
+    zona_descarga = st.container()
+    panel_kpis = st.empty()
+
+def mostrar_kpis(res, desactualizado=False):
+    with panel_kpis.container():
+        if desactualizado:
+            st.caption("✏️ Datos editados: las secciones de análisis se refrescan al abrirlas o con 🚀 Procesar y Actualizar.")
+        st.markdown("### 🏆 KPIs Escenario Real")
+        k1, k2, k3, k4 = st.columns(4)
+        k1.metric("Utilidad", f"{res['utilidad']:,.0f} UF")
+        k2.metric("ROI Proyecto", f"{res['roi']:.1f}%")
+        k3.metric("Mes flujo positivo", f"Mes {res['break_even']}" if res['break_even'] else "N/A")
+        k4.metric("Peak Deuda", f"{res['peak_deuda']:,.0f} UF")
+
+        # --- TARJETA DE INTERESES ---
+        st.markdown("#### 💳 Costos Financieros Totales")
+        int_previos = st.session_state.data_scenarios["Real"].get("intereses_previos_uf", 0.0)
+        total_fin_global = res['costo_financiero_total'] + int_previos
+        
+        with st.container():
+            st.markdown('<div class="interest-card">', unsafe_allow_html=True)
+            st.markdown('<div class="interest-title">Desglose Global (Simulación + Histórico)</div>', unsafe_allow_html=True)
+            det = res["detalles_fin"]
+            ic1, ic2, ic3, ic4 = st.columns(4)
+            ic1.metric("🏦 Banco (Futuro)", f"{det['banco']:,.0f} UF")
+            ic2.metric("⏮️ Int. Previos", f"{int_previos:,.0f} UF", help="Intereses pagados antes del inicio de la simulación")
+            ic3.metric("🤝 Privados (KPs/Rel)", f"{det['kps'] + det['relacionada']:,.0f} UF")
+            ic4.metric("💰 COSTO TOTAL", f"{total_fin_global:,.0f} UF", delta="Final del Proyecto")
+            st.markdown('</div>', unsafe_allow_html=True)
 
-    # --- ANÁLISIS POR HITOS ---
+# Sólo los gatillos del panel (fragmento) dejan esto en False: ver el final del script
+st.session_state.corrida_app = True
+perfil_corrida = perfil.Perfil("app") if perfil_habilitado() else None
+perfil.activar(perfil_corrida)
+# Lo que el libro Excel necesita se deja aquí (lo actualiza cada corrida del panel);
+# el libro se arma recién al hacer clic.
+exportar = st.session_state.setdefault("exportar", {})
+# La descarga del Excel corre en otro hilo: registra su tiempo aquí si hay medición activa
+exportar["perfiles"] = st.session_state.setdefault("perfiles", deque(maxlen=MAX_PERFILES)) if perfil_corrida else None
+libros_excel = libros_excel_compartidos()
+
+with col_inputs:
+    panel_entradas()
+results = st.session_state.resultados_tablero
+res = results["Real"]
+
+# --- FUNCIONALIDAD 2: BOTÓN EXCEL (BAJO DEMANDA) ---
+def generar_excel():
+    # Corre en otro hilo al hacer clic: sólo lee `exportar` (dict) y la caché compartida de libros, no st.session_state
+    entradas, resultados, sensibilidad = exportar["entradas"], exportar["resultados"], exportar.get("sensibilidad")
+    hitos_usuario, registros = exportar.get("hitos_usuario", []), exportar.get("perfiles")
+    p = perfil.Perfil("descarga Excel") if registros is not None else None
+    perfil.activar(p)
+    try:
+        clave = hash_canonico({"entradas": entradas, "sensibilidad": sensibilidad, "hitos": hitos_usuario})
+        libro = libros_excel.obtener(clave)
+        if libro is None:
+            with perfil.medir("excel: armar libro"):
+                real = resultados["Real"]
+                hitos = tabla_hitos(real, entradas["Real"], hitos_proyecto(real, entradas["Real"]) + hitos_usuario)
+                libro = libros_excel.compartir(clave, libro_excel(resultados, entradas, hitos, sensibilidad))
+        return libro
+    finally:
+        perfil.activar(None)
+        if p is not None:
+            registros.append(p.cerrar().a_dict())
+
+with zona_descarga:
+    if importlib.util.find_spec("xlsxwriter") is not None:
+        st.download_button(label="📥 Descargar Excel (todos los escenarios)", data=generar_excel, file_name="flujo_caja.xlsx",
+                           mime=MIME_XLSX, use_container_width=True)
+    else:
+        # Fallback: sin xlsxwriter se descarga el flujo Real como CSV
+        st.warning("⚠️ Librería 'xlsxwriter' no detectada. Descargando como CSV. Para Excel, agrega 'xlsxwriter' a requirements.txt")
+        st.download_button(label="📥 Descargar Flujo", data=lambda: exportar["resultados"]["Real"]["df"][cols_export].to_csv(index=False).encode("utf-8"),
+                           file_name="flujo_caja.csv", mime="text/csv", use_container_width=True)
+
+# --- SECCIONES DEL TABLERO ---
+# Las que tienen widgets propios son fragmentos (sus controles no re-ejecutan el resto) y sus
+# expanders llevan estado: el contenido sólo se calcula con el expander abierto.
+@st.fragment
+@medido("tabla detallada")
+def seccion_tabla_detallada():
+    with st.expander("📋 Tabla Detallada (Verificación de Pagos)", expanded=False, key="exp_tabla", on_change="rerun") as exp:
+        if not exp.open:
+            return
+        # La tabla se muestra numérica (el formato lo aplica el navegador) y por páginas:
+        # abrirla no convierte celdas a texto ni serializa el horizonte completo
+        c_t1, c_t2, c_t3 = st.columns([2, 1, 1])
+        esc_tabla = c_t1.selectbox("Escenario", SCENARIOS, key="tabla_escenario")
+        res_tabla = st.session_state.resultados[esc_tabla]
+        df_tabla, cols_tabla = res_tabla["df"], cols_export
+        # Escenarios semanales/diarios: el detalle por subperíodo para ver la caja dentro del mes
+        if "df_paso" in res_tabla and c_t1.toggle("Ver por subperíodo", key="tabla_paso"):
+            df_tabla, cols_tabla = res_tabla["df_paso"], ["Paso"] + cols_export
+        filas_pagina = c_t2.selectbox("Filas por página", FILAS_PAGINA, index=1, key="tabla_filas")
+        n_paginas = max(1, -(-len(df_tabla) // filas_pagina))
+        pagina = c_t3.number_input(f"Página (de {n_paginas})", min_value=1, max_value=n_paginas, value=1, step=1, key="tabla_pagina")
+        inicio = (int(pagina) - 1) * filas_pagina
+        st.dataframe(df_tabla.iloc[inicio:inicio + filas_pagina][cols_tabla], use_container_width=True, hide_index=True,
+                     column_config=formato_tabla)
+
+        # TOTAL en una sola pasada (suma por columna); el acumulado final es la suma del flujo neto
+        totales = df_tabla[cols_export[1:]].sum().to_frame().T
+        totales["Flujo Acumulado"] = totales["Flujo Neto"]
+        totales["Deuda Total"] = 0.0
+        totales.insert(0, "Mes", "TOTAL")
+        st.dataframe(totales, use_container_width=True, hide_index=True, column_config=formato_tabla)
+
+def indices_intereses(resultados):
+    # Sumas acumuladas del devengado por escenario: se rehacen sólo si el resultado cambió
+    indices = st.session_state.setdefault("indices_intereses", {})
+    for n, r in resultados.items():
+        if n not in indices or indices[n][0] is not r:
+            indices[n] = (r, indice_intereses(r))
+    return {n: indices[n][1] for n in resultados}
+
+# --- ANÁLISIS POR HITOS (FRAGMENTO) ---
+# Los hitos propios y el slider de mes sólo re-ejecutan esta sección: cada acumulado es una
+# lectura del índice de sumas acumuladas, sin volver a recorrer el flujo.
+@st.fragment
+@medido("hitos")
+def seccion_hitos():
+    import pandas as pd
     st.markdown("---")
     st.markdown("### 📍 Análisis de Intereses Acumulados por Hitos (Devengado Futuro)")
-    
-    params_real = st.session_state.data_scenarios["Real"]
-    mes_inicio_obra = int(params_real.get("mes_inicio_obra", 1))
-    duracion_obra = int(params_real.get("duracion_obra", 18))
-    mes_construccion = mes_inicio_obra + duracion_obra - 1
-    mes_recepcion = int(params_real["mes_recepcion"])
-    
-    int_previos = st.session_state.data_scenarios["Real"].get("intereses_previos_uf", 0.0)
-    
-    df_real = res["df"]
-    try:
-        mes_ultimo_recupero = df_real[df_real["Ingresos"] > 0].iloc[-1]["Mes"]
-    except IndexError:
-        mes_ultimo_recupero = mes_recepcion 
-    mes_ultimo_recupero = int(mes_ultimo_recupero)
-
-    milestones = [
-        {"nombre": "Término Construcción", "mes": mes_construccion},
-        {"nombre": "Recepción Final", "mes": mes_recepcion},
-        {"nombre": "Último Recupero (Cierre Deuda)", "mes": mes_ultimo_recupero}
-    ]
-    
-    milestone_data = []
-    total_costo_global = res["costo_financiero_total"] + int_previos
-    
-    for ms in milestones:
-        df_cut = df_real[df_real["Mes"] <= ms["mes"]]
-        acum_banco = df_cut["Devengado Banco"].sum() + int_previos
-        acum_kps = df_cut["Devengado KPs"].sum()
-        acum_relac = df_cut["Devengado Relac."].sum() 
-        total_acum = acum_banco + acum_kps + acum_relac
-        pct_avance = (total_acum / total_costo_global * 100) if total_costo_global > 0 else 0
-        milestone_data.append({
-            "Hito": f"{ms['nombre']} (Mes {ms['mes']})",
-            "Acum. Banco": fmt_nums(acum_banco),
-            "Acum. Privados": fmt_nums(acum_kps + acum_relac),
-            "Total Devengado": fmt_nums(total_acum),
-            "% del Total": f"{pct_avance:.1f}%"
-        })
-        
-    df_milestones = pd.DataFrame(milestone_data)
-    st.dataframe(df_milestones, use_container_width=True, hide_index=True)
+    resultados = st.session_state.resultados_tablero
+    indices = indices_intereses(resultados)
+    data_real = st.session_state.data_scenarios["Real"]
+
+    if "hitos_usuario_base" not in st.session_state:
+        st.session_state.hitos_usuario_base = pd.DataFrame({"Hito": pd.Series(dtype=str), "Mes": pd.Series(dtype=int)})
+    with st.popover("➕ Hitos propios"):
+        editados = st.data_editor(st.session_state.hitos_usuario_base, num_rows="dynamic", hide_index=True, key="editor_hitos",
+                                  column_config={"Mes": st.column_config.NumberColumn("Mes", min_value=0, step=1)})
+    hitos_usuario = [{"nombre": str(f["Hito"] or f"Hito {i + 1}"), "mes": int(f["Mes"])}
+                     for i, f in enumerate(editados.to_dict("records")) if pd.notnull(f["Mes"])]
+    exportar["hitos_usuario"] = hitos_usuario
 
-    # --- COMPARATIVA ---
+    hitos = hitos_proyecto(resultados["Real"], data_real) + hitos_usuario
+    milestone_data = [{
+        "Hito": f"{h['Hito']} (Mes {h['Mes']})",
+        "Acum. Banco": fmt_nums(h["Acum. Banco"]),
+        "Acum. Privados": fmt_nums(h["Acum. Privados"]),
+        "Total Devengado": fmt_nums(h["Total Devengado"]),
+        "% del Total": f"{h['% del Total']:.1f}%"
+    } for h in tabla_hitos(resultados["Real"], data_real, hitos, indices["Real"])]
+    st.dataframe(pd.DataFrame(milestone_data), use_container_width=True, hide_index=True)
+
+    # --- Devengado a un mes cualquiera, en los tres escenarios ---
+    horizonte_max = max(len(i["banco"]) for i in indices.values()) - 1
+    mes_corte = st.slider("Devengado acumulado al mes", 0, max(horizonte_max, 1), min(int(data_real["mes_recepcion"]), horizonte_max), key="hitos_mes")
+    cols_mes = st.columns(len(SCENARIOS))
+    for col_m, sc in zip(cols_mes, SCENARIOS):
+        acum = devengado_hasta(indices[sc], mes_corte)
+        previos = st.session_state.data_scenarios[sc].get("intereses_previos_uf", 0.0)
+        total = acum["banco"] + previos + acum["kps"] + acum["relacionada"]
+        total_global = resultados[sc]["costo_financiero_total"] + previos
+        col_m.metric(sc, f"{fmt_nums(total)} UF", delta=f"{total / total_global * 100:.1f}% del total" if total_global > 0 else None, delta_color="off")
+        col_m.caption(f"Banco {fmt_nums(acum['banco'] + previos)} · Privados {fmt_nums(acum['kps'] + acum['relacionada'])}")
+
+# --- COMPARATIVA (FRAGMENTO) ---
+# Con muchas trayectorias (Monte Carlo) no se dibuja una traza por curva: se muestran bandas de
+# percentiles con trazas WebGL sobre una grilla de meses acotada, así lo que llega al navegador
+# no depende del número de sorteos ni del horizonte.
+@st.fragment
+@medido("comparativa")
+def seccion_comparativa():
+    import plotly.graph_objects as go
     st.markdown("---")
     st.header("⚖️ Comparativa de Escenarios")
-    
-    # --- FUNCIONALIDAD 5: COMPARADOR SIDE-BY-SIDE ---
-    fig_comp_line = go.Figure()
+    resultados = st.session_state.resultados_tablero
     colors = {"Real": "#3B82F6", "Optimista": "#10B981", "Pesimista": "#EF4444"}
-    
+
+    c_v1, c_v2 = st.columns(2)
+    vista = c_v1.radio("Vista", ["Escenarios", "Abanico Monte Carlo"], horizontal=True, key="comp_vista")
+    curva = c_v2.radio("Curva", list(CURVAS_MC), horizontal=True, key="comp_curva")
+    fig_comp_line = go.Figure()
+
+    if vista == "Abanico Monte Carlo":
+        mc = st.session_state.get("montecarlo")
+        curvas = mc["resultado"].get("curvas") if mc is not None else None
+        if curvas is None:
+            st.info("Corre la Simulación Monte Carlo (más abajo) para ver el abanico de trayectorias.")
+        else:
+            meses_b = curvas["meses"]
+            bandas = bandas_percentiles(curvas)[curva]
+            # Bandas P5-P95 y P25-P75 como áreas entre dos líneas; la mediana encima
+            for bajo, alto, opacidad in (("P5", "P95", 0.18), ("P25", "P75", 0.35)):
+                fig_comp_line.add_trace(go.Scattergl(x=meses_b, y=bandas[bajo], mode="lines", line=dict(width=0),
+                                                     showlegend=False, hoverinfo="skip"))
+                fig_comp_line.add_trace(go.Scattergl(x=meses_b, y=bandas[alto], mode="lines", line=dict(width=0),
+                                                     fill="tonexty", fillcolor=f"rgba(59,130,246,{opacidad})", name=f"{bajo}–{alto}"))
+            fig_comp_line.add_trace(go.Scattergl(x=meses_b, y=bandas["P50"], mode="lines", name="Mediana",
+                                                 line=dict(color="#3B82F6", width=3)))
+            st.caption(f"{len(curvas[curva]):,} sorteos · {len(meses_b)} puntos por curva"
+                       + (" · el escenario Real cambió desde la simulación"
+                          if mc.get("base") != hash_canonico(st.session_state.data_scenarios["Real"]) else ""))
+
+    # Las curvas de los escenarios van en ambas vistas (en el abanico, como referencia)
     for sc in SCENARIOS:
-        if sc in st.session_state.calc_results:
-            r = st.session_state.calc_results[sc]
-            df_r = r["df"]
-            fig_comp_line.add_trace(go.Scatter(
-                x=df_r["Mes"], 
-                y=df_r["Flujo Acumulado"], 
-                name=sc, 
+        if sc in resultados:
+            df_r = resultados[sc]["df"]
+            fig_comp_line.add_trace(go.Scattergl(
+                x=df_r["Mes"],
+                y=df_r[curva],
+                name=sc,
                 mode='lines',
-                line=dict(color=colors[sc], width=3)
+                line=dict(color=colors[sc], width=3 if vista == "Escenarios" else 1.5, dash=None if vista == "Escenarios" else "dot")
             ))
-            
+
     fig_comp_line.add_hline(y=0, line_dash="dash", line_color="white", opacity=0.5)
     fig_comp_line.update_layout(
-        title="Curvas de Flujo Acumulado",
-        template="plotly_dark", 
+        title=f"Curvas de {curva}",
+        template="plotly_dark",
         height=400,
         legend_title="Escenario"
     )
-    st.plotly_chart(fig_comp_line, use_container_width=True)
+    grafico(fig_comp_line, use_container_width=True)
+
+with col_dash:
+    # pandas y plotly se importan dentro de cada sección: el panel y los KPIs se dibujan antes de cargarlos
+    seccion_tabla_detallada()
+    seccion_hitos()
+    seccion_comparativa()
 
-    # --- FUNCIONALIDAD 1: ANÁLISIS DE SENSIBILIDAD ---
+# --- FUNCIONALIDAD 1: ANÁLISIS DE SENSIBILIDAD ---
+# --- TRABAJOS EN SEGUNDO PLANO ---
+# Sólo esta barra se re-ejecuta mientras el trabajo corre; al terminar, un rerun completo lo entrega
+@st.fragment(run_every=0.5)
+def progreso_trabajo(nombre, etiqueta):
+    trabajo = st.session_state.trabajos.get(nombre)
+    if trabajo is None or trabajo.terminado:
+        st.rerun()
+    c_p1, c_p2 = st.columns([5, 1])
+    texto = f"{etiqueta}... {trabajo.hechos:,}/{trabajo.total:,}" if trabajo.total else f"{etiqueta}..."
+    c_p1.progress(trabajo.fraccion, text=f"{texto} ({trabajo.segundos:.0f} s)")
+    if c_p2.button("Cancelar", key=f"cancelar_{nombre}", use_container_width=True):
+        trabajo.cancelar()
+        st.rerun()
+
+def estado_trabajo(trabajo, etiqueta):
+    # Muestra progreso, cancelación o error; devuelve True si el trabajo terminó bien
+    if trabajo.estado == EN_CURSO:
+        progreso_trabajo(trabajo.nombre, etiqueta)
+    elif trabajo.estado == CANCELADO:
+        st.info(f"{etiqueta}: cancelado.")
+    elif trabajo.estado == ERROR:
+        st.error(f"{etiqueta}: {trabajo.error}")
+    return trabajo.estado == LISTO
+
+@st.fragment
+@medido("sensibilidad")
+def seccion_sensibilidad():
     st.markdown("---")
     st.header("🎯 Análisis de Sensibilidad (Stress Test)")
     
-    with st.expander("Configurar Matriz de Sensibilidad", expanded=True):
-        col_sens1, col_sens2 = st.columns(2)
-        var_venta = col_sens1.slider("Variación Precio Venta (+/- %)", 1, 20, 10, key="sens_venta")
-        var_costo = col_sens2.slider("Variación Costo Construcción (+/- %)", 1, 20, 10, key="sens_costo")
-        
+    with st.expander("Configurar Matriz de Sensibilidad", expanded=True, key="exp_sens", on_change="rerun") as exp:
+        if not exp.open:
+            return
+        import plotly.graph_objects as go
         base_scenario = st.session_state.data_scenarios["Real"]
-        base_venta = base_scenario["valor_venta_total"]
-        base_costo_constr = base_scenario["valor_contrato"]
+        nombre_var = lambda c: VARIABLES_SENSIBILIDAD[c][0]
+        vars_sens = st.multiselect("Variables a sensibilizar (2 a 4)", list(VARIABLES_SENSIBILIDAD),
+                                   default=["valor_venta_total", "valor_contrato"], format_func=nombre_var,
+                                   max_selections=4, key="sens_vars")
         
-        steps_x = [-var_venta, -var_venta/2, 0, var_venta/2, var_venta]
-        steps_y = [-var_costo, -var_costo/2, 0, var_costo/2, var_costo]
+        if len(vars_sens) < 2:
+            st.info("Selecciona al menos 2 variables para construir la matriz.")
+        else:
+            ejes_sens = {}
+            etiquetas_sens = {}
+            cols_sens = st.columns(len(vars_sens))
+            for col_s, campo in zip(cols_sens, vars_sens):
+                var_pct = col_s.slider(f"Variación {nombre_var(campo)} (+/- %)", 1, 50, 10, key=f"sens_var_{campo}")
+                n_pasos = col_s.number_input(f"Pasos {nombre_var(campo)}", min_value=2, max_value=40, value=5, key=f"sens_pasos_{campo}")
+                variaciones = pasos_variacion(var_pct, n_pasos)
+                ejes_sens[campo] = valores_eje(base_scenario, campo, variaciones)
+                etiquetas_sens[campo] = [f"{nombre_var(campo)} {v:+.1f}%" for v in variaciones]
+            metrica_sens = st.selectbox("Métrica", METRICAS, key="sens_metrica")
+            
+            # El cubo completo se guarda por hash (base + ejes + métrica); sólo se conserva el último
+            clave_cubo = hash_canonico({"base": base_scenario, "metrica": metrica_sens,
+                                        "ejes": {c: v.tolist() for c, v in ejes_sens.items()}})
+            cubos = st.session_state.setdefault("cubos_sensibilidad", {})
+            trabajos = st.session_state.setdefault("trabajos", {})
+            if clave_cubo not in cubos:
+                # Cada celda sólo aporta la métrica: motor por lotes en modo resumen (sin flujos mensuales).
+                # Los cubos grandes son un trabajo en segundo plano (y van al pool de procesos): la página
+                # sigue respondiendo y un cambio de entradas cancela el cubo anterior
+                n_celdas = int(np.prod([len(v) for v in ejes_sens.values()]))
+                if n_celdas < MIN_CELDAS_PARALELO:
+                    cubos.clear()
+                    cubos[clave_cubo] = evaluar_cubo(base_scenario, ejes_sens, metrica_sens)
+                else:
+                    trabajo = gestor_trabajos().enviar(trabajos, "sensibilidad", clave_cubo, evaluar_cubo,
+                                                       copy.deepcopy(base_scenario), ejes_sens, metrica_sens)
+                    etiqueta_sens = f"Evaluando {n_celdas:,} combinaciones"
+                    if not estado_trabajo(trabajo, etiqueta_sens):
+                        if trabajo.terminado and st.button("Reintentar", key="btn_sens_reintentar"):
+                            gestor_trabajos().enviar(trabajos, "sensibilidad", clave_cubo, evaluar_cubo,
+                                                     copy.deepcopy(base_scenario), ejes_sens, metrica_sens, forzar=True)
+                            progreso_trabajo("sensibilidad", etiqueta_sens)
+                        return
+                    cubos.clear()
+                    cubos[clave_cubo] = trabajos.pop("sensibilidad").resultado
+            cubo = cubos[clave_cubo]
+            
+            # --- Corte 2D del cubo para el heatmap ---
+            c_ex, c_ey = st.columns(2)
+            eje_x = c_ex.selectbox("Eje X", vars_sens, index=0, format_func=nombre_var, key="sens_eje_x")
+            eje_y = c_ey.selectbox("Eje Y", [c for c in vars_sens if c != eje_x], index=0, format_func=nombre_var, key="sens_eje_y")
+            corte = []
+            for campo in vars_sens:
+                if campo in (eje_x, eje_y):
+                    corte.append(slice(None))
+                else:
+                    n_val = len(etiquetas_sens[campo])
+                    corte.append(st.select_slider(f"Fijar {nombre_var(campo)}", options=list(range(n_val)), value=n_val // 2,
+                                                  format_func=lambda i, c=campo: etiquetas_sens[c][i], key=f"sens_fijo_{campo}"))
+            z_sens = cubo[tuple(corte)]
+            if vars_sens.index(eje_x) < vars_sens.index(eje_y):
+                z_sens = z_sens.T
+            exportar["sensibilidad"] = {"titulo": f"{metrica_sens}: {nombre_var(eje_y)} (filas) x {nombre_var(eje_x)} (columnas)",
+                                        "x": etiquetas_sens[eje_x], "y": etiquetas_sens[eje_y], "z": z_sens.tolist()}
+
+            fmt_sens = "%{z:.1f}%" if metrica_sens == "roi" else "%{z:,.0f}"
+            fig_sens = go.Figure(data=go.Heatmap(
+                z=z_sens, x=etiquetas_sens[eje_x], y=etiquetas_sens[eje_y],
+                texttemplate=fmt_sens, textfont={"size": 14},
+                colorscale='RdYlGn', hoverongaps=False
+            ))
+            
+            fig_sens.update_layout(
+                title="Matriz de ROI (%)" if metrica_sens == "roi" else f"Matriz de {metrica_sens}",
+                xaxis_title=f"Variación {nombre_var(eje_x)}",
+                yaxis_title=f"Variación {nombre_var(eje_y)}",
+                height=500, template="plotly_dark"
+            )
+            grafico(fig_sens, use_container_width=True)
+
+# --- FUNCIONALIDAD 9: TORNADO (UN PARÁMETRO A LA VEZ) ---
+@st.fragment
+@medido("tornado")
+def seccion_tornado():
+    with st.expander("🌪️ Tornado: impacto de cada parámetro", expanded=False, key="exp_tornado", on_change="rerun") as exp:
+        if not exp.open:
+            return
+        import pandas as pd
+        import plotly.graph_objects as go
+        c_t1, c_t2, c_t3 = st.columns(3)
+        var_tornado = c_t1.slider("Variación (+/- %)", 1, 50, 10, key="tornado_var")
+        metrica_tornado = c_t2.selectbox("Ordenar por", list(METRICAS_TORNADO), format_func=METRICAS_TORNADO.get, key="tornado_metrica")
+        n_barras = c_t3.number_input("Barras", min_value=5, max_value=100, value=15, key="tornado_n")
         
-        z_roi = []
-        y_labels = []
-        x_labels = []
+        base_tornado = st.session_state.data_scenarios["Real"]
+        clave_tornado = hash_canonico({"base": base_tornado, "variacion": var_tornado})
+        if st.session_state.get("tornado", {}).get("clave") != clave_tornado:
+            st.session_state.tornado = {"clave": clave_tornado, "resultado": calcular_tornado(base_tornado, var_tornado)}
+        tornado = st.session_state.tornado["resultado"]
         
-        for dy in steps_y: 
-            row_roi = []
-            costo_sim = base_costo_constr * (1 + dy/100)
-            y_labels.append(f"Costo {dy:+.1f}%")
+        if not tornado["filas"]:
+            st.info("No hay parámetros distintos de cero para perturbar.")
+        else:
+            filas_t = ordenar(tornado, metrica_tornado)[:int(n_barras)][::-1]
+            v0_t = tornado["base"][metrica_tornado]
+            etiquetas_t = [f["etiqueta"] for f in filas_t]
+            fig_t = go.Figure()
+            fig_t.add_trace(go.Bar(y=etiquetas_t, x=[f[metrica_tornado][0] - v0_t for f in filas_t], base=v0_t, orientation="h",
+                                   name=f"-{var_tornado}%", marker_color="#EF4444",
+                                   customdata=[f["bajo"] for f in filas_t], hovertemplate="%{y}: %{customdata:,.2f}<extra></extra>"))
+            fig_t.add_trace(go.Bar(y=etiquetas_t, x=[f[metrica_tornado][1] - v0_t for f in filas_t], base=v0_t, orientation="h",
+                                   name=f"+{var_tornado}%", marker_color="#10B981",
+                                   customdata=[f["alto"] for f in filas_t], hovertemplate="%{y}: %{customdata:,.2f}<extra></extra>"))
+            fig_t.update_layout(barmode="overlay", template="plotly_dark", height=max(300, 28 * len(filas_t) + 120),
+                                title=f"{METRICAS_TORNADO[metrica_tornado]} — base {v0_t:,.2f}")
+            grafico(fig_t, use_container_width=True)
+            st.caption(f"{tornado['evaluaciones']} escenarios evaluados en un solo lote.")
             
-            for dx in steps_x:
-                venta_sim = base_venta * (1 + dx/100)
-                if len(y_labels) == 1:
-                    x_labels.append(f"Venta {dx:+.1f}%")
-                
-                temp_data = copy.deepcopy(base_scenario)
-                temp_data["valor_contrato"] = costo_sim
-                temp_data["valor_venta_total"] = venta_sim
-                
-                # Para evitar divisiones por cero en simulaciones vacías
-                if temp_data["duracion_obra"] == 0: temp_data["duracion_obra"] = 1
-                
-                resultado = calcular_flujo(temp_data)
-                row_roi.append(resultado["roi"])
-                
-            z_roi.append(row_roi)
+            df_t = pd.DataFrame([{"Parámetro": f["etiqueta"], "Bajo": f["bajo"], "Alto": f["alto"],
+                                  **{f"{METRICAS_TORNADO[m]} {lado}": f[m][j] for m in METRICAS_TORNADO for j, lado in enumerate(("bajo", "alto"))}}
+                                 for f in ordenar(tornado, metrica_tornado)])
+            st.dataframe(df_t.style.format({c: "{:,.2f}" for c in df_t.columns if c != "Parámetro"}), use_container_width=True, hide_index=True)
 
-        fig_sens = go.Figure(data=go.Heatmap(
-            z=z_roi, x=x_labels, y=y_labels,
-            texttemplate="%{z:.1f}%", textfont={"size": 14},
-            colorscale='RdYlGn', hoverongaps=False
-        ))
+# --- FUNCIONALIDAD 8: BUSCAR OBJETIVO (GOAL SEEK) ---
+@st.fragment
+@medido("buscar objetivo")
+def seccion_objetivo():
+    st.markdown("---")
+    st.header("🧮 Buscar Objetivo")
+    
+    with st.expander("Resolver un input para una métrica objetivo", expanded=False, key="exp_obj", on_change="rerun") as exp:
+        if not exp.open:
+            return
+        base_obj = st.session_state.data_scenarios["Real"]
+        c_o1, c_o2, c_o3 = st.columns(3)
+        campo_obj = c_o1.selectbox("Variable a resolver", list(VARIABLES_OBJETIVO), format_func=lambda c: VARIABLES_OBJETIVO[c][0], key="obj_campo")
+        metrica_obj = c_o2.selectbox("Métrica", list(METRICAS_OBJETIVO), format_func=METRICAS_OBJETIVO.get, key="obj_metrica")
+        valor_obj = c_o3.number_input("Objetivo", value=15.0 if metrica_obj == "roi" else 0.0, key=f"obj_valor_{metrica_obj}")
+        lo_def, hi_def = rango_defecto(base_obj, campo_obj)
+        c_o4, c_o5 = st.columns(2)
+        lo_obj = c_o4.number_input("Desde", value=float(lo_def), key=f"obj_lo_{campo_obj}")
+        hi_obj = c_o5.number_input("Hasta", value=float(hi_def), key=f"obj_hi_{campo_obj}")
+        
+        if st.button("🎯 Resolver", key="btn_obj", use_container_width=True):
+            if hi_obj <= lo_obj:
+                st.error("El rango es vacío.")
+            else:
+                previo = st.session_state.get("objetivo")
+                # Arranque en caliente desde la solución anterior de la misma variable y métrica
+                x_ini = previo["valor"] if previo and (previo["campo"], previo["metrica"]) == (campo_obj, metrica_obj) else None
+                t_obj = time.perf_counter()
+                sim_real = st.session_state.simulaciones.get("Real")
+                sol = buscar_objetivo(base_obj, campo_obj, metrica_obj, valor_obj, rango=(lo_obj, hi_obj), x_inicial=x_ini,
+                                      evaluar=(lambda d: sim_real.evaluar(d, modo="resumen")) if sim_real is not None else None)
+                sol["segundos"] = time.perf_counter() - t_obj
+                st.session_state.objetivo = sol
         
-        fig_sens.update_layout(
-            title="Matriz de ROI (%)",
-            xaxis_title="Variación Precio Venta",
-            yaxis_title="Variación Costo Construcción",
-            height=500, template="plotly_dark"
+        sol = st.session_state.get("objetivo")
+        if sol is not None and (sol["campo"], sol["metrica"]) == (campo_obj, metrica_obj):
+            if not sol["convergio"]:
+                st.warning(sol["mensaje"] or "La búsqueda no convergió; se muestra el mejor punto encontrado.")
+            s1, s2, s3 = st.columns(3)
+            s1.metric(VARIABLES_OBJETIVO[campo_obj][0], f"{sol['valor']:,.2f}")
+            s2.metric(METRICAS_OBJETIVO[metrica_obj], f"{sol['logrado']:,.2f}")
+            s3.metric("Evaluaciones", f"{sol['evaluaciones']}", help=f"{sol['llamadas_motor']} llamadas al motor en {sol['segundos'] * 1000:.0f} ms")
+            
+            def aplicar_objetivo(campo, valor):
+                # Callback: corre antes del rerun, así puede actualizar el widget del input
+                st.session_state.data_scenarios["Real"][campo] = valor
+                if campo in WIDGET_CAMPO:
+                    st.session_state[f"Real_{WIDGET_CAMPO[campo]}"] = valor
+            if st.button("Aplicar al escenario Real", key="btn_obj_aplicar", on_click=aplicar_objetivo, args=(campo_obj, sol["valor"])):
+                st.rerun()  # cambia un input: se refresca toda la app, no sólo esta sección
+
+# --- FUNCIONALIDAD 6: SIMULACIÓN MONTE CARLO (RIESGO) ---
+@st.fragment
+@medido("montecarlo")
+def seccion_montecarlo():
+    st.markdown("---")
+    st.header("🎲 Simulación Monte Carlo (Riesgo)")
+    
+    with st.expander("Configurar Simulación", expanded=False, key="exp_mc", on_change="rerun") as exp:
+        if not exp.open:
+            return
+        import pandas as pd
+        import plotly.graph_objects as go
+        st.caption("Variaciones en % sobre el escenario Real (el desfase de ventas va en meses). Normal usa la columna Desv.")
+        config_mc = st.data_editor(
+            st.session_state.config_mc, key="editor_mc", hide_index=True, use_container_width=True,
+            column_config={
+                "variable": st.column_config.SelectboxColumn("Variable", options=list(VARIABLES_MC), required=True),
+                "distribucion": st.column_config.SelectboxColumn("Distribución", options=DISTRIBUCIONES, required=True),
+                "min": st.column_config.NumberColumn("Mín", format="%.1f"),
+                "moda": st.column_config.NumberColumn("Moda", format="%.1f"),
+                "max": st.column_config.NumberColumn("Máx", format="%.1f"),
+                "desv": st.column_config.NumberColumn("Desv", format="%.1f"),
+            },
         )
-        st.plotly_chart(fig_sens, use_container_width=True)
+        c_mc1, c_mc2 = st.columns(2)
+        n_mc = c_mc1.number_input("Sorteos", min_value=100, max_value=50000, value=10000, step=1000, key="mc_n")
+        seed_mc = c_mc2.number_input("Semilla", min_value=0, value=42, step=1, key="mc_seed")
+        
+        clave_mc = hash_canonico({"base": st.session_state.data_scenarios["Real"], "config": config_mc, "n": n_mc, "seed": seed_mc})
+        # La simulación es un trabajo en segundo plano; si las entradas cambian mientras corre, se cancela
+        trabajos = st.session_state.setdefault("trabajos", {})
+        trabajo_mc = cancelar_obsoletos(trabajos, "montecarlo", clave_mc)
+        if st.button("▶️ Simular", key="btn_mc", use_container_width=True):
+            base_mc = st.session_state.data_scenarios["Real"]
+            trabajo_mc = gestor_trabajos().enviar(trabajos, "montecarlo", clave_mc, simular_montecarlo,
+                                                  copy.deepcopy(base_mc), config_mc.copy(), int(n_mc), int(seed_mc),
+                                                  contexto={"base": hash_canonico(base_mc)}, forzar=True)
+        if trabajo_mc is not None and (trabajo_mc.terminado or trabajo_mc.clave == clave_mc):
+            if estado_trabajo(trabajo_mc, "Simulando"):
+                st.session_state.montecarlo = {"clave": trabajo_mc.clave, "base": trabajo_mc.contexto["base"],
+                                               "resultado": trabajo_mc.resultado}
+                del trabajos["montecarlo"]
+                if st.session_state.get("comp_vista") == "Abanico Monte Carlo":
+                    st.rerun()  # el abanico de la comparativa (otro fragmento) toma la simulación nueva
+            elif trabajo_mc.terminado:
+                del trabajos["montecarlo"]  # el aviso de cancelación o error se muestra una vez
+        
+        mc = st.session_state.get("montecarlo")
+        if mc is not None:
+            if mc["clave"] != clave_mc:
+                st.warning("Los datos o la configuración cambiaron desde la última simulación.")
+            tabla_mc = resumen_percentiles(mc["resultado"])
+            m1, m2 = st.columns(2)
+            m1.metric("Probabilidad de Pérdida", f"{tabla_mc['prob_perdida'] * 100:.1f}%")
+            m2.metric("Sin Flujo Positivo", f"{tabla_mc['prob_sin_break_even'] * 100:.1f}%")
+            etiquetas_mc = {"utilidad": "Utilidad (UF)", "roi": "ROI (%)", "peak_deuda": "Peak Deuda (UF)", "break_even": "Mes Flujo Positivo"}
+            df_mc = pd.DataFrame({etiquetas_mc[k]: tabla_mc[k] for k in etiquetas_mc}).T
+            st.dataframe(df_mc.style.format("{:,.1f}", na_rep="N/A"), use_container_width=True)
+            
+            fig_mc = go.Figure(go.Histogram(x=mc["resultado"]["roi"], nbinsx=60, marker_color="#3B82F6"))
+            fig_mc.add_vline(x=0, line_dash="dash", line_color="white", opacity=0.5)
+            fig_mc.update_layout(title="Distribución del ROI (%)", template="plotly_dark", height=350, bargap=0.02)
+            grafico(fig_mc, use_container_width=True)
+
+# --- FUNCIONALIDAD 7: CARTERA CONSOLIDADA ---
+@st.fragment
+@medido("cartera")
+def seccion_cartera():
+    st.markdown("---")
+    st.header("🏢 Cartera Consolidada")
+    
+    with st.expander("Cargar Cartera de Proyectos", expanded=False, key="exp_cartera", on_change="rerun") as exp:
+        if not exp.open:
+            return
+        import plotly.graph_objects as go
+        st.caption('JSON o JSONL con proyectos {"id", "inicio": "AAAA-MM", "escenarios": {"Real": {...}, ...}}, '
+                   'o un .json.gz guardado con motor.persistencia.guardar_cartera')
+        archivo_cartera = st.file_uploader("Archivo de cartera", type=["json", "jsonl", "gz"], key="up_cartera")
+        c_car1, c_car2, c_car3 = st.columns(3)
+        esc_cartera = c_car1.selectbox("Escenario a consolidar", SCENARIOS, key="cartera_escenario")
+        incluir_actual = c_car2.checkbox("Incluir proyecto actual", key="cartera_incluir")
+        inicio_actual = c_car3.text_input("Inicio proyecto actual (AAAA-MM)", value="2026-01", key="cartera_inicio")
+        
+        if archivo_cartera is not None:
+            clave_cartera = hash_canonico({"archivo": archivo_cartera.file_id, "escenario": esc_cartera})
+            if st.session_state.get("cartera_clave") != clave_cartera:
+                cartera_nueva = Cartera()
+                try:
+                    cartera_nueva.cargar(leer_cartera(archivo_cartera.getvalue(), esc_cartera))
+                except (ValueError, KeyError, TypeError) as e:
+                    st.error(f"No se pudo leer la cartera: {e}")
+                st.session_state.cartera = cartera_nueva
+                st.session_state.cartera_clave = clave_cartera
+        elif 'cartera' not in st.session_state:
+            st.session_state.cartera = Cartera()
+        cartera = st.session_state.cartera
+        
+        # El proyecto actual se parcha en el agregado: sólo se re-simula si cambió
+        if incluir_actual:
+            try:
+                cartera.actualizar("Proyecto actual", st.session_state.data_scenarios[esc_cartera], inicio_actual)
+            except ValueError:
+                st.warning("Mes de inicio inválido, usa el formato AAAA-MM.")
+        else:
+            cartera.quitar("Proyecto actual")
+        
+        if len(cartera):
+            agg = cartera.agregado
+            meses_cal = cartera.meses()
+            st.caption(f"{len(cartera)} proyectos consolidados · {cartera.simulaciones} simulaciones acumuladas")
+            kc1, kc2, kc3 = st.columns(3)
+            kc1.metric("Peak Deuda Cartera", f"{agg['Deuda Total'].max():,.0f} UF")
+            kc2.metric("Mínimo Flujo Acumulado", f"{agg['Flujo Acumulado'].min():,.0f} UF")
+            kc3.metric("Intereses Devengados", f"{agg['Devengado Total'].sum():,.0f} UF")
+            
+            fig_cartera = go.Figure()
+            fig_cartera.add_trace(go.Scatter(x=meses_cal, y=agg["Deuda Total"], name="Deuda Total", mode="lines", line=dict(color="#EF4444", width=3)))
+            fig_cartera.add_trace(go.Scatter(x=meses_cal, y=agg["Flujo Acumulado"], name="Flujo Acumulado", mode="lines", line=dict(color="#10B981", width=3)))
+            fig_cartera.add_trace(go.Bar(x=meses_cal, y=agg["Devengado Total"], name="Intereses Devengados", marker_color="#F59E0B", opacity=0.6, yaxis="y2"))
+            fig_cartera.update_layout(
+                title="Exposición Consolidada por Mes Calendario", template="plotly_dark", height=450,
+                yaxis=dict(title="UF"), yaxis2=dict(title="Intereses (UF)", overlaying="y", side="right", showgrid=False),
+                legend=dict(orientation="h")
+            )
+            grafico(fig_cartera, use_container_width=True)
+
+with col_dash:
+    seccion_sensibilidad()
+    seccion_tornado()
+    seccion_objetivo()
+    seccion_montecarlo()
+    seccion_cartera()
+
+# --- PRESUPUESTO DE MEMORIA DE LA SESIÓN ---
+def memoria_sesion():
+    """Bytes propios por clave del estado de sesión (sin lo que está en las cachés compartidas)."""
+    vistos = resultados_compartidos().ids() | libros_excel.ids()
+    return {k: tamano(v, vistos) for k, v in st.session_state.items()}
+
+def aplicar_presupuesto():
+    # Se libera primero lo que se reconstruye solo: checkpoints de la simulación reanudable,
+    # resultados en caché y análisis derivados (se recalculan al abrir su sección).
+    por_clave = memoria_sesion()
+    total = sum(por_clave.values())
+    if total > PRESUPUESTO_SESION:
+        for sim in st.session_state.simulaciones.values():
+            sim.descartar_checkpoints()
+        por_clave = memoria_sesion()
+        total = sum(por_clave.values())
+    if total > PRESUPUESTO_SESION:
+        cache_resultados.recortar(max(0, cache_resultados.bytes - (total - PRESUPUESTO_SESION)))
+        por_clave = memoria_sesion()
+        total = sum(por_clave.values())
+    for clave in ("cubos_sensibilidad", "tornado", "montecarlo"):
+        if total <= PRESUPUESTO_SESION:
+            break
+        if clave in st.session_state:
+            del st.session_state[clave]
+            total -= por_clave.pop(clave)
+    registro = registro_sesiones()
+    ahora = time.time()
+    registro[id_sesion] = {"bytes": total, "actualizado": ahora}
+    for sid, info in list(registro.items()):
+        if ahora - info["actualizado"] > SESION_INACTIVA_S:
+            registro.pop(sid, None)
+    return por_clave
+
+@st.fragment
+@medido("memoria")
+def seccion_memoria(por_clave):
+    with st.expander("🧠 Memoria de la Sesión", expanded=False, key="exp_memoria", on_change="rerun") as exp:
+        if not exp.open:
+            return
+        import pandas as pd
+        if not st.session_state.get("corrida_app", True):
+            por_clave = memoria_sesion()  # el fragmento corre solo: se mide de nuevo
+        total = sum(por_clave.values())
+        compartidos, libros, registro = resultados_compartidos(), libros_excel_compartidos(), dict(registro_sesiones())
+        m1, m2, m3 = st.columns(3)
+        m1.metric("Esta sesión", formatear_bytes(total), delta=f"{total / PRESUPUESTO_SESION:.0%} del presupuesto", delta_color="off")
+        m2.metric("Compartido (proceso)", formatear_bytes(compartidos.bytes + libros.bytes),
+                  help=f"{len(compartidos)} resultados y {len(libros)} libros Excel, de sólo lectura para todas las sesiones")
+        m3.metric("Sesiones activas", len(registro))
+        filas = sorted(((k, v) for k, v in por_clave.items() if v >= 1024), key=lambda kv: -kv[1])
+        st.dataframe(pd.DataFrame({"Clave": [k for k, _ in filas], "Bytes": [formatear_bytes(v) for _, v in filas]}),
+                     hide_index=True, use_container_width=True)
+        ahora = time.time()
+        st.caption("Memoria propia por sesión (última corrida completa)")
+        st.dataframe(pd.DataFrame({
+            "Sesión": [("▶ " if sid == id_sesion else "") + sid[:8] for sid in registro],
+            "Memoria": [formatear_bytes(info["bytes"]) for info in registro.values()],
+            "Última corrida": [f"hace {(ahora - info['actualizado']) / 60:.0f} min" for info in registro.values()],
+        }), hide_index=True, use_container_width=True)
+
+with col_dash:
+    seccion_memoria(aplicar_presupuesto())
+
+if perfil_corrida is not None:
+    perfil.activar(None)
+    registrar_perfil(perfil_corrida)
+
+# --- PANEL DE PERFIL DE TIEMPOS ---
+@st.fragment
+def seccion_perfil():
+    with st.expander("⏱️ Perfil de Tiempos", expanded=False, key="exp_perfil", on_change="rerun") as exp:
+        if not exp.open:
+            return
+        import pandas as pd
+        st.toggle("Medir cada corrida", value=PERFIL_DEFECTO, key="perfil_activo",
+                  help="Tiempo por fase del motor y por sección del tablero, y llamadas al motor por corrida. "
+                       "Rige desde la próxima corrida (GASTO_PERFIL=1 lo deja activo al iniciar).")
+        registros = list(st.session_state.get("perfiles", ()))
+        if not registros:
+            st.info("Sin corridas medidas todavía: activa la medición y edita algún dato.")
+            return
+        c_p1, c_p2, c_p3 = st.columns([3, 1, 1])
+        i = c_p1.selectbox("Corrida", range(len(registros) - 1, -1, -1), key="perfil_registro",
+                           format_func=lambda i: f"{time.strftime('%H:%M:%S', time.localtime(registros[i]['inicio']))} · "
+                                                 f"{registros[i]['nombre']} · {registros[i]['total_ms']:,.0f} ms")
+        c_p2.download_button("📤 JSON", data=perfil.exportar_json(registros), file_name="perfil_tiempos.json",
+                             mime="application/json", use_container_width=True)
+        if c_p3.button("Limpiar", key="perfil_limpiar", use_container_width=True):
+            st.session_state.perfiles.clear()
+            st.rerun(scope="fragment")
+        r = registros[i]
+        contadores = r["contadores"]
+        m1, m2, m3 = st.columns(3)
+        m1.metric("Total", f"{r['total_ms']:,.0f} ms")
+        m2.metric("Llamadas al motor", contadores.get("motor: calcular_flujo", 0) + contadores.get("motor: simulación reanudable", 0))
+        m3.metric("Escenarios en lote", contadores.get("motor: escenarios en lote", 0))
+        # Las fases se anidan (una sección contiene sus llamadas al motor): el % es sobre el total de la corrida
+        st.dataframe(pd.DataFrame({
+            "Fase": list(r["fases"]),
+            "Llamadas": [f["llamadas"] for f in r["fases"].values()],
+            "Total (ms)": [f["total_ms"] for f in r["fases"].values()],
+            "Máx (ms)": [f["max_ms"] for f in r["fases"].values()],
+            "% corrida": [f["total_ms"] / r["total_ms"] * 100 if r["total_ms"] else 0.0 for f in r["fases"].values()],
+        }), hide_index=True, use_container_width=True,
+            column_config={c: st.column_config.NumberColumn(c, format="%,.1f") for c in ("Total (ms)", "Máx (ms)", "% corrida")})
+        if contadores:
+            st.caption(" · ".join(f"{k}: {v:,}" for k, v in contadores.items()))
+
+with col_dash:
+    seccion_perfil()
+
+st.session_state.corrida_app = False
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Las pruebas importan motor y bench desde la raíz del repositorio, sin instalar nada
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
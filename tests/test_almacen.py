@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from bench.generadores import lote_sintetico
+from motor.almacen import AlmacenResultados, a_resultado, registro_lote, registro_resultado
+from motor.cache import CacheResultados
+from motor.canonico import hash_canonico
+from motor.flujo import calcular_flujo
+from motor.lote import calcular_flujo_lote
+
+
+@pytest.fixture
+def almacen(tmp_path):
+    return AlmacenResultados(str(tmp_path / "resultados.sqlite"))
+
+
+def _igual(a, b):
+    assert set(a) == set(b)
+    for k in a:
+        if k.startswith("df"):
+            pd.testing.assert_frame_equal(a[k], b[k], check_exact=True)
+        else:
+            assert a[k] == b[k], k
+
+
+@pytest.mark.parametrize("paso", ["Mensual", "Semanal"])
+def test_ida_y_vuelta(almacen, paso):
+    data = {**lote_sintetico(1, 3, horizonte=48)[0], "paso_tiempo": paso}
+    r = calcular_flujo(data)
+    almacen.guardar("clave", r)
+    _igual(almacen.obtener("clave"), a_resultado(registro_resultado(r)))
+    guardado = almacen.obtener("clave")
+    assert guardado["min_flujo_acumulado"] == r["min_flujo_acumulado"]
+    assert ("df_paso" in guardado) == (paso != "Mensual")
+    if paso != "Mensual":
+        pd.testing.assert_frame_equal(guardado["df_paso"], r["df_paso"], check_exact=True)
+
+
+def test_version_distinta_no_se_lee(almacen):
+    almacen.guardar("clave", calcular_flujo(lote_sintetico(1, 3)[0]))
+    otra = AlmacenResultados(almacen.ruta, version=almacen.version + 1)
+    assert otra.obtener("clave") is None
+
+
+def test_cache_recalcula_resultado_sin_detalle_por_subperiodo(almacen):
+    escenarios = lote_sintetico(3, 5, horizonte=48)
+    for d, paso in zip(escenarios, ["Mensual", "Semanal", "Diario"]):
+        d["paso_tiempo"] = paso
+    # El motor por lotes guarda el de paso diario sin df_paso
+    lote = calcular_flujo_lote([escenarios[2]])
+    almacen.guardar_registros([(hash_canonico(escenarios[2]), registro_lote(lote, 0))])
+    primera = CacheResultados(calcular_flujo, almacen=almacen)
+    r1 = [primera.resultado(d) for d in escenarios]
+    assert primera.calculos == 3 and "df_paso" in r1[2]
+    segunda = CacheResultados(calcular_flujo, almacen=almacen)
+    r2 = [segunda.resultado(d) for d in escenarios]
+    assert segunda.calculos == 0 and segunda.aciertos_almacen == 3
+    for a, b in zip(r1, r2):
+        _igual(a, b)
+
+
+def test_cache_en_memoria_completa_el_resultado_del_lote():
+    data = {**lote_sintetico(1, 6, horizonte=36)[0], "paso_tiempo": "Semanal"}
+    cache = CacheResultados(calcular_flujo)
+    cache.resultados_lote([data])
+    r = cache.resultado(data)
+    assert "df_paso" in r
+    assert cache.calculos == 2 and cache.aciertos == 0 and len(cache) == 1
+    assert cache.resultado(data) is r and cache.aciertos == 1
+
+
+def test_resultados_lote_usa_el_almacen(almacen):
+    escenarios = lote_sintetico(4, 7)
+    CacheResultados(calcular_flujo, almacen=almacen).resultados_lote(escenarios)
+    cache = CacheResultados(calcular_flujo, almacen=almacen)
+    resultados = cache.resultados_lote(escenarios)
+    assert cache.calculos == 0 and cache.aciertos_almacen == 4
+    for data, r in zip(escenarios, resultados):
+        np.testing.assert_array_equal(r["df"].to_numpy(dtype=float), calcular_flujo(data)["df"].to_numpy(dtype=float))
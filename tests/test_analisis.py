@@ -0,0 +1,69 @@
+"""Cubo de sensibilidad, Monte Carlo y trabajos en segundo plano."""
+import time
+
+import numpy as np
+import pytest
+
+from bench.generadores import lote_sintetico
+from motor.flujo import calcular_flujo
+from motor.montecarlo import config_montecarlo_defecto, resumen_percentiles, simular_montecarlo
+from motor.sensibilidad import evaluar_cubo, pasos_variacion, valores_eje
+from motor.trabajos import CANCELADO, ERROR, LISTO, GestorTrabajos
+
+
+@pytest.fixture
+def base():
+    return lote_sintetico(1, 31, horizonte=48)[0]
+
+
+def test_cubo_igual_a_la_referencia(base):
+    ejes = {c: valores_eje(base, c, pasos_variacion(10, 3)) for c in ("valor_venta_total", "tasa_anual_uf")}
+    cubo = evaluar_cubo(base, ejes, "utilidad", workers=1)
+    assert cubo.shape == (3, 3)
+    for i, venta in enumerate(ejes["valor_venta_total"]):
+        for j, tasa in enumerate(ejes["tasa_anual_uf"]):
+            data = {**base, "valor_venta_total": float(venta), "tasa_anual_uf": float(tasa)}
+            assert cubo[i, j] == calcular_flujo(data, modo="resumen")["utilidad"]
+
+
+def test_montecarlo_reproducible(base):
+    a = simular_montecarlo(base, config_montecarlo_defecto(), n=300, seed=4, tam_bloque=128)
+    b = simular_montecarlo(base, config_montecarlo_defecto(), n=300, seed=4, tam_bloque=300)
+    np.testing.assert_array_equal(a["utilidad"], b["utilidad"])
+    assert a["curvas"]["Flujo Acumulado"].shape[0] == 300
+    tabla = resumen_percentiles(a)
+    assert tabla["utilidad"]["P5"] <= tabla["utilidad"]["P50"] <= tabla["utilidad"]["P95"]
+    assert 0.0 <= tabla["prob_perdida"] <= 1.0
+
+
+def _esperar(trabajo, limite=10.0):
+    fin = time.time() + limite
+    while not trabajo.terminado and time.time() < fin:
+        time.sleep(0.01)
+    return trabajo
+
+
+def _bloques(n, progreso, pausa=0.0, error=False):
+    for i in range(1, n + 1):
+        time.sleep(pausa)
+        if error:
+            raise ZeroDivisionError("bloque")
+        progreso(i, n)
+    return n
+
+
+def test_trabajos():
+    gestor = GestorTrabajos()
+    trabajos = {}
+    try:
+        listo = _esperar(gestor.enviar(trabajos, "a", 1, _bloques, 3))
+        assert listo.estado == LISTO and listo.resultado == 3 and listo.fraccion == 1.0
+        assert gestor.enviar(trabajos, "a", 1, _bloques, 3) is listo
+        fallido = _esperar(gestor.enviar(trabajos, "b", 1, _bloques, 3, error=True))
+        assert fallido.estado == ERROR and isinstance(fallido.error, ZeroDivisionError)
+        lento = gestor.enviar(trabajos, "c", 1, _bloques, 1000, pausa=0.01)
+        nuevo = gestor.enviar(trabajos, "c", 2, _bloques, 2)
+        assert _esperar(lento).estado == CANCELADO
+        assert _esperar(nuevo).estado == LISTO and trabajos["c"] is nuevo
+    finally:
+        gestor.cerrar()
@@ -0,0 +1,52 @@
+import json
+
+from motor import cli
+from motor.flujo import get_default_config
+
+
+def _leer_jsonl(ruta):
+    with open(ruta, encoding="utf-8") as f:
+        return [json.loads(linea) for linea in f]
+
+
+def test_lineas_ilegibles_son_filas_de_error(tmp_path):
+    entrada = tmp_path / "entrada.jsonl"
+    entrada.write_text("\n".join([
+        json.dumps({"id": "a", "escenario": get_default_config("Real")}),
+        "{no es json",
+        "[1, 2]",
+        "",
+        json.dumps(get_default_config("Optimista")),
+    ]), encoding="utf-8")
+    salida = tmp_path / "salida.jsonl"
+    assert cli.main([str(entrada), "--formato", "jsonl", "--workers", "1", "-o", str(salida)]) == 0
+    filas = _leer_jsonl(salida)
+    assert [f["id"] for f in filas] == ["a", "2", "3", "5"]
+    assert "error" not in filas[0] and "error" not in filas[3]
+    assert filas[1]["error"].startswith("línea 2:")
+    assert filas[2]["error"] == "línea 3: se esperaba un objeto JSON, no list"
+
+
+def test_archivos_ilegibles_son_filas_de_error(tmp_path):
+    (tmp_path / "bueno.json").write_text(json.dumps(get_default_config("Real")), encoding="utf-8")
+    (tmp_path / "malo.json").write_text("{", encoding="utf-8")
+    (tmp_path / "lista.json").write_text("[]", encoding="utf-8")
+    salida = tmp_path / "salida.csv"
+    assert cli.main([str(tmp_path), "--workers", "1", "-o", str(salida)]) == 0
+    filas = cli.evaluar_bloque(cli.leer_registros(str(tmp_path)))
+    errores = {f["id"]: f["error"] for f in filas if "error" in f}
+    assert set(errores) == {"malo", "lista"}
+    assert str(tmp_path / "malo.json") in errores["malo"]
+    assert len(salida.read_text(encoding="utf-8").splitlines()) == 4
+
+
+def test_mensual_y_almacen(tmp_path):
+    # La segunda vez el escenario válido se lee del almacén
+    registros = [("x", get_default_config("Real")), ("y", {"valor_venta_total": "mucho"})]
+    ruta = str(tmp_path / "almacen.sqlite")
+    primera = cli.evaluar_bloque(registros, mensual=True, almacen=ruta)
+    segunda = cli.evaluar_bloque(registros, mensual=True, almacen=ruta)
+    assert len(cli._almacen(ruta)) == 1
+    assert segunda == primera
+    assert len(primera[0]["flujo"]["Mes"]) == primera[0]["horizonte"] + 1
+    assert "error" in primera[1]
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from bench.generadores import escenarios_aleatorios, lote_sintetico
+from motor.flujo import COLUMNAS, calcular_flujo, get_default_config
+
+KPIS = ("utilidad", "roi", "costo_financiero_total", "peak_deuda", "min_flujo_acumulado", "break_even")
+
+
+@pytest.mark.parametrize("data", escenarios_aleatorios(8, 5) + lote_sintetico(2, 5, kps=40, relacionadas=10))
+def test_modos_coinciden(data):
+    df = calcular_flujo(data)
+    columnas = calcular_flujo(data, modo="columnas")
+    resumen = calcular_flujo(data, modo="resumen")
+    for k in KPIS:
+        assert columnas[k] == resumen[k] == df[k]
+    assert "df" not in resumen and "columnas" not in resumen
+    for c in COLUMNAS:
+        np.testing.assert_array_equal(columnas["columnas"][c], df["df"][c].to_numpy(dtype=float))
+    assert resumen["min_flujo_acumulado"] == df["df"]["Flujo Acumulado"].min()
+    assert resumen["peak_deuda"] == df["df"]["Deuda Total"].max()
+
+
+def test_modo_desconocido():
+    with pytest.raises(ValueError):
+        calcular_flujo(get_default_config("Real"), modo="tabla")
+
+
+@pytest.mark.parametrize("paso,k", [("Semanal", 4), ("Diario", 30)])
+def test_subperiodos(paso, k):
+    data = {**lote_sintetico(1, 2, horizonte=36)[0], "paso_tiempo": paso}
+    r = calcular_flujo(data)
+    h = len(r["df"]) - 1
+    assert len(r["df_paso"]) == h * k + 1
+    assert r["df"]["Mes"].tolist() == list(range(h + 1))
+    # Los flujos por mes son la suma de sus subperíodos
+    np.testing.assert_allclose(r["df_paso"]["Flujo Neto"].sum(), r["df"]["Flujo Neto"].sum(), rtol=1e-9)
+    resumen = calcular_flujo(data, modo="resumen")
+    for k in KPIS:
+        assert resumen[k] == r[k]
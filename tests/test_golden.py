@@ -0,0 +1,17 @@
+"""Todos los motores contra la salida dorada del ciclo original (bench/golden.npz)."""
+import pytest
+
+from bench import diferencial
+
+
+@pytest.mark.parametrize("motor", [None, *diferencial.MOTORES], ids=lambda m: m or "referencia")
+def test_motor_reproduce_salida_dorada(motor):
+    diferencias = diferencial.comparar_golden(diferencial.RUTA_GOLDEN, diferencial.MOTORES.get(motor))
+    assert diferencias == []
+
+
+def test_salida_dorada_cubre_muchos_tramos_y_horizontes_largos():
+    escenarios, esperados = diferencial.leer_golden(diferencial.RUTA_GOLDEN)
+    assert len(escenarios) == len(esperados) >= 40
+    assert max(len(d["lista_kps"]) for d in escenarios) >= 100
+    assert max(len(e["df"]) - 1 for e in esperados) >= 240
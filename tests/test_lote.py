@@ -0,0 +1,36 @@
+import numpy as np
+
+from bench.generadores import escenarios_aleatorios, lote_sintetico
+from motor.flujo import calcular_flujo
+from motor.lote import calcular_flujo_lote, comparar_con_referencia, resultado_escenario
+
+
+def test_lote_igual_a_la_referencia():
+    escenarios = escenarios_aleatorios(30, 7) + lote_sintetico(3, 7, horizonte=120, kps=150, relacionadas=50)
+    assert comparar_con_referencia(escenarios, calcular_flujo, rtol=0, atol=0) == []
+
+
+def test_lote_con_subperiodos_mezclados():
+    escenarios = lote_sintetico(3, 8, horizonte=48)
+    escenarios[1] = {**escenarios[1], "paso_tiempo": "Semanal"}
+    assert comparar_con_referencia(escenarios, calcular_flujo) == []
+
+
+def test_resultado_escenario():
+    escenarios = lote_sintetico(2, 9)
+    lote = calcular_flujo_lote(escenarios)
+    for i, data in enumerate(escenarios):
+        r, ref = resultado_escenario(lote, i), calcular_flujo(data)
+        assert r["min_flujo_acumulado"] == ref["min_flujo_acumulado"]
+        assert r["break_even"] == ref["break_even"]
+        np.testing.assert_array_equal(r["df"].to_numpy(dtype=float), ref["df"].to_numpy(dtype=float))
+
+
+def test_lote_sin_columnas():
+    escenarios = lote_sintetico(3, 10)
+    lote = calcular_flujo_lote(escenarios, columnas=False)
+    assert lote["columnas"] is None
+    for i, data in enumerate(escenarios):
+        ref = calcular_flujo(data, modo="resumen")
+        assert lote["utilidad"][i] == ref["utilidad"]
+        assert lote["min_flujo_acumulado"][i] == ref["min_flujo_acumulado"]
@@ -0,0 +1,39 @@
+import pytest
+
+from bench.generadores import lote_sintetico
+from motor.flujo import calcular_flujo
+from motor.objetivo import buscar_objetivo, valor_metrica
+from motor.reanudable import SimulacionReanudable
+
+
+@pytest.fixture
+def base():
+    return lote_sintetico(1, 21, horizonte=48)[0]
+
+
+def test_roi_objetivo(base):
+    objetivo = calcular_flujo(base, modo="resumen")["roi"] + 5.0
+    r = buscar_objetivo(base, "valor_venta_total", "roi", objetivo)
+    assert r["convergio"]
+    logrado = calcular_flujo({**base, "valor_venta_total": r["valor"]}, modo="resumen")
+    assert logrado["roi"] == pytest.approx(objetivo, abs=1e-4)
+
+
+def test_reanudable_da_la_misma_solucion(base):
+    objetivo = calcular_flujo(base, modo="resumen")["utilidad"] * 0.5
+    directo = buscar_objetivo(base, "valor_venta_total", "utilidad", objetivo)
+    sim = SimulacionReanudable(base)
+    reanudado = buscar_objetivo(base, "valor_venta_total", "utilidad", objetivo,
+                                evaluar=lambda d: sim.evaluar(d, modo="resumen"))
+    assert reanudado["valor"] == directo["valor"]
+
+
+def test_peak_equity_desde_el_resumen(base):
+    df = calcular_flujo(base)
+    resumen = calcular_flujo(base, modo="resumen")
+    assert valor_metrica(resumen, "peak_equity") == valor_metrica({"df": df["df"]}, "peak_equity")
+
+
+def test_objetivo_inalcanzable(base):
+    r = buscar_objetivo(base, "valor_venta_total", "roi", 1e9)
+    assert not r["convergio"] and r["mensaje"]
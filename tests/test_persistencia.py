@@ -0,0 +1,64 @@
+import gzip
+import json
+
+import pytest
+
+from motor.canonico import hash_canonico
+from motor.flujo import get_default_config
+from motor.persistencia import VERSION, cargar, guardar_cartera, guardar_escenarios
+
+
+@pytest.fixture
+def escenarios():
+    return {n: get_default_config(n) for n in ("Real", "Optimista", "Pesimista")}
+
+
+def test_ida_y_vuelta(escenarios):
+    datos = guardar_escenarios(escenarios)
+    assert datos[:2] == b"\x1f\x8b"
+    conjunto = cargar(datos, verificar=True)
+    assert conjunto["version_origen"] == VERSION
+    assert conjunto["hashes"] == {n: hash_canonico(d) for n, d in escenarios.items()}
+    assert {n: hash_canonico(d) for n, d in conjunto["escenarios"].items()} == conjunto["hashes"]
+    assert guardar_escenarios(escenarios) == datos  # determinista (gzip sin fecha)
+
+
+def test_hash_canonico_normaliza_numeros():
+    assert hash_canonico({"a": 1, "b": (1, 2)}) == hash_canonico({"b": [1.0, 2.0], "a": 1.0})
+    assert hash_canonico({"a": 1}) != hash_canonico({"a": 2})
+
+
+def test_escenario_sin_version_se_migra():
+    viejo = {"valor_venta_total": 1000.0, "lista_kps": [{"monto": 10.0, "tasa_anual": 5.0}]}
+    conjunto = cargar(json.dumps(viejo))
+    real = conjunto["escenarios"]["Real"]
+    assert conjunto["version_origen"] == 0
+    assert real["valor_venta_total"] == 1000.0
+    assert real["lista_kps"][0]["frecuencia_pago"] == "Mensual"
+    assert set(get_default_config("Real")) <= set(real)
+
+
+def test_cartera(escenarios):
+    conjunto = cargar(guardar_cartera([{"id": 1, "inicio": 3, "escenarios": escenarios}]))
+    assert [(p["id"], p["inicio"]) for p in conjunto["proyectos"]] == [("1", 3)]
+
+
+@pytest.mark.parametrize("datos", [b"\x1f\x8b\x00", b"{", "[1]"])
+def test_archivo_ilegible(datos):
+    with pytest.raises(ValueError):
+        cargar(datos)
+
+
+def test_hash_alterado(escenarios):
+    sobre = json.loads(gzip.decompress(guardar_escenarios(escenarios)))
+    sobre["escenarios"]["Real"]["valor_venta_total"] += 1
+    assert cargar(json.dumps(sobre))["hashes"] == sobre["hashes"]
+    with pytest.raises(ValueError):
+        cargar(json.dumps(sobre), verificar=True)
+
+
+def test_version_futura(escenarios):
+    sobre = json.loads(gzip.decompress(guardar_escenarios(escenarios)))
+    sobre["version"] = VERSION + 1
+    with pytest.raises(ValueError):
+        cargar(json.dumps(sobre))
@@ -0,0 +1,62 @@
+import copy
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bench.generadores import lote_sintetico
+from motor.flujo import calcular_flujo
+from motor.reanudable import SIN_EFECTO, SimulacionReanudable, primer_mes_afectado
+
+
+@pytest.fixture
+def base():
+    return lote_sintetico(1, 12, horizonte=60, kps=8, relacionadas=3)[0]
+
+
+def _editar(data, campo, valor):
+    nuevo = copy.deepcopy(data)
+    nuevo[campo] = valor
+    return nuevo
+
+
+def test_primer_mes_afectado(base):
+    assert primer_mes_afectado(base, copy.deepcopy(base)) == SIN_EFECTO
+    assert primer_mes_afectado(base, _editar(base, "intereses_previos_uf", 123.0)) == SIN_EFECTO
+    ultima = max(int(p["mes"]) for p in base["plan_ventas"])
+    nuevo = copy.deepcopy(base)
+    nuevo["plan_ventas"] = [p for p in base["plan_ventas"] if int(p["mes"]) != ultima] + [{"mes": ultima, "pct": 0.0}]
+    assert 0 < primer_mes_afectado(base, nuevo) <= ultima
+
+
+@pytest.mark.parametrize("campo,factor", [("valor_venta_total", 1.1), ("tasa_anual_uf", 0.5),
+                                          ("otros_costos_mensuales", 2.0), ("intereses_previos_uf", 1.0)])
+def test_actualizar_igual_a_simular_de_cero(base, campo, factor):
+    sim = SimulacionReanudable(base)
+    nuevo = _editar(base, campo, base[campo] * factor + 1.0)
+    r = sim.actualizar(nuevo)
+    ref = calcular_flujo(nuevo)
+    pd.testing.assert_frame_equal(r["df"], ref["df"], check_exact=True)
+    for k in ("utilidad", "roi", "peak_deuda", "min_flujo_acumulado", "break_even"):
+        assert r[k] == ref[k]
+
+
+def test_evaluar_resumen_sin_adoptar(base):
+    sim = SimulacionReanudable(base)
+    simulados = sim.meses_simulados
+    nuevo = _editar(base, "valor_venta_total", base["valor_venta_total"] * 0.9)
+    r = sim.evaluar(nuevo, modo="resumen")
+    assert "df" not in r
+    ref = calcular_flujo(nuevo, modo="resumen")
+    assert {k: r[k] for k in ref} == ref
+    # Sólo se simulan los meses desde la primera venta; la base no cambia
+    assert sim.meses_simulados - simulados < simulados
+    pd.testing.assert_frame_equal(sim.resultado["df"], calcular_flujo(base)["df"], check_exact=True)
+
+
+def test_descartar_checkpoints(base):
+    sim = SimulacionReanudable(base)
+    sim.descartar_checkpoints()
+    nuevo = _editar(base, "tasa_anual_uf", base["tasa_anual_uf"] + 1.0)
+    np.testing.assert_array_equal(sim.actualizar(nuevo)["df"].to_numpy(dtype=float),
+                                  calcular_flujo(nuevo)["df"].to_numpy(dtype=float))
@@ -0,0 +1,24 @@
+from bench.generadores import lote_sintetico
+from motor.flujo import calcular_flujo
+from motor.tornado import calcular_tornado, ordenar, parametros
+
+
+def test_parametros_sin_efecto_en_el_flujo_quedan_fuera():
+    # intereses_previos_uf no entra al motor: su barra sería siempre nula
+    base = {**lote_sintetico(1, 1, kps=2, relacionadas=1)[0], "intereses_previos_uf": 500.0}
+    rutas = [ruta for ruta, _, _ in parametros(base)]
+    assert ("intereses_previos_uf",) not in rutas
+    assert ("valor_venta_total",) in rutas and ("lista_kps", 1, "monto") in rutas
+
+
+def test_tornado_igual_a_la_referencia():
+    base = lote_sintetico(1, 2, kps=2, relacionadas=1)[0]
+    tornado = calcular_tornado(base, variacion_pct=10.0)
+    assert tornado["evaluaciones"] == 1 + 2 * len(tornado["filas"])
+    assert tornado["base"]["roi"] == calcular_flujo(base, modo="resumen")["roi"]
+    venta = next(f for f in tornado["filas"] if f["ruta"] == ("valor_venta_total",))
+    alto = calcular_flujo({**base, "valor_venta_total": venta["alto"]}, modo="resumen")
+    assert venta["roi"][1] == alto["roi"]
+    orden = ordenar(tornado, "roi")
+    anchos = [max(tornado["base"]["roi"], *f["roi"]) - min(tornado["base"]["roi"], *f["roi"]) for f in orden]
+    assert anchos == sorted(anchos, reverse=True)
@@ -0,0 +1,78 @@
+import random
+
+import numpy as np
+
+from motor.tramos import (FREQ_AL_FINAL, FREQ_MENSUAL, FREQ_OTRA, FREQ_TRIMESTRAL, LibroTramos, codigo_freq,
+                          suma)
+
+
+def test_suma_en_el_orden_de_los_tramos():
+    rng = random.Random(3)
+    valores = [rng.uniform(-1e6, 1e6) for _ in range(500)]
+    esperado = 0.0
+    for v in valores:
+        esperado += v
+    assert suma(np.array(valores)) == esperado
+    filas = np.array([valores, valores[::-1]])
+    assert suma(filas).tolist() == [esperado, sum(valores[::-1])]
+
+
+def test_suma_sin_tramos():
+    assert suma(np.zeros(0)) == 0.0
+    assert suma(np.zeros((3, 0))).tolist() == [0.0, 0.0, 0.0]
+
+
+def test_codigo_freq():
+    assert codigo_freq("Mensual", False) == FREQ_MENSUAL
+    assert codigo_freq("Trimestral", True) == FREQ_TRIMESTRAL
+    assert codigo_freq("Al Final", False) == FREQ_AL_FINAL
+    assert codigo_freq("Semestral", True) == FREQ_AL_FINAL
+    assert codigo_freq("Semestral", False) == FREQ_OTRA
+
+
+def _tramos(n, seed):
+    rng = random.Random(seed)
+    return [{"monto": rng.uniform(100, 20000), "tasa_anual": rng.uniform(0, 14), "mes_inicio": rng.randint(0, 3),
+             "frecuencia_pago": rng.choice(["Mensual", "Trimestral", "Al Final"])} for _ in range(n)]
+
+
+def test_desembolsos_se_suman_en_cadena():
+    lista = _tramos(150, 1)
+    libro = LibroTramos(lista, "Mensual", False)
+    esperado = 7.0
+    for t in lista:
+        if t["mes_inicio"] == 0:
+            esperado += t["monto"]
+    assert libro.desembolso_mes_0(7.0) == esperado
+    esperado = 7.0
+    for t in lista:
+        if t["mes_inicio"] == 2:
+            esperado += t["monto"]
+    assert libro.activar(2, 7.0) == esperado
+    assert libro.activar(99, 7.0) == 7.0
+
+
+def test_pago_al_cierre_deja_saldo_cero():
+    libro = LibroTramos(_tramos(150, 2), "Mensual", False)
+    for m in range(1, 4):
+        libro.activar(m)
+        libro.devengar(m)
+    total = libro.saldo_total
+    assert total > 0
+    dinero, _, pago = libro.pagar(4, 1e9, 0.0, es_cierre=True)
+    assert pago == total and dinero == 1e9 - total
+    assert libro.saldo_total == 0.0 and not libro.saldo.any()
+
+
+def test_saldo_total_como_el_ciclo_por_tramo():
+    # El residuo de pagar todo el saldo depende del orden de suma: debe ser el del ciclo
+    # original por tramo (aquí <= 0, con np.sum queda en +1e-11)
+    libro = LibroTramos(_tramos(300, 4), "Mensual", False)
+    for m in range(1, 4):
+        libro.activar(m)
+    _, interes, _ = libro.pagar(4, libro.saldo_total + 1.0, 0.0, es_cierre=False)
+    total = 0.0
+    for s in libro.saldo.tolist():
+        total += s
+    assert interes == 0
+    assert libro.saldo_total == total <= 0